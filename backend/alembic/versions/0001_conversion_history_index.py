@@ -0,0 +1,45 @@
+"""Index conversions by owner and (created_at, id) for history pages
+
+Tables were created by Base.metadata.create_all before migrations existed,
+so this revision only adds the index where the table already exists without
+it; fresh databases get it from create_all.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_conversions_user_id_created_at_id"
+
+
+def _has_index() -> bool:
+    """Whether the conversions table exists and already carries the index."""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("conversions"):
+        return True
+    return any(index["name"] == INDEX_NAME for index in inspector.get_indexes("conversions"))
+
+
+def upgrade() -> None:
+    if not _has_index():
+        op.create_index(INDEX_NAME, "conversions", ["user_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("conversions") and any(
+        index["name"] == INDEX_NAME for index in inspector.get_indexes("conversions")
+    ):
+        op.drop_index(INDEX_NAME, table_name="conversions")
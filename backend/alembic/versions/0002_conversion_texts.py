@@ -0,0 +1,155 @@
+"""Move conversion text into the compressed, deduplicated conversion_texts table
+
+Existing conversions.text_content values are hashed, compressed and stored
+once per distinct text; conversions keep a text_id and a short
+text_preview, and the inline column is dropped. Databases without the
+conversions table are left to create_all.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Dict, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import CONVERSION_PREVIEW_CHARS
+from app.services.text_store import compress_text, decompress_text, text_hash
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Conversions moved per round trip
+BATCH_SIZE = 500
+
+FOREIGN_KEY_NAME = "fk_conversions_text_id_conversion_texts"
+
+conversions = sa.table(
+    "conversions",
+    sa.column("id", sa.Integer),
+    sa.column("text_content", sa.Text),
+    sa.column("text_id", sa.Integer),
+    sa.column("text_preview", sa.String),
+)
+
+# A full Table, so inserts report the new primary key
+conversion_texts = sa.Table(
+    "conversion_texts",
+    sa.MetaData(),
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("content_hash", sa.String),
+    sa.Column("codec", sa.String),
+    sa.Column("size_bytes", sa.Integer),
+    sa.Column("data", sa.LargeBinary),
+    sa.Column("ref_count", sa.Integer),
+)
+
+
+def _columns(inspector, table: str) -> set:
+    return {column["name"] for column in inspector.get_columns(table)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("conversions"):
+        return
+    if not inspector.has_table("conversion_texts"):
+        op.create_table(
+            "conversion_texts",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("content_hash", sa.String()),
+            sa.Column("codec", sa.String()),
+            sa.Column("size_bytes", sa.Integer()),
+            sa.Column("data", sa.LargeBinary()),
+            sa.Column("ref_count", sa.Integer()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_conversion_texts_id", "conversion_texts", ["id"])
+        op.create_index("ix_conversion_texts_content_hash", "conversion_texts", ["content_hash"], unique=True)
+
+    columns = _columns(inspector, "conversions")
+    if "text_content" not in columns:
+        return
+    if "text_id" not in columns:
+        op.add_column("conversions", sa.Column("text_id", sa.Integer(), nullable=True))
+        op.add_column("conversions", sa.Column("text_preview", sa.String(), nullable=True))
+
+    # Texts already stored, by hash, with the references added by this migration
+    ids_by_hash: Dict[str, int] = dict(
+        bind.execute(sa.select(conversion_texts.c.content_hash, conversion_texts.c.id)).all()
+    )
+    added_refs: Dict[int, int] = {}
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(conversions.c.id, conversions.c.text_content)
+            .where(conversions.c.id > last_id)
+            .order_by(conversions.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for row in rows:
+            if not row.text_content:
+                continue
+            content_hash = text_hash(row.text_content)
+            text_id = ids_by_hash.get(content_hash)
+            if text_id is None:
+                codec, data = compress_text(row.text_content)
+                text_id = bind.execute(
+                    conversion_texts.insert().values(
+                        content_hash=content_hash, codec=codec,
+                        size_bytes=len(row.text_content.encode("utf-8")), data=data, ref_count=0
+                    )
+                ).inserted_primary_key[0]
+                ids_by_hash[content_hash] = text_id
+            added_refs[text_id] = added_refs.get(text_id, 0) + 1
+            bind.execute(
+                conversions.update().where(conversions.c.id == row.id).values(
+                    text_id=text_id, text_preview=row.text_content[:CONVERSION_PREVIEW_CHARS]
+                )
+            )
+    for text_id, refs in added_refs.items():
+        bind.execute(
+            conversion_texts.update().where(conversion_texts.c.id == text_id).values(
+                ref_count=conversion_texts.c.ref_count + refs
+            )
+        )
+
+    # One table rebuild on SQLite for both changes
+    with op.batch_alter_table("conversions") as batch:
+        batch.drop_column("text_content")
+        batch.create_foreign_key(FOREIGN_KEY_NAME, "conversion_texts", ["text_id"], ["id"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("conversions") or "text_id" not in _columns(inspector, "conversions"):
+        return
+    with op.batch_alter_table("conversions") as batch:
+        batch.add_column(sa.Column("text_content", sa.Text(), nullable=True))
+
+    rows = bind.execute(
+        sa.select(conversions.c.id, conversion_texts.c.codec, conversion_texts.c.data)
+        .select_from(conversions.join(conversion_texts, conversions.c.text_id == conversion_texts.c.id))
+    )
+    for row in rows.all():
+        bind.execute(
+            conversions.update().where(conversions.c.id == row.id).values(
+                text_content=decompress_text(row.codec, row.data)
+            )
+        )
+
+    with op.batch_alter_table("conversions") as batch:
+        batch.drop_column("text_preview")
+        batch.drop_column("text_id")
+    op.drop_table("conversion_texts")
@@ -0,0 +1,36 @@
+"""Full-text search index of conversions
+
+Creates the conversion_search index (FTS5 on SQLite, a tsvector table on
+Postgres) and fills it from the stored conversions. Databases without the
+conversions table are left to create_all and the application startup.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.crud.conversion_search import conversion_search
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("conversions"):
+        return
+    # Rebuilding is idempotent, and covers an index created empty at startup
+    conversion_search.rebuild(bind)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS conversion_search")
@@ -1,18 +1,18 @@
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.user import User
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.core.token_cache import UserSnapshot
 from app.models.conversion import Conversion
 from app.core.auth import get_current_active_user
 from app.crud.conversion import conversion
 
-def get_conversion_by_id(
+async def get_conversion_by_id(
     conversion_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user),
 ) -> Conversion:
     """Get a conversion by ID if it belongs to the current user."""
-    conv = conversion.get(db, conversion_id)
+    conv = await conversion.aget(db, conversion_id)
     if not conv:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
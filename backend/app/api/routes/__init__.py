@@ -1,4 +1,7 @@
 # Import routers
 from app.api.routes.auth import router as auth_router
 from app.api.routes.users import router as users_router
-from app.api.routes.convert import router as convert_router
\ No newline at end of file
+from app.api.routes.convert import router as convert_router
+from app.api.routes.health import router as health_router
+from app.api.routes.jobs import router as jobs_router
+from app.api.routes.metrics import router as metrics_router
\ No newline at end of file
@@ -1,45 +1,45 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.security import create_access_token
-from app.crud.user import user, authenticate_user
-from app.database import get_db
+from app.crud.user import user
+from app.database import get_async_db
 from app.schemas.user import Token, UserCreate, User as UserSchema
 router = APIRouter()
 
 @router.post("/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
-def register_user(
+async def register_user(
     user_in: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Register a new user."""
     # Check if user with same email exists
-    db_user = user.get_by_email(db, email=user_in.email)
+    db_user = await user.aget_by_email(db, email=user_in.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     # Check if user with same username exists
-    db_user = user.get_by_username(db, username=user_in.username)
+    db_user = await user.aget_by_username(db, username=user_in.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
     # Create new user
-    return user.create(db, obj_in=user_in)
+    return await user.acreate(db, obj_in=user_in)
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get an access token for authentication."""
     # Authenticate user
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+    db_user = await user.aauthenticate(db, username=form_data.username, password=form_data.password)
+    if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -47,6 +47,6 @@ def login_for_access_token(
         )
     # Create access token
     access_token = create_access_token(
-        subject=user.username
+        subject=db_user.username
     )
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
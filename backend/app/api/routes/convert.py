@@ -1,40 +1,126 @@
 import os
-from typing import List
+import logging
+import anyio
+from typing import AsyncIterator, List, Optional
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File, Form, status
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.dependencies import get_conversion_by_id
 from app.core.auth import get_current_active_user
+from app.core.file_serving import is_not_modified, serve_file
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.uploads import save_upload, remove_upload
 from app.crud.conversion import conversion
 from app.crud.conversion import conversion as conversion_crud
-from app.database import get_db
-from app.models.user import User
-from app.schemas.conversion import Conversion, TextToSpeechRequest
-from app.services.ocr_service import pdf_to_text, image_to_text
-from app.services.tts_service import text_to_audio
-from app.config import UPLOAD_DIR
+from app.crud.conversion_search import conversion_search, make_snippet, search_terms
+from app.crud.conversion_text import conversion_text
+from app.database import get_async_db, AsyncSessionLocal
+from app.core.token_cache import UserSnapshot
+from app.schemas.conversion import BatchItemResult, Conversion, ConversionSearchResult, ConversionSummary, TextToSpeechRequest, TextConversionRequest
+from app.services.inference import pdf_to_text, image_to_text, stream_text_to_audio
+from app.services.audio_writer import new_audio_path
+from app.services.audio_encoder import AudioOptions, AudioEncodingError, audio_options, format_of, media_type_for
+from app.services.audio_variants import variant_store
+from app.services.text_store import iter_text_chunks
+from app.services.audio_cache import get_or_synthesize, audio_cache_key, register_audio, release_audio
+from app.crud.audio_artifact import audio_artifact
+from app.services.batch import BatchUpload, count_documents, is_archive, run_batch, source_type_of
+from app.config import (
+    UPLOAD_DIR, CONVERSION_PAGE_MAX, SEARCH_PAGE_MAX, SEARCH_QUERY_MAX_CHARS,
+    BATCH_MAX_ITEMS, BATCH_MAX_UPLOAD_BYTES, MAX_UPLOAD_BYTES
+)
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _audio_options(
+    format: Optional[str], sample_rate: Optional[int], bit_depth: Optional[int]
+) -> AudioOptions:
+    """Validate requested output settings, answering 400 for unsupported ones."""
+    try:
+        return audio_options(format, sample_rate, bit_depth)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+async def _record_conversion(db: AsyncSession, *, obj_in: dict, user_id: int, audio_file_path: Path):
+    """Record a conversion of audio from get_or_synthesize, handing its reference back if that fails."""
+    try:
+        return await conversion.acreate_with_owner(
+            db=db, obj_in=obj_in, user_id=user_id, audio_file_path=str(audio_file_path)
+        )
+    except BaseException:
+        with anyio.CancelScope(shield=True):
+            await db.rollback()
+        await release_audio(audio_file_path)
+        raise
+
+async def _stream_and_record(
+    text: str, lang: str, speaker, obj_in: dict, user_id: int
+) -> AsyncIterator[bytes]:
+    """Stream synthesized audio, then record the conversion once the file is complete."""
+    key = audio_cache_key(text, lang, speaker)
+    # Sessions are only open around queries, not while audio is streaming
+    async with AsyncSessionLocal() as db:
+        artifact = await audio_artifact.aacquire_by_hash(db, content_hash=key)
+    if artifact is not None:
+        # Identical audio already exists, send the stored file instead; the
+        # reference taken keeps it from being deleted while it is sent
+        audio_file_path = Path(artifact.file_path)
+        try:
+            async with await anyio.open_file(audio_file_path, "rb") as f:
+                while chunk := await f.read(64 * 1024):
+                    yield chunk
+        except BaseException:
+            await release_audio(audio_file_path)
+            raise
+    else:
+        audio_file_path = new_audio_path(lang)
+        try:
+            async for chunk in stream_text_to_audio(text, lang, audio_file_path, speaker):
+                yield chunk
+        except Exception as e:
+            # Headers are already sent, so the client only sees a truncated stream
+            logger.error(f"Streaming conversion failed: {e}")
+            return
+        async with AsyncSessionLocal() as db:
+            audio_file_path, _ = await register_audio(db, key, audio_file_path)
+    async with AsyncSessionLocal() as db:
+        await _record_conversion(
+            db,
+            obj_in={**obj_in, "file_name": obj_in.get("file_name") or f"text_input_{audio_file_path.stem}"},
+            user_id=user_id,
+            audio_file_path=audio_file_path
+        )
+
+def _streaming_audio_response(stream: AsyncIterator[bytes]) -> StreamingResponse:
+    """Wrap a progressive WAV stream in a chunked HTTP response."""
+    return StreamingResponse(
+        stream,
+        media_type="audio/wav",
+        headers={"Content-Disposition": "inline", "Cache-Control": "no-store"}
+    )
 
 @router.post("/pdf", response_model=Conversion, status_code=status.HTTP_201_CREATED)
 async def convert_pdf_to_audio(
     file: UploadFile = File(...),
     language: str = Form("en"),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    format: Optional[str] = Form(None),
+    sample_rate: Optional[int] = Form(None),
+    bit_depth: Optional[int] = Form(None),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Convert a PDF file to audio with optional language selection."""
+    """Convert a PDF file to audio with optional language and output format selection."""
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are accepted")
-    file_path = UPLOAD_DIR / file.filename
+    options = _audio_options(format, sample_rate, bit_depth)
+    upload = await save_upload(file, UPLOAD_DIR)
     try:
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
-        full_text, lang = await pdf_to_text(file_path, language)
-        audio_file_path = await text_to_audio(full_text, lang)
-        conv = conversion.create_with_owner(
-            db=db,
+        full_text, lang = await pdf_to_text(upload.path, language, upload.sha256)
+        audio_file_path, _ = await get_or_synthesize(db, full_text, lang, options=options)
+        conv = await _record_conversion(
+            db,
             obj_in={
                 "file_name": file.filename,
                 "language": lang,
@@ -42,38 +128,38 @@ async def convert_pdf_to_audio(
                 "text_content": full_text
             },
             user_id=current_user.id,
-            audio_file_path=str(audio_file_path)
+            audio_file_path=audio_file_path
         )
         return conv
     except Exception as e:
         raise HTTPException(500, detail=f"Error in conversion process: {str(e)}")
     finally:
-        if file_path.exists():
-            os.unlink(file_path)
+        await remove_upload(upload.path)
 
 
 @router.post("/image", response_model=Conversion, status_code=status.HTTP_201_CREATED)
 async def convert_image_to_audio(
     file: UploadFile = File(...),
     language: str = Form("en"),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    format: Optional[str] = Form(None),
+    sample_rate: Optional[int] = Form(None),
+    bit_depth: Optional[int] = Form(None),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Convert an image file to audio with optional language selection."""
+    """Convert an image file to audio with optional language and output format selection."""
     allowed_exts = (".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp")
     if not any(file.filename.lower().endswith(ext) for ext in allowed_exts):
         raise HTTPException(400, detail=f"Only image files {', '.join(allowed_exts)} are accepted")
-    file_path = UPLOAD_DIR / file.filename
+    options = _audio_options(format, sample_rate, bit_depth)
+    upload = await save_upload(file, UPLOAD_DIR)
     try:
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
-        text, lang = await image_to_text(file_path, language)
+        text, lang = await image_to_text(upload.path, language, upload.sha256)
         if not text:
             raise HTTPException(422, detail="Could not extract text from the image")
-        audio_file_path = await text_to_audio(text, lang)
-        conv = conversion.create_with_owner(
-            db=db,
+        audio_file_path, _ = await get_or_synthesize(db, text, lang, options=options)
+        conv = await _record_conversion(
+            db,
             obj_in={
                 "file_name": file.filename,
                 "language": lang,
@@ -81,7 +167,7 @@ async def convert_image_to_audio(
                 "text_content": text
             },
             user_id=current_user.id,
-            audio_file_path=str(audio_file_path)
+            audio_file_path=audio_file_path
         )
         return conv
     except HTTPException:
@@ -89,22 +175,24 @@ async def convert_image_to_audio(
     except Exception as e:
         raise HTTPException(500, detail=f"Error in conversion process: {str(e)}")
     finally:
-        if file_path.exists():
-            os.unlink(file_path)
+        await remove_upload(upload.path)
 
 @router.post("/text", response_model=Conversion, status_code=status.HTTP_201_CREATED)
 async def convert_text_to_audio(
-    request: TextToSpeechRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    request: TextConversionRequest,
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Convert text to audio."""
+    options = _audio_options(request.format, request.sample_rate, request.bit_depth)
     try:
         # Generate audio from text
-        audio_file_path = await text_to_audio(request.text, request.language)
+        audio_file_path, _ = await get_or_synthesize(
+            db, request.text, request.language, request.speaker, options=options
+        )
         # Create conversion record
-        conv = conversion.create_with_owner(
-            db=db,
+        conv = await _record_conversion(
+            db,
             obj_in={
                 "file_name": f"text_input_{audio_file_path.stem}",
                 "language": request.language,
@@ -112,7 +200,7 @@ async def convert_text_to_audio(
                 "text_content": request.text
             },
             user_id=current_user.id,
-            audio_file_path=str(audio_file_path)
+            audio_file_path=audio_file_path
         )
         return conv
     except Exception as e:
@@ -121,94 +209,299 @@ async def convert_text_to_audio(
             detail=f"Error in conversion process: {str(e)}"
         )
 
-@router.get("", response_model=List[Conversion])
-def list_conversions(
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+@router.post("/text/stream")
+async def stream_text_to_audio_response(
+    request: TextToSpeechRequest,
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Convert text to audio, streaming it while it is synthesized."""
+    obj_in = {
+        "file_name": None,
+        "language": request.language,
+        "source_type": "text",
+        "text_content": request.text
+    }
+    return _streaming_audio_response(
+        _stream_and_record(request.text, request.language, request.speaker, obj_in, current_user.id)
+    )
+
+@router.post("/pdf/stream")
+async def stream_pdf_to_audio(
+    file: UploadFile = File(...),
+    language: str = Form("en"),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Convert a PDF file to audio, streaming it while it is synthesized."""
+    if not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are accepted")
+    upload = await save_upload(file, UPLOAD_DIR)
+    try:
+        full_text, lang = await pdf_to_text(upload.path, language, upload.sha256)
+    except Exception as e:
+        raise HTTPException(500, detail=f"Error in conversion process: {str(e)}")
+    finally:
+        await remove_upload(upload.path)
+    obj_in = {
+        "file_name": file.filename,
+        "language": lang,
+        "source_type": "pdf",
+        "text_content": full_text
+    }
+    return _streaming_audio_response(
+        _stream_and_record(full_text, lang, None, obj_in, current_user.id)
+    )
+
+@router.post("/batch")
+async def convert_batch(
+    files: List[UploadFile] = File(..., description="PDF and image files, or ZIP archives of them"),
+    language: str = Form("en"),
+    format: Optional[str] = Form(None),
+    sample_rate: Optional[int] = Form(None),
+    bit_depth: Optional[int] = Form(None),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Convert many documents in one request, streaming one JSON status line per document.
+
+    Lines are BatchItemResult objects; a failed document does not stop the
+    others.
+    """
+    options = _audio_options(format, sample_rate, bit_depth)
+    uploads: List[BatchUpload] = []
+    try:
+        for file in files:
+            if is_archive(file.filename):
+                # Entries are held to MAX_UPLOAD_BYTES each when they are extracted
+                upload = await save_upload(file, UPLOAD_DIR, BATCH_MAX_UPLOAD_BYTES)
+            elif source_type_of(file.filename) is not None:
+                upload = await save_upload(file, UPLOAD_DIR, MAX_UPLOAD_BYTES)
+            else:
+                upload = None
+            uploads.append(BatchUpload(file.filename, upload))
+        count = await run_in_threadpool(count_documents, uploads)
+        if count > BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Batch has {count} documents, the limit is {BATCH_MAX_ITEMS}"
+            )
+    except BaseException:
+        for upload in uploads:
+            if upload.upload is not None:
+                await remove_upload(upload.upload.path)
+        raise
+
+    async def lines() -> AsyncIterator[bytes]:
+        results = run_batch(
+            uploads, language=language, options=options, user_id=current_user.id, directory=UPLOAD_DIR
+        )
+        async for result in results:
+            yield BatchItemResult(**result).model_dump_json().encode("utf-8") + b"\n"
+
+    # Uploads are on disk already: FastAPI closes the request's files before the body is streamed
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Cache-Control": "no-store"})
+
+# Optional fields a client can ask the history list to include
+LIST_FIELDS = {"text_content"}
+
+@router.get("", response_model=List[ConversionSummary])
+async def list_conversions(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=CONVERSION_PAGE_MAX),
+    fields: Optional[str] = Query(None, description="Comma-separated extra fields: 'text_content'"),
+    skip: int = Query(0, ge=0, description="Deprecated offset, ignored with a cursor"),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all conversions for the current user."""
-    return conversion.get_multi_by_owner(
-        db, user_id=current_user.id, skip=skip, limit=limit
+    """List the current user's conversions, newest first, one page at a time."""
+    requested = {name.strip() for name in fields.split(",") if name.strip()} if fields else set()
+    unknown = requested - LIST_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # One extra row tells whether another page follows
+    rows = await conversion.aget_page_by_owner(
+        db,
+        user_id=current_user.id,
+        limit=limit + 1,
+        after=after,
+        skip=skip,
+        with_text="text_content" in requested
     )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return rows
+
+@router.get("/search", response_model=List[ConversionSearchResult])
+async def search_conversions(
+    q: str = Query(..., min_length=1, max_length=SEARCH_QUERY_MAX_CHARS, description="Words to find"),
+    limit: int = Query(20, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Search the current user's conversions by file name and text, best matches first."""
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query has no words"
+        )
+    ranked = await conversion_search.asearch(
+        db, user_id=current_user.id, query=q, limit=limit, offset=offset
+    )
+    rows = await conversion_crud.aget_summaries(
+        db, user_id=current_user.id, ids=[conversion_id for conversion_id, _ in ranked]
+    )
+    # Only the texts of this page are decompressed for snippets
+    texts = await conversion_text.aget_contents(
+        db, ids=[row["text_id"] for row in rows.values() if row["text_id"] is not None]
+    )
+    results = []
+    for conversion_id, rank in ranked:
+        row = rows.get(conversion_id)
+        if row is None:
+            continue
+        results.append({**row, "rank": rank})
+    snippets = await run_in_threadpool(
+        lambda: [make_snippet(texts.get(row["text_id"]), terms) for row in results]
+    )
+    for row, snippet in zip(results, snippets):
+        row["snippet"] = snippet
+    return results
 
 @router.get("/{conversion_id}", response_model=Conversion)
-def get_conversion(
-    conversion: Conversion = Depends(get_conversion_by_id)
+async def get_conversion(
+    conversion: Conversion = Depends(get_conversion_by_id),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get a specific conversion."""
-    return conversion
+    """Get a specific conversion with its full text."""
+    return await conversion_crud.aload_text(db, conv=conversion)
+
+@router.get("/{conversion_id}/text")
+async def download_text(
+    request: Request,
+    conversion: Conversion = Depends(get_conversion_by_id),
+    db: AsyncSession = Depends(get_async_db),
+    inline: bool = False
+):
+    """Download the text of a conversion, decompressing it while it is sent."""
+    stored = (await conversion_crud.aload_text(db, conv=conversion)).text
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversion has no text"
+        )
+    etag = f'"{stored.content_hash}"'
+    modified = stored.created_at.timestamp() if stored.created_at else 0
+    if is_not_modified(request.headers, etag, modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    clean_filename = f"{conversion.file_name}_{conversion.id}.txt"
+    return StreamingResponse(
+        # A sync iterator, so Starlette decompresses in its threadpool
+        iter_text_chunks(stored.codec, stored.data),
+        media_type="text/plain",
+        headers={
+            "Content-Disposition": f"{'inline' if inline else 'attachment'}; filename={clean_filename}",
+            "Content-Length": str(stored.size_bytes),
+            "ETag": etag
+        }
+    )
+
+async def _content_hash(db: AsyncSession, file_path: Path):
+    """Hash of the synthesis a stored audio file came from, if it is tracked."""
+    artifact = await audio_artifact.aget_by_path(db, file_path=str(file_path))
+    return artifact.content_hash if artifact is not None else None
 
 @router.get("/{conversion_id}/download")
-def download_audio(
+async def download_audio(
+    request: Request,
     conversion: Conversion = Depends(get_conversion_by_id),
-    inline: bool = False 
+    db: AsyncSession = Depends(get_async_db),
+    inline: bool = False,
+    format: Optional[str] = None,
+    sample_rate: Optional[int] = None,
+    bit_depth: Optional[int] = None
 ):
-    """Download or stream the audio file for a conversion."""
+    """Download or stream the audio file for a conversion, optionally transcoded."""
     file_path = Path(conversion.audio_file_path)
     if not file_path.exists():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Audio file not found"
         )
-    # Determine media type based on file extension
-    media_type = "audio/wav"  # default
-    if file_path.suffix.lower() == ".mp3":
-        media_type = "audio/mpeg"
-    elif file_path.suffix.lower() == ".ogg":
-        media_type = "audio/ogg"
-    elif file_path.suffix.lower() == ".m4a":
-        media_type = "audio/mp4"
+    content_hash = await _content_hash(db, file_path)
+    variant = None
+    if format or sample_rate or bit_depth:
+        # Settings left out keep those of the stored file
+        options = _audio_options(format or format_of(file_path), sample_rate, bit_depth)
+        if options != AudioOptions(format_of(file_path) or ""):
+            try:
+                file_path = await variant_store.get(file_path, options)
+                variant = options.name
+            except AudioEncodingError as e:
+                logger.error(f"Could not transcode {file_path.name}: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Audio could not be transcoded"
+                )
     # Generate a clean filename
     clean_filename = f"{conversion.file_name}_{conversion.id}{file_path.suffix}"
-    return FileResponse(
+    return await serve_file(
+        request,
         file_path,
-        media_type=media_type,
-        filename=clean_filename,
+        media_type_for(file_path),
+        content_hash=content_hash,
+        variant=variant,
         # Use inline for streaming in browser, attachment for download
         headers={"Content-Disposition": f"{'inline' if inline else 'attachment'}; filename={clean_filename}"}
     )
 
 @router.get("/{conversion_id}/stream")
-def stream_audio(
-    conversion: Conversion = Depends(get_conversion_by_id)
+async def stream_audio(
+    request: Request,
+    conversion: Conversion = Depends(get_conversion_by_id),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Stream audio file for web players."""
+    """Stream audio file for web players, answering range and conditional requests."""
     file_path = Path(conversion.audio_file_path)
     if not file_path.exists():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Audio file not found"
         )
-    # Determine media type
-    media_type = "audio/wav"
-    if file_path.suffix.lower() == ".mp3":
-        media_type = "audio/mpeg"
-    elif file_path.suffix.lower() == ".ogg":
-        media_type = "audio/ogg"
-    elif file_path.suffix.lower() == ".m4a":
-        media_type = "audio/mp4"
-    return FileResponse(
+    return await serve_file(
+        request,
         file_path,
-        media_type=media_type,
+        media_type_for(file_path),
+        content_hash=await _content_hash(db, file_path),
         headers={
             "Content-Disposition": "inline",
-            "Accept-Ranges": "bytes",  # Enable range requests for better streaming
             "Cache-Control": "public, max-age=3600"  # Cache for 1 hour
         }
     )
 
+def _remove_audio(path: str):
+    """Delete an audio file no conversion uses any more, with its variants."""
+    if os.path.exists(path):
+        os.unlink(path)
+    variant_store.remove(path)
+
 @router.delete("/{conversion_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_conversion(
+async def delete_conversion(
     conversion: Conversion = Depends(get_conversion_by_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a conversion and its audio file."""
-    # Delete audio file
-    file_path = Path(conversion.audio_file_path)
-    if file_path.exists():
-        os.unlink(file_path)
-    # Delete conversion record
-    conversion_crud.remove(db, id=conversion.id)
+    # Delete conversion record, keeping audio that other conversions still share
+    unreferenced_path = await conversion_crud.aremove_with_audio(db, id=conversion.id)
+    # Delete audio file and its transcoded variants
+    if unreferenced_path:
+        await run_in_threadpool(_remove_audio, unreferenced_path)
     return None
\ No newline at end of file
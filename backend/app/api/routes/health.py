@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Response, status
+from app.core.startup import startup_report
+from app.core.token_cache import token_cache
+from app.services import inference
+from app.services.audio_variants import variant_store
+router = APIRouter()
+
+@router.get("/live")
+async def liveness():
+    """Report that the process is serving; never touches the inference stack."""
+    return {"status": "alive", "uptime_seconds": round(startup_report.uptime(), 3)}
+
+@router.get("/ready")
+async def readiness(response: Response):
+    """Report whether the inference stack is imported and the configured models are loaded."""
+    report = await inference.backend.status()
+    if not report["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ready" if report["ready"] else "warming",
+        "backend": report["backend"],
+        "inference": report.get("inference"),
+        "tts": report.get("tts"),
+        "ocr": report.get("ocr"),
+    }
+
+@router.get("/stats")
+async def cache_stats():
+    """Report model registry, OCR result cache, audio variant store and auth cache counters, and startup timings."""
+    report = await inference.backend.status()
+    return {
+        "tts": report.get("tts"),
+        "ocr": report.get("ocr"),
+        "ocr_page_cache": report.get("ocr_page_cache"),
+        "ocr_preprocess": report.get("ocr_preprocess"),
+        "audio_variants": variant_store.stats(),
+        "auth_cache": token_cache.stats(),
+        "startup": startup_report.summary(),
+    }
@@ -0,0 +1,134 @@
+import os
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from sqlalchemy.orm import Session
+from app.core.auth import get_current_active_user
+from app.core.uploads import save_upload, remove_upload
+from app.crud.job import job as job_crud
+from app.database import get_db
+from app.models.job import Job as JobModel, JOB_FINISHED
+from app.core.token_cache import UserSnapshot
+from app.schemas.conversion import TextToSpeechRequest
+from app.schemas.job import Job
+from app.config import JOB_UPLOAD_DIR
+router = APIRouter()
+
+# Accepted upload extensions per source type
+allowed_exts = {
+    "pdf": (".pdf",),
+    "image": (".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"),
+}
+
+def get_job_by_id(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+) -> JobModel:
+    """Get a job by ID if it belongs to the current user."""
+    db_job = job_crud.get(db, job_id)
+    if not db_job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    if db_job.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return db_job
+
+async def _queue_upload(
+    file: UploadFile, source_type: str, language: str, user_id: int, db: Session
+) -> JobModel:
+    """Store an upload where the workers can read it and queue its job."""
+    exts = allowed_exts[source_type]
+    if not file.filename.lower().endswith(exts):
+        raise HTTPException(400, detail=f"Only {', '.join(exts)} files are accepted")
+    upload = await save_upload(file, JOB_UPLOAD_DIR)
+    try:
+        return job_crud.create_with_owner(
+            db,
+            obj_in={
+                "source_type": source_type,
+                "file_name": file.filename,
+                "language": language,
+                "input_path": str(upload.path),
+                "content_hash": upload.sha256
+            },
+            user_id=user_id
+        )
+    except Exception:
+        await remove_upload(upload.path)
+        raise
+
+@router.post("/pdf", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def queue_pdf_conversion(
+    file: UploadFile = File(...),
+    language: str = Form("en"),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Queue a PDF file for conversion to audio."""
+    return await _queue_upload(file, "pdf", language, current_user.id, db)
+
+@router.post("/image", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def queue_image_conversion(
+    file: UploadFile = File(...),
+    language: str = Form("en"),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Queue an image file for conversion to audio."""
+    return await _queue_upload(file, "image", language, current_user.id, db)
+
+@router.post("/text", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+def queue_text_conversion(
+    request: TextToSpeechRequest,
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Queue text for conversion to audio."""
+    return job_crud.create_with_owner(
+        db,
+        obj_in={
+            "source_type": "text",
+            "language": request.language,
+            "speaker": request.speaker,
+            "text_content": request.text
+        },
+        user_id=current_user.id
+    )
+
+@router.get("", response_model=List[Job])
+def list_jobs(
+    skip: int = 0,
+    limit: int = 100,
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """List the current user's jobs, newest first."""
+    return job_crud.get_multi_by_owner(db, user_id=current_user.id, skip=skip, limit=limit)
+
+@router.get("/{job_id}", response_model=Job)
+def get_job(
+    job: JobModel = Depends(get_job_by_id)
+):
+    """Get the status and progress of a job."""
+    return job
+
+@router.post("/{job_id}/cancel", response_model=Job)
+def cancel_job(
+    job: JobModel = Depends(get_job_by_id),
+    db: Session = Depends(get_db)
+):
+    """Cancel a queued or running job."""
+    if job.status in JOB_FINISHED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job already {job.status}"
+        )
+    job = job_crud.cancel(db, job=job)
+    if job.status in JOB_FINISHED and job.input_path and os.path.exists(job.input_path):
+        os.unlink(job.input_path)
+    return job
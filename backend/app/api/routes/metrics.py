@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Response
+from app.core.metrics import CONTENT_TYPE, merge, registry, render
+from app.services import inference
+router = APIRouter()
+
+@router.get("/metrics")
+async def metrics():
+    """Metrics of this process, and of the inference sidecar if there is one, in Prometheus text format."""
+    families = merge(registry.collect(), await inference.backend.metrics(), {"process": "sidecar"})
+    return Response(render(families), media_type=CONTENT_TYPE)
@@ -1,7 +1,6 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-import torch
 
 # Load environment variables from .env file
 load_dotenv()
@@ -17,23 +16,194 @@ APP_NAME = "Realistic Audio Generator"
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-for-development")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Seconds a verified token is trusted without looking its user up again, 0 disables the cache
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+# Verified tokens cached per process
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 10000))
 
 # Database settings
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+# URL used by the async engine, derived from DATABASE_URL (aiosqlite/asyncpg) when unset
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
+# Connection pool of each engine
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# Seconds after which pooled connections are replaced, -1 keeps them forever
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+# Test pooled server-database connections before handing them out
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# SQLite pragmas applied to every connection; WAL lets readers run alongside a writer
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# How long a writer waits for the database lock before failing
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+# Bytes of the database file read through mmap, 0 disables it
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", 256 * 1024 ** 2))
 
 # File storage
 UPLOAD_DIR = BASE_DIR / "temp" / "uploads"
 AUDIO_DIR = BASE_DIR / "temp" / "audio"
 
+# Largest accepted upload, bigger ones are rejected with 413; 0 disables the limit
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 200 * 1024 ** 2))
+
+# Uploads waiting for a background worker, must be shared with the workers
+JOB_UPLOAD_DIR = Path(os.getenv("JOB_UPLOAD_DIR", UPLOAD_DIR / "jobs"))
+
 # Ensure directories exist
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+JOB_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+# OCR settings
+# Memory budget for cached easyocr readers, 0 disables eviction
+OCR_READER_CACHE_BYTES = int(os.getenv("OCR_READER_CACHE_BYTES", 2 * 1024 ** 3))
+# Size assumed for a reader whose weights cannot be measured
+OCR_READER_DEFAULT_BYTES = int(os.getenv("OCR_READER_DEFAULT_BYTES", 200 * 1024 ** 2))
+# Comma-separated languages whose readers are loaded at startup, e.g. "en,bn"
+OCR_PRELOAD_LANGUAGES = [
+    lang.strip() for lang in os.getenv("OCR_PRELOAD_LANGUAGES", "").split(",") if lang.strip()
+]
+
+# On-disk cache of OCR results per page
+OCR_CACHE_DIR = Path(os.getenv("OCR_CACHE_DIR", BASE_DIR / "temp" / "ocr_cache"))
+# Size budget of the OCR cache, least recently used pages are evicted beyond it
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", 512 * 1024 ** 2))
+
+# Worker processes for PDF page OCR, each with its own reader; 0 runs on threads
+OCR_PAGE_WORKERS = int(os.getenv("OCR_PAGE_WORKERS", 0))
+# Page batches processed at once per document, bounds memory on long PDFs
+OCR_PAGE_CONCURRENCY = int(os.getenv("OCR_PAGE_CONCURRENCY", max(1, OCR_PAGE_WORKERS) * 2))
+# Pages handed to a worker in one task, also the window whose images are OCR'd together
+OCR_PAGE_BATCH_SIZE = max(1, int(os.getenv("OCR_PAGE_BATCH_SIZE", 8)))
+# Images run through detection and recognition in one batch
+OCR_BATCH_SIZE = max(1, int(os.getenv("OCR_BATCH_SIZE", 8)))
+# Padded pixels allowed in one batch, bounds memory for large images
+OCR_BATCH_MAX_PIXELS = int(os.getenv("OCR_BATCH_MAX_PIXELS", 16 * 1024 ** 2))
+# Images whose sizes round up to the same multiple of this are batched together
+OCR_BATCH_SIZE_STEP = max(1, int(os.getenv("OCR_BATCH_SIZE_STEP", 64)))
+
+# Downscale and contrast-normalize images before OCR
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "true").lower() in ("1", "true", "yes")
+# Largest image, in pixels, kept in memory for OCR; bigger ones are decoded or scaled down
+OCR_MAX_IMAGE_PIXELS = int(os.getenv("OCR_MAX_IMAGE_PIXELS", 8 * 1024 ** 2))
+# Text line height, in pixels, that images are downscaled towards
+OCR_TARGET_TEXT_HEIGHT = int(os.getenv("OCR_TARGET_TEXT_HEIGHT", 40))
+# Images larger than this on either side are OCR'd in overlapping tiles
+OCR_TILE_SIZE = int(os.getenv("OCR_TILE_SIZE", 2560))
+OCR_TILE_OVERLAP = int(os.getenv("OCR_TILE_OVERLAP", 160))
+# OCR engine: "easyocr", "tesseract", or "tiered" to run Tesseract first and redo
+# with easyocr the regions it is unsure of; falls back to easyocr without Tesseract
+OCR_ENGINE = os.getenv("OCR_ENGINE", "easyocr").lower()
+# Mean confidence, 0 to 1, below which a region read by Tesseract is read again by easyocr
+OCR_TIER_MIN_CONFIDENCE = float(os.getenv("OCR_TIER_MIN_CONFIDENCE", 0.8))
+# Tesseract executable and how long it may take for one image
+TESSERACT_BINARY = os.getenv("TESSERACT_BINARY", "tesseract")
+TESSERACT_TIMEOUT_SECONDS = float(os.getenv("TESSERACT_TIMEOUT_SECONDS", 60))
+
+# TTS settings
+# Memory budget for cached TTS models, 0 disables eviction
+TTS_MODEL_CACHE_BYTES = int(os.getenv("TTS_MODEL_CACHE_BYTES", 4 * 1024 ** 3))
+# Size assumed for a model whose weights cannot be measured
+TTS_MODEL_DEFAULT_BYTES = int(os.getenv("TTS_MODEL_DEFAULT_BYTES", 300 * 1024 ** 2))
+# Copies of each model kept loaded so requests can synthesize concurrently
+TTS_MODEL_REPLICAS = int(os.getenv("TTS_MODEL_REPLICAS", 1))
+# Intra-op threads of torch in this process, set once before models load; 0 keeps torch's default.
+# By default several replicas share the cores instead of oversubscribing them
+TORCH_NUM_THREADS = int(os.getenv(
+    "TORCH_NUM_THREADS", max(1, (os.cpu_count() or 1) // TTS_MODEL_REPLICAS) if TTS_MODEL_REPLICAS > 1 else 0
+))
+# Comma-separated languages whose models are loaded at startup, e.g. "en,de,fr,es"
+TTS_PRELOAD_LANGUAGES = [
+    lang.strip() for lang in os.getenv("TTS_PRELOAD_LANGUAGES", "").split(",") if lang.strip()
+]
+# Longest text segment handed to the synthesizer in one call
+TTS_MAX_SEGMENT_CHARS = int(os.getenv("TTS_MAX_SEGMENT_CHARS", 250))
+# Segments synthesized ahead of the one being written, bounds memory per request
+TTS_SEGMENT_WINDOW = int(os.getenv("TTS_SEGMENT_WINDOW", 2 * TTS_MODEL_REPLICAS))
+# Silence inserted between segments in the assembled audio
+TTS_SEGMENT_SILENCE_MS = int(os.getenv("TTS_SEGMENT_SILENCE_MS", 200))
+
+# Language detection for language "auto"
+# Characters of text per first language guess; sentences are guessed one by one only where guesses differ
+LANGUAGE_DETECT_CHARS = int(os.getenv("LANGUAGE_DETECT_CHARS", 400))
+# Passages shorter than this join the text before them instead of getting their own voice
+LANGUAGE_MIN_PASSAGE_CHARS = int(os.getenv("LANGUAGE_MIN_PASSAGE_CHARS", 80))
+
+# Audio output settings
+# Format conversions are stored in unless the request picks one: wav, mp3 or opus
+AUDIO_DEFAULT_FORMAT = os.getenv("AUDIO_DEFAULT_FORMAT", "wav")
+# Bitrates of the compressed formats
+AUDIO_MP3_BITRATE = os.getenv("AUDIO_MP3_BITRATE", "128k")
+AUDIO_OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "48k")
+# ffmpeg processes allowed to encode at once
+AUDIO_ENCODE_WORKERS = int(os.getenv("AUDIO_ENCODE_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+# Transcoded copies of stored audio, least recently used ones are evicted beyond the budget
+AUDIO_VARIANT_DIR = Path(os.getenv("AUDIO_VARIANT_DIR", AUDIO_DIR / "variants"))
+AUDIO_VARIANT_MAX_BYTES = int(os.getenv("AUDIO_VARIANT_MAX_BYTES", 2 * 1024 ** 3))
+# Synthesized audio no conversion references is deleted once older than this
+AUDIO_ARTIFACT_GRACE_SECONDS = int(os.getenv("AUDIO_ARTIFACT_GRACE_SECONDS", 3600))
+# How often each API process sweeps unreferenced audio
+AUDIO_ARTIFACT_SWEEP_INTERVAL_SECONDS = int(os.getenv("AUDIO_ARTIFACT_SWEEP_INTERVAL_SECONDS", 600))
+
+# Conversion history listing
+# Largest page a client may request
+CONVERSION_PAGE_MAX = int(os.getenv("CONVERSION_PAGE_MAX", 500))
+# Characters of text returned with each summary when the full text is not requested
+CONVERSION_PREVIEW_CHARS = int(os.getenv("CONVERSION_PREVIEW_CHARS", 200))
+
+# Conversion search
+# Largest page of search results a client may request
+SEARCH_PAGE_MAX = int(os.getenv("SEARCH_PAGE_MAX", 100))
+# Longest search query accepted
+SEARCH_QUERY_MAX_CHARS = int(os.getenv("SEARCH_QUERY_MAX_CHARS", 200))
+
+# Extracted text storage
+# Codec of newly stored texts: "zstd", falling back to "zlib" when zstandard is not installed
+TEXT_COMPRESSION = os.getenv("TEXT_COMPRESSION", "zstd")
+TEXT_COMPRESSION_LEVEL = int(os.getenv("TEXT_COMPRESSION_LEVEL", 6))
+
+# Background job settings
+# Attempts before a job is marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+# Delay before the first retry, doubled on every further attempt
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", 5))
+# How often an idle worker polls the jobs table
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", 1))
+# Running jobs not updated for this long are assumed orphaned and requeued
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 900))
+# How often a worker renews the lease of the job it is running
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", JOB_LEASE_SECONDS / 3))
+# Worker processes started by `python -m app.worker`
+JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", 1))
+
+# Batch conversion settings
+# Documents accepted in one batch request, counting every ZIP entry
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 500))
+# Largest batch request body, in place of MAX_UPLOAD_BYTES; each document still obeys MAX_UPLOAD_BYTES
+BATCH_MAX_UPLOAD_BYTES = int(os.getenv("BATCH_MAX_UPLOAD_BYTES", 2 * 1024 ** 3))
+# Documents whose OCR may finish ahead of their synthesis
+BATCH_PIPELINE_DEPTH = int(os.getenv("BATCH_PIPELINE_DEPTH", 2))
+# Conversions recorded per database transaction
+BATCH_INSERT_SIZE = int(os.getenv("BATCH_INSERT_SIZE", 25))
+
+# Inference settings
+# "local" runs OCR/TTS in each API process, "sidecar" forwards them to `python -m app.inference_server`
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "local")
+# Unix socket the inference sidecar listens on
+INFERENCE_SOCKET = Path(os.getenv("INFERENCE_SOCKET", BASE_DIR / "temp" / "inference.sock"))
 
 # CORS settings
 ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
 
-# Device settings
-DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+# Device settings: "cuda" or "cpu", detected when the first model loads if unset
+DEVICE = os.getenv("DEVICE", "")
+
+# Seconds after startup before the inference stack is imported and preloaded,
+# so the first requests are not competing with it
+MODEL_PRELOAD_DELAY_SECONDS = float(os.getenv("MODEL_PRELOAD_DELAY_SECONDS", 1))
 
@@ -2,19 +2,26 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.security import SECRET_KEY, ALGORITHM
-from app.crud.user import get_user_by_username
-from app.database import get_db
-from app.models.user import User
+from app.core.token_cache import UserSnapshot, token_cache
+from app.crud.user import user as user_crud
+from app.database import get_async_db
 from app.schemas.user import TokenData
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user."""
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> UserSnapshot:
+    """Get the current authenticated user.
+
+    Recently verified tokens are answered from the token cache without
+    decoding them or querying the database again.
+    """
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -30,16 +37,20 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     # Get user from database
-    user = get_user_by_username(db, username=token_data.username)
+    user = await user_crud.aget_by_username(db, username=token_data.username)
     if user is None:
         raise credentials_exception
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
         )
-    return user
+    snapshot = UserSnapshot.from_user(user)
+    # End the read so the connection is not held for the rest of the request
+    await db.commit()
+    token_cache.put(token, snapshot, payload.get("exp"))
+    return snapshot
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     """Ensure the user is active."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
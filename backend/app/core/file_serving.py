@@ -0,0 +1,263 @@
+import os
+import re
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Mapping, Optional, Tuple
+import anyio
+from fastapi import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Size of the pieces a file is read in when the server cannot send it directly
+SERVE_CHUNK_SIZE = 64 * 1024
+
+# Ranges honoured in one request, more are answered with the whole file
+MAX_RANGES = 16
+
+# Headers repeated on a 304 so caches can refresh their stored response
+NOT_MODIFIED_HEADERS = ("etag", "last-modified", "cache-control", "content-location", "vary", "expires")
+
+_RANGE_SPEC = re.compile(r"^(\d*)-(\d*)$")
+
+
+def make_etag(content_hash: Optional[str], stat_result: os.stat_result, variant: Optional[str] = None) -> str:
+    """Strong ETag from the content hash, or from the file's identity when it has none."""
+    if content_hash:
+        tag = f"{content_hash}.{variant}" if variant else content_hash
+    else:
+        tag = f"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+    return f'"{tag}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    """Parse an HTTP date into a timestamp, None if it is missing or malformed."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+    """Whether the client's cached copy is still current.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted
+    when the client sent no entity tags.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    since = _http_date(headers.get("if-modified-since"))
+    return since is not None and int(mtime) <= since
+
+
+def _if_range_matches(if_range: Optional[str], etag: str, last_modified: str) -> bool:
+    """Whether a Range request may be honoured given its If-Range validator."""
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        # Strong comparison only
+        return if_range == etag
+    return if_range == last_modified
+
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """Parse a Range header into sorted, merged, inclusive byte ranges.
+
+    Returns None when the header is malformed or not in bytes, in which case
+    it is ignored, and an empty list when none of its ranges is satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        match = _RANGE_SPEC.match(part)
+        if not match or match.group(0) == "-":
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = int(last) if last else max(start, size - 1)
+            if start > end:
+                return None
+        else:
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix == 0:
+                continue
+            start, end = max(0, size - suffix), size - 1
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+
+    ranges.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class RangeFileResponse(Response):
+    """Send a whole file, one byte range or several as multipart/byteranges.
+
+    The file is never buffered in memory: when the server offers the ASGI
+    zero-copy send extension each range is handed to it as an offset and
+    count for sendfile(), otherwise it is read in SERVE_CHUNK_SIZE pieces.
+    """
+
+    def __init__(
+        self,
+        path,
+        size: int,
+        ranges: Optional[List[Tuple[int, int]]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+    ):
+        """Prepare the response.
+        Args:
+            path: File to send
+            size: Size of the file
+            ranges: Inclusive byte ranges to send, None for the whole file
+            headers: Extra response headers
+            media_type: Media type of the file
+        """
+        self.path = path
+        self.size = size
+        self.background = None
+        self.media_type = media_type
+        self.parts: List[Tuple[bytes, int, int]] = []
+        self.trailer = b""
+        if ranges is None:
+            self.status_code = 200
+            self.parts = [(b"", 0, size)]
+        elif len(ranges) == 1:
+            self.status_code = 206
+            start, end = ranges[0]
+            self.parts = [(b"", start, end - start + 1)]
+        else:
+            self.status_code = 206
+            boundary = uuid.uuid4().hex
+            self.media_type = f"multipart/byteranges; boundary={boundary}"
+            for start, end in ranges:
+                part_header = (
+                    f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+                ).encode("latin-1")
+                # Each part after the first starts on a new line
+                if self.parts:
+                    part_header = b"\r\n" + part_header
+                self.parts.append((part_header, start, end - start + 1))
+            self.trailer = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        self.init_headers(headers)
+        self.headers["content-length"] = str(
+            sum(len(head) + count for head, _, count in self.parts) + len(self.trailer)
+        )
+        if self.status_code == 206 and len(self.parts) == 1:
+            start, count = self.parts[0][1], self.parts[0][2]
+            self.headers["content-range"] = f"bytes {start}-{start + count - 1}/{size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        trailer = self.trailer
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            for index, (head, start, count) in enumerate(self.parts):
+                last = index == len(self.parts) - 1 and not trailer
+                if head:
+                    await send({"type": "http.response.body", "body": head, "more_body": True})
+                await self._send_range(send, file, start, count, not last, zerocopy)
+        if trailer:
+            await send({"type": "http.response.body", "body": trailer, "more_body": False})
+
+    async def _send_range(self, send: Send, file, start: int, count: int, more_body: bool, zerocopy: bool):
+        """Send count bytes of the file from start."""
+        if zerocopy and count:
+            await send({
+                "type": "http.response.zerocopysend",
+                "file": file.wrapped.fileno(),
+                "offset": start,
+                "count": count,
+                "more_body": more_body,
+            })
+            return
+        await file.seek(start)
+        remaining = count
+        while remaining > 0:
+            chunk = await file.read(min(SERVE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body or remaining > 0})
+        if remaining > 0 or count == 0:
+            # The file was empty or came up short, still end this part of the body
+            await send({"type": "http.response.body", "body": b"", "more_body": more_body})
+
+
+async def serve_file(
+    request: Request,
+    path,
+    media_type: str,
+    content_hash: Optional[str] = None,
+    variant: Optional[str] = None,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """Answer a request for a file with validators, 304s and byte ranges.
+
+    Args:
+        request: The incoming request, for its conditional and Range headers
+        path: File to serve
+        media_type: Media type of the file
+        content_hash: Hash identifying the file's content, the basis of its ETag
+        variant: Name of the encoding when the file is a transcoded variant
+        headers: Extra response headers
+    """
+    stat_result = await anyio.to_thread.run_sync(os.stat, path)
+    etag = make_etag(content_hash, stat_result, variant)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    response_headers = {
+        **(headers or {}),
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+    }
+
+    if is_not_modified(request.headers, etag, stat_result.st_mtime):
+        return Response(
+            status_code=304,
+            headers={k: v for k, v in response_headers.items() if k.lower() in NOT_MODIFIED_HEADERS},
+        )
+
+    size = stat_result.st_size
+    range_header = request.headers.get("range")
+    if range_header and _if_range_matches(request.headers.get("if-range"), etag, last_modified):
+        ranges = parse_range(range_header, size)
+        if ranges == []:
+            return Response(
+                status_code=416,
+                headers={"Content-Range": f"bytes */{size}", "ETag": etag, "Accept-Ranges": "bytes"},
+            )
+        if ranges and len(ranges) <= MAX_RANGES:
+            return RangeFileResponse(path, size, ranges, response_headers, media_type)
+    return RangeFileResponse(path, size, None, response_headers, media_type)
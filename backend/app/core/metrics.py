@@ -0,0 +1,408 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms are updated on the request path, so they only take
+a lock and bump a few numbers. Gauges and cache counters are read from their
+owners when /metrics is scraped. Each process keeps its own values; with
+several API workers every scrape reports the worker that answered it.
+"""
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from weakref import WeakSet
+
+# Starlette appends the charset
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Upper bounds of the latency buckets, from a cached page to a book-length synthesis
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+# A family is (name, type, help, samples); a sample is (suffix, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render(families: Iterable[Family]) -> str:
+    """Families as text exposition format."""
+    lines = []
+    for name, kind, documentation, samples in families:
+        lines.append(f"# HELP {name} {_escape(documentation)}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{suffix}{{{label_text}}} {_format_value(value)}" if label_text
+                         else f"{name}{suffix} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def merge(families: List[Family], others: Iterable[Family], labels: Dict[str, str]) -> List[Family]:
+    """Add the samples of another process's families, told apart by extra labels."""
+    merged = {name: (name, kind, documentation, list(samples)) for name, kind, documentation, samples in families}
+    for name, kind, documentation, samples in others:
+        family = merged.setdefault(name, (name, kind, documentation, []))
+        family[3].extend((suffix, {**labels, **sample_labels}, value) for suffix, sample_labels, value in samples)
+    return list(merged.values())
+
+
+class Registry:
+    """The metrics of a process."""
+    def __init__(self):
+        self._metrics: List[Any] = []
+
+    def register(self, metric):
+        """Add a metric to the ones collected; returns it."""
+        self._metrics.append(metric)
+        return metric
+
+    def collect(self) -> List[Family]:
+        """Current value of every metric."""
+        return [metric.collect() for metric in self._metrics]
+
+
+registry = Registry()
+
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+        registry.register(self)
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        """Add to the count of a label combination."""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def collect(self) -> Family:
+        with self._lock:
+            values = list(self._values.items())
+        return f"{self.name}_total", "counter", self.documentation, [
+            ("", dict(zip(self.labels, key)), value) for key, value in values
+        ]
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label combination."""
+    def __init__(
+        self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # Per label combination: a count per bucket and one for +Inf, then the sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        registry.register(self)
+
+    def observe(self, value: float, *label_values: str):
+        """Record one observation."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        """Observe the seconds spent in a block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def collect(self) -> Family:
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        samples: List[Sample] = []
+        for key, counts, total in values:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(("_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        return self.name, "histogram", self.documentation, samples
+
+
+class CallbackMetric:
+    """A gauge or counter whose values are read from their owner at scrape time."""
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str],
+        read: Callable[[], Iterable[Tuple[Sequence[str], float]]],
+        kind: str = "gauge"
+    ):
+        """Initialize the metric.
+        Args:
+            name: Metric name, without the _total suffix of counters
+            documentation: Help text
+            labels: Label names
+            read: Callable returning (label values, value) pairs
+            kind: "gauge" or "counter"
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.read = read
+        self.kind = kind
+        registry.register(self)
+
+    def collect(self) -> Family:
+        name = f"{self.name}_total" if self.kind == "counter" else self.name
+        return name, self.kind, self.documentation, [
+            ("", dict(zip(self.labels, key)), float(value)) for key, value in self.read()
+        ]
+
+
+# Where conversion time goes, one histogram per stage
+stage_seconds = Histogram(
+    "conversion_stage_seconds",
+    "Seconds spent per conversion stage",
+    ("stage",),
+)
+
+# Which engine read each OCRed page or image, and how sure it was
+ocr_pages = Counter(
+    "ocr_pages",
+    "Pages and images converted, by the engine their text came from, text_layer when OCR was not needed",
+    ("engine",),
+)
+ocr_page_confidence = Histogram(
+    "ocr_page_confidence",
+    "Mean recognition confidence of pages and images read by OCR",
+    ("engine",),
+    buckets=(0.2, 0.4, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0),
+)
+
+# Observations of this thread go to a list instead of the histogram while set
+_captured = threading.local()
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record the duration of one stage."""
+    captured = getattr(_captured, "stages", None)
+    if captured is not None:
+        captured.append((stage, seconds))
+    else:
+        stage_seconds.observe(seconds, stage)
+
+
+def observe_page_ocr(engine: str, confidence: Optional[float]):
+    """Record the engine and mean confidence of one page; pages without OCR only count."""
+    ocr_pages.inc(engine)
+    if confidence is not None:
+        ocr_page_confidence.observe(confidence, engine)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Record the seconds spent in a block as one stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def captured_stages() -> Iterator[List[Tuple[str, float]]]:
+    """Collect the stages timed in this thread instead of recording them.
+
+    Worker processes have their own registry that nobody scrapes, so they
+    hand their timings back with the result for replay_stages.
+    """
+    previous = getattr(_captured, "stages", None)
+    _captured.stages = []
+    try:
+        yield _captured.stages
+    finally:
+        _captured.stages = previous
+
+
+def replay_stages(stages: Iterable[Tuple[str, float]]):
+    """Record stage timings collected by captured_stages."""
+    for stage, seconds in stages:
+        observe_stage(stage, seconds)
+
+
+class InstrumentedThreadPoolExecutor(ThreadPoolExecutor):
+    """A thread pool that counts its queued and running tasks for /metrics."""
+    def __init__(self, name: str, max_workers: Optional[int] = None, **kwargs):
+        super().__init__(max_workers=max_workers, thread_name_prefix=name, **kwargs)
+        self.name = name
+        self.queued = 0
+        self.active = 0
+        self._counts_lock = threading.Lock()
+        _thread_pools.add(self)
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        with self._counts_lock:
+            self.queued += 1
+        future = super().submit(self._run, fn, args, kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _run(self, fn, args, kwargs):
+        with self._counts_lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._counts_lock:
+                self.active -= 1
+
+    def _on_done(self, future: Future):
+        # Tasks cancelled before they started never reach _run
+        if future.cancelled():
+            with self._counts_lock:
+                self.queued -= 1
+
+
+_thread_pools: "WeakSet[InstrumentedThreadPoolExecutor]" = WeakSet()
+
+CallbackMetric(
+    "thread_pool_queue_depth", "Tasks waiting for a thread", ("pool",),
+    lambda: [((pool.name,), pool.queued) for pool in list(_thread_pools)],
+)
+CallbackMetric(
+    "thread_pool_active_workers", "Threads running a task", ("pool",),
+    lambda: [((pool.name,), pool.active) for pool in list(_thread_pools)],
+)
+CallbackMetric(
+    "thread_pool_max_workers", "Threads a pool may start", ("pool",),
+    lambda: [((pool.name,), pool._max_workers) for pool in list(_thread_pools)],
+)
+
+# Model registries report their stats() here once created
+_model_registries: "WeakSet[Any]" = WeakSet()
+
+
+def watch_model_registry(model_registry):
+    """Expose the cache gauges and counters of a model registry."""
+    _model_registries.add(model_registry)
+
+
+def _registry_stats() -> List[Dict[str, Any]]:
+    return [model_registry.stats() for model_registry in list(_model_registries)]
+
+
+CallbackMetric(
+    "model_cache_models", "Models resident in a registry", ("registry",),
+    lambda: [((stats["name"],), len(stats["loaded"])) for stats in _registry_stats()],
+)
+CallbackMetric(
+    "model_cache_loading", "Models being loaded by a registry", ("registry",),
+    lambda: [((stats["name"],), len(stats["loading"])) for stats in _registry_stats()],
+)
+CallbackMetric(
+    "model_cache_bytes", "Estimated memory held by the models of a registry", ("registry",),
+    lambda: [((stats["name"],), stats["bytes"]) for stats in _registry_stats()],
+)
+CallbackMetric(
+    "model_cache_max_bytes", "Memory budget of a registry, 0 for unlimited", ("registry",),
+    lambda: [((stats["name"],), stats["max_bytes"]) for stats in _registry_stats()],
+)
+for _counter in ("hits", "misses", "evictions"):
+    CallbackMetric(
+        f"model_cache_{_counter}", f"Model registry {_counter}", ("registry",),
+        lambda counter=_counter: [((stats["name"],), stats[counter]) for stats in _registry_stats()],
+        kind="counter",
+    )
+
+http_requests = Counter(
+    "http_requests",
+    "Requests answered, by route template, method, status and language",
+    ("route", "method", "status", "language"),
+)
+http_request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Seconds from receiving a request to the end of its response",
+    ("route",),
+)
+
+# Labels a request gathers while it is handled, set by MetricsMiddleware
+_request_labels: ContextVar[Optional[Dict[str, str]]] = ContextVar("request_labels", default=None)
+
+# Languages kept as label values; anything else is reported as "other"
+_language_labels: Optional[frozenset] = None
+
+
+def note_language(lang: Optional[str]):
+    """Label the current request with the language it converts."""
+    labels = _request_labels.get()
+    if labels is None or not lang:
+        return
+    global _language_labels
+    if _language_labels is None:
+        from app.services.languages import AUTO_LANGUAGE, supported_languages
+        from app.services.tts_models import lang_to_model
+        _language_labels = frozenset(supported_languages) | frozenset(lang_to_model) | {AUTO_LANGUAGE}
+    labels["language"] = lang if lang in _language_labels else "other"
+
+
+class MetricsMiddleware:
+    """Count requests by route template, method, status and language, and time them."""
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict[Any, str]] = None
+
+    def _route(self, scope) -> str:
+        """Path template of the endpoint that handled a request."""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+        return self._routes.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        labels: Dict[str, str] = {}
+        token = _request_labels.set(labels)
+        status_code = 500
+
+        async def send_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            _request_labels.reset(token)
+            route = self._route(scope)
+            http_requests.inc(route, scope["method"], str(status_code), labels.get("language", ""))
+            http_request_seconds.observe(time.perf_counter() - started, route)
@@ -0,0 +1,70 @@
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Libraries that take seconds to import; the API should serve before any of them is loaded
+HEAVY_MODULES = ("torch", "TTS", "easyocr", "fitz", "cv2", "scipy", "numpy", "PIL")
+
+
+def process_uptime() -> Optional[float]:
+    """Seconds since this process started, None where procfs is not available."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the parenthesized command name; starttime is the 22nd field overall
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            system_uptime = float(f.read().split()[0])
+        return max(0.0, system_uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupReport:
+    """Time spent in each startup phase of the process, from its start until it serves requests.
+
+    Phases end at each ``mark``; the first one starts with the process
+    itself, so it covers the interpreter and every import before it.
+    """
+
+    def __init__(self):
+        """Initialize the report, anchored to the process start time when it is known."""
+        self._anchor = time.perf_counter()
+        self._anchor_uptime = process_uptime() or 0.0
+        self._previous = 0.0
+        self.phases: List[Tuple[str, float]] = []
+        self.serving_after: Optional[float] = None
+
+    def uptime(self) -> float:
+        """Seconds since the process started."""
+        return self._anchor_uptime + time.perf_counter() - self._anchor
+
+    def mark(self, phase: str):
+        """End a phase, which lasted since the previous mark."""
+        now = self.uptime()
+        self.phases.append((phase, now - self._previous))
+        self._previous = now
+
+    def serving(self):
+        """Record that startup is over and log the report."""
+        self.mark("startup events")
+        self.serving_after = self._previous
+        report = self.summary()
+        phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases)
+        logger.info(f"Serving {self.serving_after:.2f}s after process start ({phases})")
+        if report["heavy_modules"]:
+            logger.warning(f"Imported before serving: {', '.join(report['heavy_modules'])}")
+
+    def summary(self) -> Dict[str, Any]:
+        """Phase durations and the heavy libraries loaded so far."""
+        return {
+            "serving_after_seconds": self.serving_after,
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases},
+            "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+        }
+
+startup_report = StartupReport()
@@ -0,0 +1,126 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+from app.config import AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """The fields of an authenticated user that requests read, detached from any session."""
+    id: int
+    email: str
+    username: str
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        """Copy the fields out of a User row."""
+        return cls(user.id, user.email, user.username, user.is_active, user.created_at)
+
+
+class TokenCache:
+    """In-process cache of verified access tokens to the snapshot of their user.
+
+    An entry lives for ``ttl`` seconds but never past its token's expiry.
+    Entries are dropped as soon as their user is updated through
+    ``invalidate_user``; other API processes only see such a change once
+    their own entries expire, so ``ttl`` bounds how stale they can be.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        """Initialize the cache.
+        Args:
+            ttl: Seconds an entry is trusted, 0 disables the cache
+            max_entries: Entries kept, the least recently used are dropped beyond it
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[UserSnapshot, float]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        """Key an entry by a digest so raw tokens are not kept in memory."""
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[UserSnapshot]:
+        """Return the snapshot cached for a token, or None."""
+        if not self.ttl:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, snapshot: UserSnapshot, token_expires_at: Optional[float] = None):
+        """Cache the snapshot of a verified token's user."""
+        if not self.ttl:
+            return
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        key = self._key(token)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (snapshot, expires_at)
+            self._by_user.setdefault(snapshot.id, set()).add(key)
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token of a user, after their account changed."""
+        with self._lock:
+            keys = self._by_user.pop(user_id, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            if keys:
+                self.invalidations += 1
+
+    def _drop(self, key: str):
+        """Remove one entry. Lock must be held."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry[0].id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry[0].id]
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl,
+            }
+
+# Verified tokens of this process
+token_cache = TokenCache(AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from app.config import MAX_UPLOAD_BYTES
+from app.core.metrics import observe_stage
+
+# Size of the pieces an upload is copied in
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Allowance for multipart boundaries, part headers and form fields around a file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    """The error returned for an upload over the size limit."""
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Upload exceeds the limit of {max_bytes} bytes"
+    )
+
+
+@dataclass
+class StoredUpload:
+    """An upload copied to its own file."""
+    path: Path
+    sha256: str
+    size: int
+
+
+def upload_path(directory: Path, filename: str) -> Path:
+    """A unique path for an upload in directory, keeping the file's extension."""
+    return directory / f"{uuid.uuid4().hex}{Path(filename or '').suffix.lower()}"
+
+
+async def save_upload(file: UploadFile, directory: Path, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """Copy an upload to a unique file in directory chunk by chunk, hashing it on the way.
+
+    At most one chunk is held in memory, and the copy is abandoned with a 413
+    as soon as it grows past max_bytes. The file is removed if the copy fails.
+    """
+    if max_bytes and file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+    started = time.perf_counter()
+    dest = upload_path(directory, file.filename)
+    digest = hashlib.sha256()
+    size = 0
+    f = await run_in_threadpool(open, dest, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise _too_large(max_bytes)
+            digest.update(chunk)
+            await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        await run_in_threadpool(f.close)
+        await remove_upload(dest)
+        raise
+    await run_in_threadpool(f.close)
+    observe_stage("upload", time.perf_counter() - started)
+    return StoredUpload(dest, digest.hexdigest(), size)
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+async def remove_upload(path) -> None:
+    """Delete an upload file, if it still exists, without blocking the event loop."""
+    if path:
+        await run_in_threadpool(_unlink, path)
+
+
+class UploadSizeLimitMiddleware:
+    """Reject request bodies larger than the upload limit before they are parsed.
+
+    Starlette spools a whole multipart body to disk before the route runs, so
+    the limit is enforced here: on the declared Content-Length up front, and
+    on the bytes actually received for chunked requests.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES, path_limits: Optional[Dict[str, int]] = None):
+        """Initialize the middleware.
+        Args:
+            app: ASGI application to wrap
+            max_bytes: Limit of every request body, 0 for none
+            path_limits: Limits replacing max_bytes for requests to these exact paths
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.path_limits.get(scope.get("path"), self.max_bytes) if scope["type"] == "http" else 0
+        if not max_bytes:
+            await self.app(scope, receive, send)
+            return
+        limit = max_bytes + MULTIPART_OVERHEAD_BYTES
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await self._reject(max_bytes, scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside body parsing, where FastAPI turns it into the response
+                    raise _too_large(max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, max_bytes: int, scope, receive, send):
+        """Answer 413 without reading the body."""
+        error = _too_large(max_bytes)
+        response = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+        await response(scope, receive, send)
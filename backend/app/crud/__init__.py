@@ -1,3 +1,5 @@
 from app.crud.base import CRUDBase
 from app.crud.user import user
-from app.crud.conversion import conversion
\ No newline at end of file
+from app.crud.conversion import conversion
+from app.crud.job import job
+from app.crud.audio_artifact import audio_artifact
\ No newline at end of file
@@ -0,0 +1,151 @@
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.audio_artifact import AudioArtifact
+
+class CRUDAudioArtifact:
+    """Lookups and reference counting for shared audio files."""
+    def get_by_path(self, db: Session, *, file_path: str) -> Optional[AudioArtifact]:
+        """Get the artifact stored at a path, if the file is shared."""
+        return db.query(AudioArtifact).filter(AudioArtifact.file_path == file_path).first()
+
+    def release(self, db: Session, *, file_path: str) -> bool:
+        """Drop one reference to a file. Committed by the caller.
+
+        Returns True when nothing references the file any more and it can be
+        deleted, which is also the case for files that were never shared.
+        """
+        artifact = db.query(AudioArtifact).filter(AudioArtifact.file_path == file_path).first()
+        if artifact is None:
+            return True
+        db.query(AudioArtifact).filter(AudioArtifact.id == artifact.id).update(
+            {AudioArtifact.ref_count: AudioArtifact.ref_count - 1},
+            synchronize_session=False
+        )
+        db.refresh(artifact)
+        if artifact.ref_count > 0:
+            return False
+        db.delete(artifact)
+        return True
+
+    async def aacquire_by_hash(self, db: AsyncSession, *, content_hash: str) -> Optional[AudioArtifact]:
+        """Count one more reference to the artifact of a cache key and commit; None if there is none.
+
+        The count is raised before the artifact is read, so a conversion
+        deleted meanwhile cannot remove it from under the caller: an artifact
+        released to no references is gone for this UPDATE too, and counts as
+        a miss. The reference is the caller's to record a conversion with, or
+        to hand back with adrop.
+        """
+        acquired = await db.execute(
+            update(AudioArtifact)
+            .where(AudioArtifact.content_hash == content_hash)
+            .values(ref_count=AudioArtifact.ref_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        artifact = None
+        if acquired.rowcount:
+            result = await db.execute(select(AudioArtifact).filter(AudioArtifact.content_hash == content_hash))
+            artifact = result.scalars().one()
+            if not await run_in_threadpool(os.path.exists, artifact.file_path):
+                await db.delete(artifact)
+                artifact = None
+        await db.commit()
+        return artifact
+
+    async def aget_by_path(self, db: AsyncSession, *, file_path: str) -> Optional[AudioArtifact]:
+        """Get the artifact stored at a path, if the file is shared."""
+        result = await db.execute(select(AudioArtifact).filter(AudioArtifact.file_path == file_path))
+        return result.scalars().first()
+
+    async def aregister(self, db: AsyncSession, *, content_hash: str, file_path: str) -> AudioArtifact:
+        """Record a newly synthesized file under its cache key, with one reference for the caller.
+
+        If another process registered the key first, a reference to its
+        artifact is taken and it is returned instead; the caller then owns a
+        duplicate file it should delete.
+        """
+        size_bytes = await run_in_threadpool(os.path.getsize, file_path)
+        for attempt in range(2):
+            db_obj = AudioArtifact(content_hash=content_hash, file_path=file_path, size_bytes=size_bytes, ref_count=1)
+            try:
+                async with db.begin_nested():
+                    db.add(db_obj)
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+                # Synthesized concurrently by another process, unless that was deleted since
+                existing = await self.aacquire_by_hash(db, content_hash=content_hash)
+                if existing is not None:
+                    return existing
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def adrop(self, db: AsyncSession, *, file_path: str):
+        """Hand back a reference no conversion was recorded with. Committed by the caller.
+
+        Unlike arelease the artifact is kept when nothing references it any
+        more, so an identical request soon after still finds it; the sweep
+        removes it later.
+        """
+        await db.execute(
+            update(AudioArtifact)
+            .where(AudioArtifact.file_path == file_path)
+            .values(ref_count=AudioArtifact.ref_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def arelease(self, db: AsyncSession, *, file_path: str) -> bool:
+        """Drop one reference to a file. Committed by the caller.
+
+        Returns True when nothing references the file any more and it can be
+        deleted, which is also the case for files that were never shared.
+        """
+        artifact = await self.aget_by_path(db, file_path=file_path)
+        if artifact is None:
+            return True
+        await db.execute(
+            update(AudioArtifact)
+            .where(AudioArtifact.id == artifact.id)
+            .values(ref_count=AudioArtifact.ref_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        await db.refresh(artifact)
+        if artifact.ref_count > 0:
+            return False
+        await db.delete(artifact)
+        return True
+
+    async def asweep_unreferenced(self, db: AsyncSession, *, older_than_seconds: float) -> List[str]:
+        """Delete artifacts no conversion references, returning their file paths for removal.
+
+        Only artifacts registered more than older_than_seconds ago are
+        swept, so audio a failed request handed back stays reusable for a
+        while. Each row is deleted only if it is still unreferenced, as
+        another request may acquire it meanwhile.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=older_than_seconds)
+        result = await db.execute(
+            select(AudioArtifact.id, AudioArtifact.file_path)
+            .where(AudioArtifact.ref_count <= 0, AudioArtifact.created_at < cutoff)
+        )
+        swept = []
+        for artifact_id, file_path in result.all():
+            deleted = await db.execute(
+                delete(AudioArtifact)
+                .where(AudioArtifact.id == artifact_id, AudioArtifact.ref_count <= 0)
+                .execution_options(synchronize_session=False)
+            )
+            if deleted.rowcount:
+                swept.append(file_path)
+        await db.commit()
+        return swept
+
+audio_artifact = CRUDAudioArtifact()
@@ -1,21 +1,54 @@
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.config import CONVERSION_PREVIEW_CHARS
 from app.models.conversion import Conversion
+from app.models.conversion_text import ConversionText
 from app.schemas.conversion import ConversionCreate, ConversionUpdate
+from app.crud.audio_artifact import audio_artifact
+from app.crud.conversion_search import conversion_search
+from app.crud.conversion_text import conversion_text
+from app.services.text_store import decompress_text
 from app.crud.base import CRUDBase
 
+# Columns of a conversion in lists, without its text
+SUMMARY_COLUMNS = (
+    Conversion.id, Conversion.user_id, Conversion.file_name, Conversion.language,
+    Conversion.source_type, Conversion.audio_file_path, Conversion.created_at,
+    Conversion.text_preview, Conversion.text_id
+)
+
 class CRUDConversion(CRUDBase[Conversion, ConversionCreate, ConversionUpdate]):
     """CRUD operations for conversions."""
     def create_with_owner(
-    self, db: Session, *, obj_in: dict, user_id: int, audio_file_path: str
+    self, db: Session, *, obj_in: dict, user_id: int, audio_file_path: str, commit: bool = True
     ) -> Conversion:
-        """Create a new conversion with owner."""
+        """Create a new conversion with owner, referencing its audio file and stored text.
+
+        The conversion takes over the audio reference get_or_synthesize
+        returned the file with. With commit=False the conversion is only flushed, for the caller to
+        commit together with its own changes.
+        """
+        obj_in = dict(obj_in)
+        text = obj_in.pop("text_content", None)
         db_obj = Conversion(
             **obj_in,
             user_id=user_id,
-            audio_file_path=audio_file_path
+            audio_file_path=audio_file_path,
+            text_preview=text[:CONVERSION_PREVIEW_CHARS] if text else None
         )
+        if text:
+            db_obj.text = conversion_text.acquire(db, text=text)
         db.add(db_obj)
+        db.flush()
+        conversion_search.index(
+            db, conversion_id=db_obj.id, user_id=user_id, file_name=db_obj.file_name, body=text
+        )
+        if not commit:
+            return db_obj
         db.commit()
         db.refresh(db_obj)
         return db_obj
@@ -31,4 +64,166 @@ class CRUDConversion(CRUDBase[Conversion, ConversionCreate, ConversionUpdate]):
             .limit(limit)
             .all()
         )
+
+    def remove_with_audio(self, db: Session, *, id: int) -> Optional[str]:
+        """Remove a conversion, returning its audio path if no other conversion shares it."""
+        obj = db.query(Conversion).get(id)
+        audio_file_path = obj.audio_file_path
+        text_id = obj.text_id
+        stored = db.get(ConversionText, text_id) if text_id is not None else None
+        body = decompress_text(stored.codec, stored.data) if stored is not None else None
+        conversion_search.remove(
+            db, conversion_id=obj.id, user_id=obj.user_id, file_name=obj.file_name, body=body
+        )
+        db.delete(obj)
+        db.flush()
+        conversion_text.release(db, id=text_id)
+        unreferenced = audio_artifact.release(db, file_path=audio_file_path)
+        db.commit()
+        return audio_file_path if unreferenced else None
+
+    async def acreate_with_owner(
+        self, db: AsyncSession, *, obj_in: dict, user_id: int, audio_file_path: str
+    ) -> Conversion:
+        """Create a new conversion with owner, referencing its audio file and stored text.
+
+        The conversion takes over the audio reference get_or_synthesize
+        returned the file with.
+        """
+        obj_in = dict(obj_in)
+        text = obj_in.pop("text_content", None)
+        stored = await conversion_text.aacquire(db, text=text) if text else None
+        db_obj = Conversion(
+            **obj_in,
+            user_id=user_id,
+            audio_file_path=audio_file_path,
+            text_id=stored.id if stored is not None else None,
+            text_preview=text[:CONVERSION_PREVIEW_CHARS] if text else None
+        )
+        db.add(db_obj)
+        await db.flush()
+        await conversion_search.aindex(
+            db, conversion_id=db_obj.id, user_id=user_id, file_name=db_obj.file_name, body=text
+        )
+        await db.commit()
+        await db.refresh(db_obj)
+        # The caller returns the full text, which is already at hand
+        set_committed_value(db_obj, "text", stored)
+        return db_obj
+
+    async def acreate_many_with_owner(self, db: AsyncSession, *, objs_in: List[dict], user_id: int) -> List[int]:
+        """Create several conversions of one owner in one transaction; returns their ids in order.
+
+        Each obj_in carries its audio_file_path, whose reference from
+        get_or_synthesize the conversion takes over. The rows are written by
+        one multi-row INSERT.
+        """
+        db_objs, texts = [], []
+        for obj_in in objs_in:
+            obj_in = dict(obj_in)
+            text = obj_in.pop("text_content", None)
+            stored = await conversion_text.aacquire(db, text=text) if text else None
+            db_objs.append(Conversion(
+                **obj_in,
+                user_id=user_id,
+                text_id=stored.id if stored is not None else None,
+                text_preview=text[:CONVERSION_PREVIEW_CHARS] if text else None
+            ))
+            texts.append(text)
+        db.add_all(db_objs)
+        await db.flush()
+        await conversion_search.aindex_many(db, entries=[
+            (db_obj.id, user_id, db_obj.file_name, text) for db_obj, text in zip(db_objs, texts)
+        ])
+        ids = [db_obj.id for db_obj in db_objs]
+        await db.commit()
+        return ids
+
+    async def aload_text(self, db: AsyncSession, *, conv: Conversion) -> Conversion:
+        """Load the stored text of a conversion, for endpoints that return it."""
+        stored = await db.get(ConversionText, conv.text_id) if conv.text_id is not None else None
+        set_committed_value(conv, "text", stored)
+        return conv
+
+    async def aget_multi_by_owner(
+        self, db: AsyncSession, *, user_id: int, skip: int = 0, limit: int = 100
+    ) -> List[Conversion]:
+        """Get conversions by owner."""
+        result = await db.execute(
+            select(Conversion)
+            .filter(Conversion.user_id == user_id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def aget_page_by_owner(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None,
+        skip: int = 0,
+        with_text: bool = False,
+    ) -> List[dict]:
+        """Get one page of an owner's conversions, newest first.
+
+        ``after`` is the (created_at, id) of the last row of the previous page;
+        pages are read from the (user_id, created_at, id) index, so their cost
+        does not grow with depth. Rows carry their ``text_preview``; the full
+        text is only loaded and decompressed with ``with_text``.
+        """
+        query = select(*SUMMARY_COLUMNS).filter(Conversion.user_id == user_id)
+        if after is not None:
+            created_at, last_id = after
+            fallback = created_at
+            if db.get_bind().dialect.name == "sqlite":
+                # Bound datetimes carry microseconds, CURRENT_TIMESTAMP text does not
+                fallback = func.datetime(created_at)
+            # Compare against the stored value of the last row, falling back to the
+            # cursor's copy if that row was deleted meanwhile
+            anchor = func.coalesce(
+                select(Conversion.created_at).filter(Conversion.id == last_id).scalar_subquery(),
+                fallback
+            )
+            # A row-value comparison lets the index seek straight to the page
+            query = query.filter(tuple_(Conversion.created_at, Conversion.id) < tuple_(anchor, last_id))
+        elif skip:
+            query = query.offset(skip)
+        query = query.order_by(Conversion.created_at.desc(), Conversion.id.desc()).limit(limit)
+        result = await db.execute(query)
+        rows = [dict(row._mapping) for row in result.all()]
+        if with_text:
+            texts = await conversion_text.aget_contents(db, ids=[row["text_id"] for row in rows if row["text_id"]])
+            for row in rows:
+                row["text_content"] = texts.get(row["text_id"])
+        return rows
+
+    async def aget_summaries(self, db: AsyncSession, *, user_id: int, ids: List[int]) -> Dict[int, dict]:
+        """Summary rows of an owner's conversions by id."""
+        if not ids:
+            return {}
+        result = await db.execute(
+            select(*SUMMARY_COLUMNS).filter(Conversion.user_id == user_id, Conversion.id.in_(ids))
+        )
+        return {row.id: dict(row._mapping) for row in result.all()}
+
+    async def aremove_with_audio(self, db: AsyncSession, *, id: int) -> Optional[str]:
+        """Remove a conversion, returning its audio path if no other conversion shares it."""
+        obj = await db.get(Conversion, id)
+        audio_file_path = obj.audio_file_path
+        text_id = obj.text_id
+        # The index forgets a conversion given the values it was indexed with
+        texts = await conversion_text.aget_contents(db, ids=[text_id] if text_id is not None else [])
+        await conversion_search.aremove(
+            db, conversion_id=obj.id, user_id=obj.user_id, file_name=obj.file_name, body=texts.get(text_id)
+        )
+        await db.delete(obj)
+        await db.flush()
+        await conversion_text.arelease(db, id=text_id)
+        unreferenced = await audio_artifact.arelease(db, file_path=audio_file_path)
+        await db.commit()
+        return audio_file_path if unreferenced else None
+
 conversion = CRUDConversion(Conversion)
\ No newline at end of file
@@ -0,0 +1,175 @@
+import re
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.services.text_store import decompress_text
+
+# Conversions indexed per round trip when rebuilding
+REBUILD_BATCH_SIZE = 200
+
+# Characters of context around the first match in a snippet
+SNIPPET_CHARS = 160
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+# SQLite: contentless FTS5 table, so text is not stored a second time uncompressed.
+# The owner column holds one token per user, which scopes every query to its owner.
+_SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS conversion_search USING fts5("
+    "owner, file_name, body, content='', tokenize='unicode61 remove_diacritics 2')",
+)
+_SQLITE_DROP = ("DROP TABLE IF EXISTS conversion_search",)
+_SQLITE_INSERT = (
+    "INSERT INTO conversion_search (rowid, owner, file_name, body) "
+    "VALUES (:id, :owner, :file_name, :body)"
+)
+# Contentless tables forget rows by being handed the indexed values again
+_SQLITE_DELETE = (
+    "INSERT INTO conversion_search (conversion_search, rowid, owner, file_name, body) "
+    "VALUES ('delete', :id, :owner, :file_name, :body)"
+)
+_SQLITE_SEARCH = (
+    "SELECT rowid AS id, -bm25(conversion_search, 0.0, 2.0, 1.0) AS rank FROM conversion_search "
+    "WHERE conversion_search MATCH :query ORDER BY rank DESC, rowid DESC LIMIT :limit OFFSET :offset"
+)
+
+# Postgres: weighted tsvector per conversion with a GIN index
+_POSTGRES_CREATE = (
+    "CREATE TABLE IF NOT EXISTS conversion_search ("
+    "conversion_id INTEGER PRIMARY KEY REFERENCES conversions (id) ON DELETE CASCADE, "
+    "user_id INTEGER NOT NULL, document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_conversion_search_user_id ON conversion_search (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_conversion_search_document ON conversion_search USING GIN (document)",
+)
+_POSTGRES_DROP = ("DROP TABLE IF EXISTS conversion_search",)
+_POSTGRES_INSERT = (
+    "INSERT INTO conversion_search (conversion_id, user_id, document) VALUES (:id, :user_id, "
+    "setweight(to_tsvector('simple', coalesce(:file_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(:body, '')), 'B')) "
+    "ON CONFLICT (conversion_id) DO UPDATE SET document = EXCLUDED.document"
+)
+_POSTGRES_DELETE = "DELETE FROM conversion_search WHERE conversion_id = :id"
+_POSTGRES_SEARCH = (
+    "SELECT conversion_id AS id, ts_rank(document, to_tsquery('simple', :query)) AS rank "
+    "FROM conversion_search WHERE user_id = :user_id AND document @@ to_tsquery('simple', :query) "
+    "ORDER BY rank DESC, conversion_id DESC LIMIT :limit OFFSET :offset"
+)
+
+DB = Union[Session, Connection]
+
+
+def search_terms(query: str) -> List[str]:
+    """Words of a user query, lowercased; operators and punctuation are dropped."""
+    return [term.lower() for term in _TERM.findall(query)]
+
+
+def make_snippet(body: Optional[str], terms: List[str], width: int = SNIPPET_CHARS) -> Optional[str]:
+    """A window of text around the first occurrence of any term."""
+    if not body:
+        return None
+    lowered = body.lower()
+    positions = [p for p in (lowered.find(term) for term in terms) if p >= 0]
+    start = max(0, min(positions) - width // 3) if positions else 0
+    end = min(len(body), start + width)
+    snippet = " ".join(body[start:end].split())
+    return f"{'…' if start else ''}{snippet}{'…' if end < len(body) else ''}"
+
+
+class CRUDConversionSearch:
+    """Full-text index of conversions: FTS5 on SQLite, tsvector on Postgres."""
+    @staticmethod
+    def _dialect(db) -> str:
+        return db.get_bind().dialect.name if hasattr(db, "get_bind") else db.dialect.name
+
+    def _statements(self, db, name: str):
+        postgres = self._dialect(db) == "postgresql"
+        return {
+            "create": _POSTGRES_CREATE if postgres else _SQLITE_CREATE,
+            "drop": _POSTGRES_DROP if postgres else _SQLITE_DROP,
+            "insert": _POSTGRES_INSERT if postgres else _SQLITE_INSERT,
+            "delete": _POSTGRES_DELETE if postgres else _SQLITE_DELETE,
+            "search": _POSTGRES_SEARCH if postgres else _SQLITE_SEARCH,
+        }[name]
+
+    def _match_query(self, db, terms: List[str], user_id: int) -> str:
+        """Query string matching all terms, the last one as a prefix."""
+        if self._dialect(db) == "postgresql":
+            return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+        quoted = " AND ".join(f'"{term}"' for term in terms[:-1]) + (" AND " if len(terms) > 1 else "")
+        return f'owner:"u{user_id}" AND {{file_name body}}: ({quoted}"{terms[-1]}"*)'
+
+    @staticmethod
+    def _row(conversion_id: int, user_id: int, file_name: Optional[str], body: Optional[str]) -> Dict:
+        return {"id": conversion_id, "user_id": user_id, "owner": f"u{user_id}",
+                "file_name": file_name or "", "body": body or ""}
+
+    def create_index(self, db: DB):
+        """Create the index structures if they are missing. Committed by the caller."""
+        for statement in self._statements(db, "create"):
+            db.execute(text(statement))
+
+    def index(self, db: DB, *, conversion_id: int, user_id: int, file_name: Optional[str], body: Optional[str]):
+        """Add a conversion to the index. Committed by the caller."""
+        db.execute(text(self._statements(db, "insert")), self._row(conversion_id, user_id, file_name, body))
+
+    def remove(self, db: DB, *, conversion_id: int, user_id: int, file_name: Optional[str], body: Optional[str]):
+        """Drop a conversion from the index, given the values it was indexed with. Committed by the caller."""
+        db.execute(text(self._statements(db, "delete")), self._row(conversion_id, user_id, file_name, body))
+
+    def rebuild(self, db: DB) -> int:
+        """Recreate the index from all stored conversions; returns the number indexed."""
+        for statement in self._statements(db, "drop"):
+            db.execute(text(statement))
+        self.create_index(db)
+        last_id, indexed = 0, 0
+        while True:
+            rows = db.execute(text(
+                "SELECT c.id, c.user_id, c.file_name, t.codec, t.data FROM conversions c "
+                "LEFT JOIN conversion_texts t ON t.id = c.text_id "
+                "WHERE c.id > :last_id ORDER BY c.id LIMIT :limit"
+            ), {"last_id": last_id, "limit": REBUILD_BATCH_SIZE}).all()
+            if not rows:
+                return indexed
+            for row in rows:
+                body = decompress_text(row.codec, row.data) if row.data is not None else None
+                self.index(db, conversion_id=row.id, user_id=row.user_id, file_name=row.file_name, body=body)
+            last_id = rows[-1].id
+            indexed += len(rows)
+
+    async def aindex(
+        self, db: AsyncSession, *, conversion_id: int, user_id: int, file_name: Optional[str], body: Optional[str]
+    ):
+        """Add a conversion to the index. Committed by the caller."""
+        await db.execute(text(self._statements(db, "insert")), self._row(conversion_id, user_id, file_name, body))
+
+    async def aindex_many(
+        self, db: AsyncSession, *, entries: List[Tuple[int, int, Optional[str], Optional[str]]]
+    ):
+        """Add conversions to the index in one statement, given (id, user_id, file_name, body). Committed by the caller."""
+        if entries:
+            await db.execute(text(self._statements(db, "insert")), [self._row(*entry) for entry in entries])
+
+    async def aremove(
+        self, db: AsyncSession, *, conversion_id: int, user_id: int, file_name: Optional[str], body: Optional[str]
+    ):
+        """Drop a conversion from the index, given the values it was indexed with. Committed by the caller."""
+        await db.execute(text(self._statements(db, "delete")), self._row(conversion_id, user_id, file_name, body))
+
+    async def asearch(
+        self, db: AsyncSession, *, user_id: int, query: str, limit: int = 20, offset: int = 0
+    ) -> List[Tuple[int, float]]:
+        """Ids and ranks of the owner's conversions matching a query, best first."""
+        terms = search_terms(query)
+        if not terms:
+            return []
+        result = await db.execute(text(self._statements(db, "search")), {
+            "query": self._match_query(db, terms, user_id),
+            "user_id": user_id,
+            "limit": limit,
+            "offset": offset,
+        })
+        return [(row.id, float(row.rank)) for row in result.all()]
+
+conversion_search = CRUDConversionSearch()
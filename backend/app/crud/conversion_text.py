@@ -0,0 +1,122 @@
+from typing import Dict, Iterable, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.conversion_text import ConversionText
+from app.services.text_store import compress_text, decompress_text, text_hash
+
+class CRUDConversionText:
+    """Deduplicated, compressed storage and reference counting of conversion texts."""
+    def acquire(self, db: Session, *, text: str) -> ConversionText:
+        """Store a text, or count one more reference to an identical stored one. Committed by the caller.
+
+        The count is raised before the stored copy is read, so a concurrent
+        release cannot delete it in between; no updated row means the text
+        is not stored, or no longer.
+        """
+        content_hash = text_hash(text)
+        for attempt in range(2):
+            acquired = db.query(ConversionText).filter(ConversionText.content_hash == content_hash).update(
+                {ConversionText.ref_count: ConversionText.ref_count + 1},
+                synchronize_session=False
+            )
+            if acquired:
+                return db.query(ConversionText).filter(ConversionText.content_hash == content_hash).one()
+            if not attempt:
+                codec, data = compress_text(text)
+            stored = ConversionText(
+                content_hash=content_hash, codec=codec, size_bytes=len(text.encode("utf-8")),
+                data=data, ref_count=1
+            )
+            try:
+                with db.begin_nested():
+                    db.add(stored)
+                return stored
+            except IntegrityError:
+                if attempt:
+                    raise
+                # Stored concurrently by another request; count a reference to that copy
+
+    def release(self, db: Session, *, id: Optional[int]):
+        """Drop one reference to a text, deleting it once unreferenced. Committed by the caller."""
+        if id is None:
+            return
+        db.query(ConversionText).filter(ConversionText.id == id).update(
+            {ConversionText.ref_count: ConversionText.ref_count - 1},
+            synchronize_session=False
+        )
+        db.query(ConversionText).filter(
+            ConversionText.id == id, ConversionText.ref_count <= 0
+        ).delete(synchronize_session=False)
+
+    async def aget_by_hash(self, db: AsyncSession, *, content_hash: str) -> Optional[ConversionText]:
+        """Get the stored copy of a text by its hash."""
+        result = await db.execute(select(ConversionText).filter(ConversionText.content_hash == content_hash))
+        return result.scalars().first()
+
+    async def aacquire(self, db: AsyncSession, *, text: str) -> ConversionText:
+        """Store a text, or count one more reference to an identical stored one. Committed by the caller.
+
+        The count is raised before the stored copy is read, so a concurrent
+        arelease cannot delete it in between; no updated row means the text
+        is not stored, or no longer.
+        """
+        content_hash = text_hash(text)
+        for attempt in range(2):
+            acquired = await db.execute(
+                update(ConversionText)
+                .where(ConversionText.content_hash == content_hash)
+                .values(ref_count=ConversionText.ref_count + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if acquired.rowcount:
+                return await self.aget_by_hash(db, content_hash=content_hash)
+            if not attempt:
+                # Compressing a book-sized text would stall the event loop
+                codec, data = await run_in_threadpool(compress_text, text)
+            stored = ConversionText(
+                content_hash=content_hash, codec=codec, size_bytes=len(text.encode("utf-8")),
+                data=data, ref_count=1
+            )
+            try:
+                async with db.begin_nested():
+                    db.add(stored)
+                return stored
+            except IntegrityError:
+                if attempt:
+                    raise
+                # Stored concurrently by another request; count a reference to that copy
+
+    async def arelease(self, db: AsyncSession, *, id: Optional[int]):
+        """Drop one reference to a text, deleting it once unreferenced. Committed by the caller."""
+        if id is None:
+            return
+        await db.execute(
+            update(ConversionText)
+            .where(ConversionText.id == id)
+            .values(ref_count=ConversionText.ref_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(ConversionText)
+            .where(ConversionText.id == id, ConversionText.ref_count <= 0)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def aget_contents(self, db: AsyncSession, *, ids: Iterable[int]) -> Dict[int, str]:
+        """Decompressed texts by id."""
+        ids = set(ids)
+        if not ids:
+            return {}
+        result = await db.execute(
+            select(ConversionText.id, ConversionText.codec, ConversionText.data)
+            .filter(ConversionText.id.in_(ids))
+        )
+        rows = result.all()
+        return await run_in_threadpool(
+            lambda: {row.id: decompress_text(row.codec, row.data) for row in rows}
+        )
+
+conversion_text = CRUDConversionText()
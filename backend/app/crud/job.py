@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.config import JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS
+from app.models.job import (
+    Job, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED
+)
+from app.schemas.job import JobCreate, JobUpdate
+from app.crud.base import CRUDBase
+
+class CRUDJob(CRUDBase[Job, JobCreate, JobUpdate]):
+    """CRUD operations and state transitions for background jobs."""
+    def create_with_owner(self, db: Session, *, obj_in: dict, user_id: int) -> Job:
+        """Queue a new job for a user."""
+        db_obj = Job(
+            **obj_in,
+            user_id=user_id,
+            status=JOB_QUEUED,
+            stage="queued",
+            progress=0.0,
+            attempts=0,
+            max_attempts=JOB_MAX_ATTEMPTS,
+            run_after=datetime.utcnow()
+        )
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def get_multi_by_owner(
+        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
+    ) -> List[Job]:
+        """Get jobs by owner, newest first."""
+        return (
+            db.query(Job)
+            .filter(Job.user_id == user_id)
+            .order_by(Job.id.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def claim(self, db: Session, *, worker_id: str) -> Optional[Job]:
+        """Atomically take the next runnable job, or None if there is none.
+
+        The status check in the UPDATE makes the claim a compare-and-set, so
+        concurrent workers on SQLite or Postgres never run the same job twice.
+        """
+        now = datetime.utcnow()
+        candidate = (
+            db.query(Job.id)
+            .filter(Job.status == JOB_QUEUED, Job.run_after <= now)
+            .order_by(Job.run_after, Job.id)
+            .first()
+        )
+        if candidate is None:
+            return None
+        claimed = (
+            db.query(Job)
+            .filter(Job.id == candidate.id, Job.status == JOB_QUEUED)
+            .update(
+                {
+                    Job.status: JOB_RUNNING,
+                    Job.locked_by: worker_id,
+                    Job.locked_at: now,
+                    Job.attempts: Job.attempts + 1,
+                },
+                synchronize_session=False
+            )
+        )
+        db.commit()
+        if not claimed:
+            return None
+        return self.get(db, candidate.id)
+
+    def _update_owned(self, db: Session, *, job_id: int, worker_id: str, values: dict) -> bool:
+        """Update a running job only while worker_id still holds it; False if the lease was lost.
+
+        Like claim, this is a compare-and-set, so a worker whose job was
+        requeued and claimed again elsewhere cannot overwrite the new run.
+        """
+        updated = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == JOB_RUNNING, Job.locked_by == worker_id)
+            .update(values, synchronize_session=False)
+        )
+        db.commit()
+        return bool(updated)
+
+    def renew_lease(self, db: Session, *, job_id: int, worker_id: str) -> bool:
+        """Extend the lease of a running job; False if worker_id no longer holds it."""
+        return self._update_owned(db, job_id=job_id, worker_id=worker_id, values={Job.locked_at: datetime.utcnow()})
+
+    def set_stage(self, db: Session, *, job: Job, worker_id: str, stage: str, progress: float) -> bool:
+        """Record progress of a running job and renew its lease; False if worker_id no longer holds it."""
+        return self._update_owned(
+            db, job_id=job.id, worker_id=worker_id,
+            values={Job.stage: stage, Job.progress: progress, Job.locked_at: datetime.utcnow()}
+        )
+
+    def cancel_requested(self, db: Session, *, job: Job) -> bool:
+        """Check whether the owner asked to cancel a running job."""
+        db.refresh(job, attribute_names=["cancel_requested"])
+        return bool(job.cancel_requested)
+
+    def succeed(self, db: Session, *, job: Job, worker_id: str, conversion_id: int) -> bool:
+        """Mark a job as finished, committing the pending conversion with it.
+
+        If worker_id no longer holds the job, the caller's pending changes
+        are rolled back instead and False is returned.
+        """
+        updated = (
+            db.query(Job)
+            .filter(Job.id == job.id, Job.status == JOB_RUNNING, Job.locked_by == worker_id)
+            .update(
+                {
+                    Job.status: JOB_SUCCEEDED,
+                    Job.stage: "done",
+                    Job.progress: 1.0,
+                    Job.error: None,
+                    Job.conversion_id: conversion_id,
+                    Job.locked_by: None,
+                },
+                synchronize_session=False
+            )
+        )
+        if updated:
+            db.commit()
+        else:
+            db.rollback()
+        return bool(updated)
+
+    def fail(self, db: Session, *, job: Job, worker_id: str, error: str, retry: bool = True) -> bool:
+        """Requeue a job with exponential backoff, or fail it once out of attempts.
+
+        Returns False without changing the job if worker_id no longer holds it.
+        """
+        values = {Job.error: error, Job.locked_by: None}
+        if retry and job.attempts < job.max_attempts:
+            delay = JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            values.update({
+                Job.status: JOB_QUEUED,
+                Job.stage: "queued",
+                Job.progress: 0.0,
+                Job.run_after: datetime.utcnow() + timedelta(seconds=delay),
+            })
+        else:
+            values[Job.status] = JOB_FAILED
+        return self._update_owned(db, job_id=job.id, worker_id=worker_id, values=values)
+
+    def cancel(self, db: Session, *, job: Job) -> Job:
+        """Cancel a queued job, or flag a running one for its worker to stop."""
+        if job.status == JOB_QUEUED:
+            job.status = JOB_CANCELLED
+        job.cancel_requested = True
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def mark_cancelled(self, db: Session, *, job: Job, worker_id: str) -> bool:
+        """Record that a worker stopped a job on request; False if worker_id no longer holds it."""
+        return self._update_owned(
+            db, job_id=job.id, worker_id=worker_id, values={Job.status: JOB_CANCELLED, Job.locked_by: None}
+        )
+
+    def requeue_stale(self, db: Session, *, lease_seconds: int) -> int:
+        """Requeue running jobs whose worker stopped renewing the lease.
+
+        Jobs that already used all their attempts are failed instead, so a job
+        that keeps crashing its worker cannot loop forever.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+        stale = db.query(Job).filter(Job.status == JOB_RUNNING, Job.locked_at < cutoff)
+        stale.filter(Job.attempts >= Job.max_attempts).update(
+            {Job.status: JOB_FAILED, Job.locked_by: None, Job.error: "Worker lost"},
+            synchronize_session=False
+        )
+        count = stale.update(
+            {Job.status: JOB_QUEUED, Job.stage: "queued", Job.locked_by: None},
+            synchronize_session=False
+        )
+        db.commit()
+        return count
+job = CRUDJob(Job)
@@ -1,6 +1,10 @@
 from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.security import get_password_hash, verify_password
+from app.core.token_cache import token_cache
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.crud.base import CRUDBase
@@ -27,7 +31,16 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             hashed_password = get_password_hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        # Cached tokens must not keep serving the old account details
+        token_cache.invalidate_user(db_obj.id)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> User:
+        """Remove a user and forget their cached tokens."""
+        obj = super().remove(db, id=id)
+        token_cache.invalidate_user(id)
+        return obj
     
     def authenticate(self, db: Session, *, username: str, password: str) -> Optional[User]:
         """Authenticate a user by username and password."""
@@ -46,6 +59,56 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         """Get a user by username."""
         return db.query(User).filter(User.username == username).first()
     
+    async def acreate(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+        """Create a new user with hashed password, hashing off the event loop."""
+        db_obj = User(
+            email=obj_in.email,
+            username=obj_in.username,
+            hashed_password=await run_in_threadpool(get_password_hash, obj_in.password),
+            is_active=True,
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def aupdate(self, db: AsyncSession, *, db_obj: User, obj_in: UserUpdate) -> User:
+        """Update a user, hashing password if provided."""
+        update_data = obj_in.dict(exclude_unset=True)
+        if "password" in update_data:
+            hashed_password = await run_in_threadpool(get_password_hash, update_data["password"])
+            del update_data["password"]
+            update_data["hashed_password"] = hashed_password
+        db_obj = await super().aupdate(db, db_obj=db_obj, obj_in=update_data)
+        # Cached tokens must not keep serving the old account details
+        token_cache.invalidate_user(db_obj.id)
+        return db_obj
+
+    async def aremove(self, db: AsyncSession, *, id: int) -> User:
+        """Remove a user and forget their cached tokens."""
+        obj = await super().aremove(db, id=id)
+        token_cache.invalidate_user(id)
+        return obj
+
+    async def aauthenticate(self, db: AsyncSession, *, username: str, password: str) -> Optional[User]:
+        """Authenticate a user by username and password."""
+        user = await self.aget_by_username(db, username=username)
+        if not user:
+            return None
+        if not await run_in_threadpool(verify_password, password, user.hashed_password):
+            return None
+        return user
+
+    async def aget_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        """Get a user by email."""
+        result = await db.execute(select(User).filter(User.email == email))
+        return result.scalars().first()
+
+    async def aget_by_username(self, db: AsyncSession, *, username: str) -> Optional[User]:
+        """Get a user by username."""
+        result = await db.execute(select(User).filter(User.username == username))
+        return result.scalars().first()
+
     def is_active(self, user: User) -> bool:
         """Check if a user is active."""
         return user.is_active
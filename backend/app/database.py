@@ -1,15 +1,93 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from app.config import DATABASE_URL
+from app.core.metrics import observe_stage
+from app.config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE, DB_POOL_PRE_PING, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_BYTES
+)
+
+# Async drivers replacing the sync ones of DATABASE_URL
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+
+def async_database_url(url: str) -> str:
+    """Turn a sync database URL into the matching async driver URL."""
+    parsed = make_url(url)
+    backend = parsed.drivername.split("+")[0]
+    return parsed.set(drivername=ASYNC_DRIVERS.get(backend, parsed.drivername)).render_as_string(hide_password=False)
+
+def _is_sqlite(url: str) -> bool:
+    """Whether a URL points at a SQLite database."""
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _pool_options(url: str) -> dict:
+    """Pool settings for an engine; in-memory SQLite keeps SQLAlchemy's single-connection pool."""
+    parsed = make_url(url)
+    sqlite = parsed.get_backend_name() == "sqlite"
+    if sqlite and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        # A SQLite file cannot drop the connection, so pinging only costs a round trip
+        "pool_pre_ping": DB_POOL_PRE_PING and not sqlite,
+    }
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection for concurrent access."""
+    cursor = dbapi_connection.cursor()
+    try:
+        if SQLITE_JOURNAL_MODE:
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        if SQLITE_SYNCHRONOUS:
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_BYTES)}")
+    finally:
+        cursor.close()
 
 # Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **_pool_options(DATABASE_URL))
+
+# Async engine for the API routes, so queries and commits do not block the event loop
+_async_url = ASYNC_DATABASE_URL or async_database_url(DATABASE_URL)
+_async_options = _pool_options(_async_url)
+if _async_options and _is_sqlite(_async_url):
+    # aiosqlite defaults to opening a connection per session
+    _async_options["poolclass"] = AsyncAdaptedQueuePool
+async_engine = create_async_engine(_async_url, **_async_options)
+
+if _is_sqlite(DATABASE_URL):
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+if _is_sqlite(_async_url):
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        observe_stage("db_commit", time.perf_counter() - started)
+
+# Time every commit, sync or async, including the flush it triggers
+event.listen(Session, "before_commit", _commit_started)
+event.listen(Session, "after_commit", _commit_finished)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async session factory; objects stay readable after commit without another query
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -19,4 +97,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
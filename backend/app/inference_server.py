@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import logging
+import os
+from pathlib import Path
+from app.config import INFERENCE_SOCKET
+from app.core.metrics import registry
+from app.services.inference import LocalBackend, read_message, write_frame, write_message
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# The server always runs the models itself
+local = LocalBackend()
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Serve one request from an API worker."""
+    try:
+        request = await read_message(reader)
+        op, args = request["op"], request.get("args", {})
+        if op == "pdf_to_text":
+            value = await local.pdf_to_text(Path(args["pdf_path"]), args["lang"], args.get("content_hash"))
+        elif op == "image_to_text":
+            value = await local.image_to_text(Path(args["image_path"]), args["lang"], args.get("content_hash"))
+        elif op == "text_to_audio":
+            text, lang, speaker = args.pop("text"), args.pop("lang"), args.pop("speaker", None)
+            value = str(await local.text_to_audio(text, lang, speaker, **args))
+        elif op == "stream_text_to_audio":
+            async for chunk in local.stream_text_to_audio(
+                args["text"], args["lang"], Path(args["output_file"]), args.get("speaker")
+            ):
+                await write_message(writer, {"type": "chunk"})
+                await write_frame(writer, chunk)
+            value = args["output_file"]
+        elif op == "status":
+            value = await local.status()
+        elif op == "metrics":
+            value = registry.collect()
+        else:
+            raise ValueError(f"Unknown operation '{op}'")
+        await write_message(writer, {"type": "result", "value": value})
+    except (asyncio.IncompleteReadError, ConnectionError):
+        # The API worker went away, e.g. a streaming client disconnected
+        pass
+    except Exception as e:
+        logger.error(f"Inference request failed: {e}")
+        try:
+            await write_message(writer, {"type": "error", "detail": str(e)})
+        except ConnectionError:
+            pass
+    finally:
+        writer.close()
+
+async def serve(socket_path: Path):
+    """Listen on the Unix socket until stopped."""
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if socket_path.exists():
+        socket_path.unlink()
+    server = await asyncio.start_unix_server(handle_connection, path=str(socket_path))
+    os.chmod(socket_path, 0o660)
+    # Warm the configured models while already accepting requests
+    asyncio.get_running_loop().run_in_executor(None, local.preload)
+    logger.info(f"Inference server listening on {socket_path}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        local.shutdown()
+
+def main():
+    """Run the inference sidecar shared by all API workers on this host."""
+    parser = argparse.ArgumentParser(description="Run the OCR/TTS inference server")
+    parser.add_argument("--socket", type=Path, default=INFERENCE_SOCKET)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,27 @@
 import os
+import asyncio
 import logging
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
-from app.api.routes import auth_router, users_router, convert_router
-from app.config import ALLOWED_ORIGINS, APP_NAME
-from app.database import Base, engine
+from app.core.startup import startup_report
+from app.api.routes import auth_router, users_router, convert_router, health_router, jobs_router, metrics_router
+from app.config import ALLOWED_ORIGINS, APP_NAME, BATCH_MAX_UPLOAD_BYTES, MODEL_PRELOAD_DELAY_SECONDS
+from app.core.metrics import MetricsMiddleware
+from app.core.uploads import UploadSizeLimitMiddleware
+from app.crud.conversion_search import conversion_search
+from app.database import Base, async_engine, engine
+from app.services import inference
+from app.services.audio_cache import sweep_periodically
+startup_report.mark("imports")
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+with engine.begin() as connection:
+    conversion_search.create_index(connection)
+startup_report.mark("database")
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +30,10 @@ logger = logging.getLogger(__name__)
 # Create FastAPI app
 app = FastAPI(title=APP_NAME)
 
+# Reject oversized uploads before their body is read; added before CORS so that
+# CORS wraps it and browsers can read the 413
+app.add_middleware(UploadSizeLimitMiddleware, path_limits={"/convert/batch": BATCH_MAX_UPLOAD_BYTES})
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -26,12 +41,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read the history page cursor
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Count and time every request, including rejected ones
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router, prefix=f"/auth", tags=["authentication"])
 app.include_router(users_router, prefix=f"/users", tags=["users"])
 app.include_router(convert_router, prefix=f"/convert", tags=["conversions"])
+app.include_router(jobs_router, prefix=f"/jobs", tags=["jobs"])
+app.include_router(health_router, prefix=f"/health", tags=["health"])
+app.include_router(metrics_router, tags=["metrics"])
+startup_report.mark("app")
+
+@app.on_event("startup")
+async def preload_models():
+    """Import the inference stack and warm the configured models in the background, once serving."""
+    loop = asyncio.get_running_loop()
+    loop.call_later(MODEL_PRELOAD_DELAY_SECONDS, loop.run_in_executor, None, inference.backend.preload)
+    startup_report.serving()
+
+@app.on_event("startup")
+async def start_audio_sweep():
+    """Periodically delete synthesized audio that no conversion ended up referencing."""
+    app.state.audio_sweep = asyncio.create_task(sweep_periodically())
+
+@app.on_event("shutdown")
+async def stop_audio_sweep():
+    """Stop the audio sweep."""
+    app.state.audio_sweep.cancel()
+
+@app.on_event("shutdown")
+def stop_workers():
+    """Stop the OCR page worker processes."""
+    inference.backend.shutdown()
+
+@app.on_event("shutdown")
+async def close_database():
+    """Close pooled async connections, whose driver threads would keep the process alive."""
+    await async_engine.dispose()
 
 # frontend_path = Path(__file__).resolve().parent.parent / "frontend" / "dist"
 # app.mount("/", StaticFiles(directory=frontend_path, html=True), name="static")
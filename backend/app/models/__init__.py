@@ -1,2 +1,5 @@
 from app.models.user import User
-from app.models.conversion import Conversion
\ No newline at end of file
+from app.models.conversion import Conversion
+from app.models.conversion_text import ConversionText
+from app.models.job import Job
+from app.models.audio_artifact import AudioArtifact
\ No newline at end of file
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AudioArtifact(Base):
+    __tablename__ = "audio_artifacts"
+    id = Column(Integer, primary_key=True, index=True)
+    # Hash of normalized text, language, model, speaker and output format
+    content_hash = Column(String, unique=True, index=True)
+    file_path = Column(String, unique=True, index=True)
+    size_bytes = Column(Integer, default=0)
+    # Number of conversions pointing at this file, and of requests about to record one
+    ref_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -9,10 +9,23 @@ class Conversion(Base):
     file_name = Column(String, index=True)
     language = Column(String)
     source_type = Column(String)  # "pdf", "image", or "text"
-    text_content = Column(Text, nullable=True)  # If user directly inputs text
+    # Extracted or entered text lives compressed in conversion_texts
+    text_id = Column(Integer, ForeignKey("conversion_texts.id"), nullable=True)
+    text_preview = Column(String, nullable=True)  # First characters, shown in the history list
     audio_file_path = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     # Foreign key to user
     user_id = Column(Integer, ForeignKey("users.id"))
     # Relationship with user
-    owner = relationship("User", back_populates="conversions")
\ No newline at end of file
+    owner = relationship("User", back_populates="conversions")
+    # Only loaded by endpoints that return the full text
+    text = relationship("ConversionText", lazy="raise")
+    # History pages walk one owner's conversions by (created_at, id)
+    __table_args__ = (
+        Index("ix_conversions_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+    @property
+    def text_content(self):
+        """Full text of the conversion; ``text`` must have been loaded."""
+        return self.text.content if self.text is not None else None
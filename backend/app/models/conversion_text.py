@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from app.database import Base
+from app.services.text_store import decompress_text
+
+class ConversionText(Base):
+    __tablename__ = "conversion_texts"
+    id = Column(Integer, primary_key=True, index=True)
+    # SHA-256 of the UTF-8 text, identical texts are stored once
+    content_hash = Column(String, unique=True, index=True)
+    codec = Column(String)  # "zstd" or "zlib"
+    size_bytes = Column(Integer)  # Uncompressed UTF-8 size
+    data = Column(LargeBinary)
+    # Number of conversions pointing at this text
+    ref_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    @property
+    def content(self) -> str:
+        """The decompressed text."""
+        return decompress_text(self.codec, self.data)
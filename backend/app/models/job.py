@@ -0,0 +1,38 @@
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Float, ForeignKey, Text
+from sqlalchemy.sql import func
+from app.database import Base
+
+# Job statuses
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+JOB_FINISHED = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    source_type = Column(String)  # "pdf", "image", or "text"
+    file_name = Column(String, nullable=True)
+    language = Column(String)
+    speaker = Column(String, nullable=True)
+    input_path = Column(String, nullable=True)  # Uploaded file awaiting OCR
+    content_hash = Column(String, nullable=True)  # SHA-256 of the upload
+    text_content = Column(Text, nullable=True)  # Text to synthesize for text jobs
+    # State machine: queued -> running -> succeeded | failed | cancelled
+    status = Column(String, default="queued", index=True)
+    stage = Column(String, default="queued")  # "queued", "ocr", "tts", "saving", "done"
+    progress = Column(Float, default=0.0)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(DateTime, index=True)  # Earliest time a worker may claim the job
+    cancel_requested = Column(Boolean, default=False)
+    locked_by = Column(String, nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+    conversion_id = Column(Integer, ForeignKey("conversions.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Foreign key to user
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
@@ -1,5 +1,6 @@
 from app.schemas.user import User, UserCreate, UserUpdate, UserInDB, Token, TokenData
 from app.schemas.conversion import (
-    Conversion, ConversionCreate, ConversionUpdate, 
-    ConversionInDB, TextToSpeechRequest
-)
\ No newline at end of file
+    BatchItemResult, Conversion, ConversionCreate, ConversionUpdate, 
+    ConversionInDB, ConversionSearchResult, ConversionSummary, TextToSpeechRequest, TextConversionRequest
+)
+from app.schemas.job import Job, JobCreate, JobUpdate
\ No newline at end of file
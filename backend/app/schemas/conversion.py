@@ -29,7 +29,40 @@ class Conversion(ConversionInDBBase):
 class ConversionInDB(ConversionInDBBase):
     pass
 
+class ConversionSummary(BaseModel):
+    """A conversion in the history list; text_content is only set when requested."""
+    id: int
+    user_id: int
+    file_name: Optional[str] = None
+    language: Optional[str] = None
+    source_type: str
+    audio_file_path: str
+    created_at: datetime
+    text_preview: Optional[str] = None
+    text_content: Optional[str] = None
+    class Config:
+        from_attributes = True
+
+class ConversionSearchResult(ConversionSummary):
+    """A conversion matching a search, with its rank and a snippet of the matching text."""
+    rank: float
+    snippet: Optional[str] = None
+
+class BatchItemResult(BaseModel):
+    """Outcome of one document of a batch conversion."""
+    index: int  # Position of the document in the upload, ZIP entries counted in archive order
+    file_name: str
+    status: str  # "succeeded" or "failed"
+    language: Optional[str] = None
+    conversion_id: Optional[int] = None
+    error: Optional[str] = None
+
 class TextToSpeechRequest(BaseModel):
     text: str
     language: str = "en"
     speaker: Optional[str] = None
+
+class TextConversionRequest(TextToSpeechRequest):
+    format: Optional[str] = Field(None, description="Output format: 'wav', 'mp3' or 'opus'")
+    sample_rate: Optional[int] = None
+    bit_depth: Optional[int] = Field(None, description="Bits per sample, wav only")
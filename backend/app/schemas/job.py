@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class JobBase(BaseModel):
+    source_type: str
+    file_name: Optional[str] = None
+    language: Optional[str] = None
+
+class JobCreate(JobBase):
+    speaker: Optional[str] = None
+    text_content: Optional[str] = None
+
+class JobUpdate(BaseModel):
+    stage: Optional[str] = None
+    progress: Optional[float] = None
+
+class Job(JobBase):
+    id: int
+    status: str
+    stage: str
+    progress: float
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    conversion_id: Optional[int] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
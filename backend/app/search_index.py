@@ -0,0 +1,27 @@
+"""Rebuild the conversion search index from the stored conversions.
+
+Usage, from the backend directory:
+    python -m app.search_index
+"""
+import argparse
+import logging
+import time
+import app.models  # noqa: F401  registers the tables create_all creates
+from app.crud.conversion_search import conversion_search
+from app.database import Base, engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Drop and repopulate the search index in one transaction."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        indexed = conversion_search.rebuild(connection)
+    logger.info("Indexed %d conversions in %.1fs", indexed, time.perf_counter() - started)
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,2 @@
 # Import services
-from app.services.ocr_service import pdf_to_text, image_to_text
-from app.services.tts_service import text_to_audio
\ No newline at end of file
+from app.services.inference import pdf_to_text, image_to_text, text_to_audio
\ No newline at end of file
@@ -0,0 +1,137 @@
+import asyncio
+import anyio
+import hashlib
+import logging
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import AUDIO_ARTIFACT_GRACE_SECONDS, AUDIO_ARTIFACT_SWEEP_INTERVAL_SECONDS
+from app.core.metrics import timed_stage
+from app.crud.audio_artifact import audio_artifact
+from app.database import AsyncSessionLocal
+from app.services.audio_encoder import AudioOptions, audio_options, encode
+from app.services.audio_writer import new_audio_path
+from app.services.inference import text_to_audio
+from app.services.tts_models import get_model_name
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Syntheses in progress in this process, keyed by cache key
+_inflight: Dict[str, asyncio.Future] = {}
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share a cache entry."""
+    return ' '.join(unicodedata.normalize("NFC", text).split())
+
+async def register_audio(db: AsyncSession, key: str, audio_file_path: Path) -> Tuple[Path, bool]:
+    """Record synthesized audio under its cache key; returns the path to use and whether it was a duplicate.
+
+    The caller holds one reference to the audio, as with get_or_synthesize.
+    Single-flight only holds within a process, so another process may have
+    synthesized and registered the same key meanwhile. Its file is used
+    then, and this one is deleted.
+    """
+    artifact = await audio_artifact.aregister(db, content_hash=key, file_path=str(audio_file_path))
+    if artifact.file_path == str(audio_file_path):
+        return audio_file_path, False
+    logger.info(f"Audio for {key[:12]} was synthesized concurrently elsewhere; keeping that copy")
+    await run_in_threadpool(audio_file_path.unlink, missing_ok=True)
+    return Path(artifact.file_path), True
+
+async def release_audio(audio_file_path: Path):
+    """Hand back the reference to audio no conversion was recorded with, even while cancelled."""
+    with anyio.CancelScope(shield=True):
+        try:
+            async with AsyncSessionLocal() as db:
+                await audio_artifact.adrop(db, file_path=str(audio_file_path))
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Could not release audio {audio_file_path}: {e}")
+
+async def sweep_unreferenced_audio(older_than_seconds: float = AUDIO_ARTIFACT_GRACE_SECONDS) -> int:
+    """Delete synthesized audio that no conversion references, such as that handed back by failed requests."""
+    async with AsyncSessionLocal() as db:
+        paths = await audio_artifact.asweep_unreferenced(db, older_than_seconds=older_than_seconds)
+    for path in paths:
+        await run_in_threadpool(Path(path).unlink, missing_ok=True)
+    if paths:
+        logger.info(f"Removed {len(paths)} unreferenced audio files")
+    return len(paths)
+
+async def sweep_periodically(interval_seconds: float = AUDIO_ARTIFACT_SWEEP_INTERVAL_SECONDS):
+    """Sweep unreferenced audio every interval until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await sweep_unreferenced_audio()
+        except Exception as e:
+            logger.error(f"Audio sweep failed: {e}")
+
+def audio_cache_key(
+    text: str, lang: str, speaker: Optional[str] = None, output_format: str = "wav"
+) -> str:
+    """Hash everything that determines the synthesized audio."""
+    parts = (normalize_text(text), lang, get_model_name(lang), speaker or "", output_format)
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+async def get_or_synthesize(
+    db: AsyncSession,
+    text: str,
+    lang: str,
+    speaker: Optional[str] = None,
+    options: Optional[AudioOptions] = None,
+    **tts_kwargs
+) -> Tuple[Path, bool]:
+    """Return audio for text, reusing an identical earlier synthesis when possible.
+
+    The audio is stored in the requested output format, AUDIO_DEFAULT_FORMAT
+    if none is given; the synthesized WAV is only kept when that is what was
+    asked for. Concurrent identical requests wait on one synthesis. Returns
+    the audio path and whether it came from the cache.
+
+    The audio comes with one reference, taken as it is looked up or
+    registered, so deleting other conversions cannot remove it meanwhile.
+    The conversion the caller records takes it over; a caller that records
+    none hands it back with release_audio.
+    """
+    options = options or audio_options()
+    key = audio_cache_key(text, lang, speaker, options.name)
+    while True:
+        # Commits either way, returning the connection to the pool while synthesis runs
+        artifact = await audio_artifact.aacquire_by_hash(db, content_hash=key)
+        if artifact is not None:
+            logger.info(f"Audio cache hit for {key[:12]}")
+            return Path(artifact.file_path), True
+        inflight = _inflight.get(key)
+        if inflight is None:
+            break
+        # Once registered, the audio is acquired like any cache hit
+        await asyncio.shield(inflight)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        audio_file_path = await text_to_audio(text, lang, speaker, **tts_kwargs)
+        if not options.is_synthesized():
+            wav_path = audio_file_path
+            try:
+                with timed_stage("encode"):
+                    audio_file_path = await encode(wav_path, new_audio_path(lang, options.suffix), options)
+            finally:
+                wav_path.unlink(missing_ok=True)
+        audio_file_path, duplicate = await register_audio(db, key, audio_file_path)
+        future.set_result(audio_file_path)
+        return audio_file_path, duplicate
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved when nobody else was waiting
+        future.exception()
+        raise
+    finally:
+        _inflight.pop(key, None)
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Optional
+from app.config import (
+    AUDIO_DEFAULT_FORMAT, AUDIO_MP3_BITRATE, AUDIO_OPUS_BITRATE,
+    AUDIO_ENCODE_WORKERS, FFMPEG_BINARY
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bounds the ffmpeg processes running at once; the threads only wait on them
+encode_pool = ThreadPoolExecutor(max_workers=AUDIO_ENCODE_WORKERS)
+
+# File suffix and media type of each output format
+AUDIO_FORMATS = {
+    "wav": (".wav", "audio/wav"),
+    "mp3": (".mp3", "audio/mpeg"),
+    "opus": (".ogg", "audio/ogg"),
+}
+
+# Other names accepted for a format
+FORMAT_ALIASES = {"ogg": "opus"}
+
+# Sample rates each encoder accepts
+SAMPLE_RATES = {
+    "wav": (8000, 11025, 16000, 22050, 24000, 32000, 44100, 48000),
+    "mp3": (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000),
+    "opus": (8000, 12000, 16000, 24000, 48000),
+}
+
+# PCM codec for each WAV bit depth
+WAV_CODECS = {16: "pcm_s16le", 24: "pcm_s24le", 32: "pcm_s32le"}
+
+# Media types of stored audio by file suffix
+MEDIA_TYPES = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".m4a": "audio/mp4",
+}
+
+
+class AudioEncodingError(Exception):
+    """ffmpeg is missing or failed to encode."""
+
+
+@dataclass(frozen=True)
+class AudioOptions:
+    """Output format of a piece of audio; unset fields keep the source's values."""
+    format: str = "wav"
+    sample_rate: Optional[int] = None
+    bit_depth: Optional[int] = None
+
+    @property
+    def suffix(self) -> str:
+        return AUDIO_FORMATS[self.format][0]
+
+    @property
+    def media_type(self) -> str:
+        return AUDIO_FORMATS[self.format][1]
+
+    @property
+    def name(self) -> str:
+        """Short identifier, e.g. "opus" or "wav-16000-24bit"."""
+        parts = [self.format]
+        if self.sample_rate:
+            parts.append(str(self.sample_rate))
+        if self.bit_depth:
+            parts.append(f"{self.bit_depth}bit")
+        return "-".join(parts)
+
+    def is_synthesized(self) -> bool:
+        """Whether these are the settings the synthesizer writes, so no encoding is needed."""
+        return self == AudioOptions()
+
+
+def audio_options(
+    format: Optional[str] = None,
+    sample_rate: Optional[int] = None,
+    bit_depth: Optional[int] = None
+) -> AudioOptions:
+    """Validate requested output settings, raising ValueError for unsupported ones."""
+    fmt = (format or AUDIO_DEFAULT_FORMAT).lower()
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    if fmt not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported format '{format}', expected one of: {', '.join(AUDIO_FORMATS)}, ogg")
+    if sample_rate is not None and sample_rate not in SAMPLE_RATES[fmt]:
+        raise ValueError(
+            f"Unsupported sample rate {sample_rate} for {fmt}, expected one of: "
+            f"{', '.join(str(rate) for rate in SAMPLE_RATES[fmt])}"
+        )
+    if bit_depth is not None:
+        if fmt != "wav":
+            raise ValueError("bit_depth only applies to wav")
+        if bit_depth not in WAV_CODECS:
+            raise ValueError(f"Unsupported bit depth {bit_depth}, expected one of: 16, 24, 32")
+        if bit_depth == 16:
+            # Synthesized audio is 16-bit already
+            bit_depth = None
+    return AudioOptions(fmt, sample_rate, bit_depth)
+
+
+def format_of(path) -> Optional[str]:
+    """The output format a stored audio file is in, from its suffix."""
+    suffix = Path(path).suffix.lower()
+    for fmt, (fmt_suffix, _) in AUDIO_FORMATS.items():
+        if suffix == fmt_suffix:
+            return fmt
+    return None
+
+
+def media_type_for(path) -> str:
+    """Media type of a stored audio file, from its suffix."""
+    return MEDIA_TYPES.get(Path(path).suffix.lower(), "audio/wav")
+
+
+def ffmpeg_command(src: Path, dest: Path, options: AudioOptions) -> list:
+    """Arguments running ffmpeg to encode src into dest."""
+    cmd = [FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", "-i", str(src), "-vn"]
+    if options.sample_rate:
+        cmd += ["-ar", str(options.sample_rate)]
+    if options.format == "wav":
+        cmd += ["-c:a", WAV_CODECS[options.bit_depth or 16], "-f", "wav"]
+    elif options.format == "mp3":
+        cmd += ["-c:a", "libmp3lame", "-b:a", AUDIO_MP3_BITRATE, "-f", "mp3"]
+    else:
+        cmd += ["-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE, "-f", "ogg"]
+    return cmd + [str(dest)]
+
+
+def encode_audio(src: Path, dest: Path, options: AudioOptions) -> Path:
+    """Encode src into dest with ffmpeg, publishing dest only once it is complete."""
+    if shutil.which(FFMPEG_BINARY) is None:
+        raise AudioEncodingError(f"{FFMPEG_BINARY} is not installed")
+    dest = Path(dest)
+    tmp_path = dest.with_name(f".{dest.name}.{threading.get_ident()}.tmp")
+    result = subprocess.run(
+        ffmpeg_command(src, tmp_path, options), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        tmp_path.unlink(missing_ok=True)
+        error = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise AudioEncodingError(f"ffmpeg failed to encode {options.name}: {error[-1] if error else result.returncode}")
+    os.replace(tmp_path, dest)
+    return dest
+
+
+async def encode(src: Path, dest: Path, options: AudioOptions) -> Path:
+    """Encode audio on the encoder pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(encode_pool, partial(encode_audio, src, dest, options))
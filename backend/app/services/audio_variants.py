@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+from app.config import AUDIO_VARIANT_DIR, AUDIO_VARIANT_MAX_BYTES
+from app.services.audio_encoder import AudioOptions, encode
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class AudioVariantStore:
+    """On-disk store of stored audio transcoded to other formats.
+
+    A variant is named after its original, so all variants of a file can be
+    found and removed with it. Like the OCR page cache, modification time
+    doubles as the last-use time and the least recently used variants are
+    removed once the store grows past ``max_bytes``.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        """Initialize the store.
+        Args:
+            root: Directory holding the variants
+            max_bytes: Size budget of the store, 0 for unlimited
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self._inflight: Dict[Path, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, original: Path, options: AudioOptions) -> Path:
+        """Location of a variant of an original file."""
+        return self.root / f"{Path(original).stem}.{options.name}{options.suffix}"
+
+    def _current_size(self) -> int:
+        """Total size of the store, scanned once and then tracked. Lock must be held."""
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self.root.glob("*") if p.suffix != ".tmp")
+        return self._size
+
+    async def get(self, original: Path, options: AudioOptions) -> Path:
+        """Return the variant of an original file, encoding it on first use.
+
+        Concurrent requests for the same variant wait on one encode.
+        """
+        dest = self.path(original, options)
+        try:
+            os.utime(dest)
+            with self._lock:
+                self.hits += 1
+            return dest
+        except OSError:
+            pass
+
+        inflight = self._inflight.get(dest)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        with self._lock:
+            self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[dest] = future
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                self._current_size()
+            await encode(original, dest, options)
+            with self._lock:
+                self._size = self._current_size() + dest.stat().st_size
+                if self.max_bytes and self._size > self.max_bytes:
+                    self._evict(keep=dest)
+            future.set_result(dest)
+            return dest
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(dest, None)
+
+    def remove(self, original: Path):
+        """Delete every variant of an original file."""
+        freed = 0
+        for path in self.root.glob(f"{Path(original).stem}.*"):
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                continue
+            freed += size
+        with self._lock:
+            if self._size is not None:
+                self._size = max(0, self._size - freed)
+
+    def _evict(self, keep: Path):
+        """Remove least recently used variants down to 90% of the budget. Lock must be held."""
+        entries = []
+        for path in self.root.glob("*"):
+            if path == keep or path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        size = self._size
+        target = int(self.max_bytes * 0.9)
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+            self.evictions += 1
+        self._size = size
+
+    def stats(self) -> Dict[str, Any]:
+        """Store counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+# Transcoded variants of the stored audio, shared by all downloads in this process
+variant_store = AudioVariantStore(AUDIO_VARIANT_DIR, AUDIO_VARIANT_MAX_BYTES)
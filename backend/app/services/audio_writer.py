@@ -0,0 +1,81 @@
+import struct
+import uuid
+import wave
+from pathlib import Path
+from typing import Union
+from app.config import AUDIO_DIR
+from app.core.metrics import timed_stage
+
+
+def new_audio_path(lang: str, suffix: str = ".wav") -> Path:
+    """Generate a unique path for a new audio file."""
+    AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+    return AUDIO_DIR / f"Audio_{lang}_{uuid.uuid4()}{suffix}"
+
+
+def float_to_pcm16(samples) -> bytes:
+    """Convert float samples in [-1, 1] to 16-bit little-endian PCM."""
+    import numpy as np
+    audio = np.asarray(samples, dtype=np.float32)
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+
+def resample(samples, from_rate: int, to_rate: int):
+    """Resample float samples by linear interpolation, enough to join voices of different rates."""
+    import numpy as np
+    audio = np.asarray(samples, dtype=np.float32)
+    if from_rate == to_rate or not len(audio):
+        return audio
+    length = max(1, round(len(audio) * to_rate / from_rate))
+    return np.interp(np.arange(length) * (from_rate / to_rate), np.arange(len(audio)), audio).astype(np.float32)
+
+
+def streaming_wav_header(sample_rate: int, channels: int = 1) -> bytes:
+    """WAV header for 16-bit PCM of unknown length, for progressive playback."""
+    unknown = 0xFFFFFFFF
+    byte_rate = sample_rate * channels * 2
+    return (
+        b"RIFF" + struct.pack("<I", unknown) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, channels * 2, 16)
+        + b"data" + struct.pack("<I", unknown)
+    )
+
+
+class WavWriter:
+    """Incremental 16-bit mono WAV writer; the header is finalized on close."""
+    def __init__(self, path: Union[str, Path], sample_rate: int, channels: int = 1):
+        """Open the output file.
+        Args:
+            path: Destination WAV file
+            sample_rate: Sample rate of the PCM frames that will be written
+            channels: Number of interleaved channels
+        """
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._wav = wave.open(str(self.path), "wb")
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(sample_rate)
+
+    def write(self, pcm: bytes):
+        """Append 16-bit PCM frames."""
+        with timed_stage("file_write"):
+            self._wav.writeframesraw(pcm)
+
+    def write_silence(self, milliseconds: int):
+        """Append the given duration of silence."""
+        frames = int(self.sample_rate * milliseconds / 1000)
+        if frames > 0:
+            self._wav.writeframesraw(b"\x00\x00" * frames * self.channels)
+
+    def close(self):
+        """Patch the header with the final sizes and close the file."""
+        with timed_stage("file_write"):
+            self._wav.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import logging
+import os
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.config import BATCH_INSERT_SIZE, BATCH_PIPELINE_DEPTH, MAX_UPLOAD_BYTES
+from app.core.uploads import UPLOAD_CHUNK_SIZE, StoredUpload, remove_upload, upload_path
+from app.crud.conversion import conversion
+from app.database import AsyncSessionLocal
+from app.services.audio_cache import get_or_synthesize, release_audio
+from app.services.audio_encoder import AudioOptions
+from app.services.inference import pdf_to_text, image_to_text
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Source type of each accepted document extension
+SOURCE_TYPES = {
+    ".pdf": "pdf",
+    ".jpg": "image", ".jpeg": "image", ".png": "image", ".bmp": "image", ".tiff": "image", ".webp": "image",
+}
+
+
+def source_type_of(file_name: str) -> Optional[str]:
+    """Source type of a document by its extension, None if it is not accepted."""
+    return SOURCE_TYPES.get(Path(file_name).suffix.lower())
+
+
+def is_archive(file_name: str) -> bool:
+    """Whether an uploaded file is a ZIP archive of documents."""
+    return Path(file_name).suffix.lower() == ".zip"
+
+
+@dataclass
+class BatchUpload:
+    """A file of a batch request: a document or a ZIP archive of documents."""
+    file_name: str
+    upload: Optional[StoredUpload] = None  # Not stored when the file type is not accepted
+
+
+@dataclass
+class BatchItem:
+    """One document of a batch and what became of it."""
+    index: int
+    file_name: str
+    source_type: Optional[str] = None
+    path: Optional[Path] = None
+    content_hash: Optional[str] = None
+    language: Optional[str] = None
+    text: Optional[str] = None
+    audio_file_path: Optional[Path] = None
+    conversion_id: Optional[int] = None
+    error: Optional[str] = None
+
+    def result(self) -> Dict:
+        """Status reported to the client."""
+        return {
+            "index": self.index,
+            "file_name": self.file_name,
+            "status": "failed" if self.error else "succeeded",
+            "language": self.language,
+            "conversion_id": self.conversion_id,
+            "error": self.error,
+        }
+
+
+def count_documents(uploads: List[BatchUpload]) -> int:
+    """Documents in a batch, counting every entry of its ZIP archives."""
+    count = 0
+    for upload in uploads:
+        if upload.upload is None or not is_archive(upload.file_name):
+            count += 1
+            continue
+        try:
+            with zipfile.ZipFile(upload.upload.path) as archive:
+                count += sum(not info.is_dir() for info in archive.infolist())
+        except (zipfile.BadZipFile, OSError):
+            # Reported as one failed document
+            count += 1
+    return count
+
+
+def _extract_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo, dest: Path, max_bytes: int) -> str:
+    """Decompress one archive entry to dest chunk by chunk; returns its SHA-256.
+
+    The declared size of an entry cannot be trusted, so the copy is abandoned
+    as soon as it grows past max_bytes.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with archive.open(info) as src, open(dest, "wb") as out:
+            while chunk := src.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise ValueError(f"Entry exceeds the limit of {max_bytes} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        if os.path.exists(dest):
+            os.unlink(dest)
+        raise
+    return digest.hexdigest()
+
+
+async def iter_batch_items(uploads: List[BatchUpload], directory: Path) -> AsyncIterator[BatchItem]:
+    """Documents of a batch in order.
+
+    ZIP entries are extracted one at a time, only when the next document is
+    asked for, so an archive is never unpacked as a whole. Archives are
+    deleted once their entries are exhausted.
+    """
+    index = 0
+    for upload in uploads:
+        if upload.upload is None or not is_archive(upload.file_name):
+            item = BatchItem(index, upload.file_name, source_type_of(upload.file_name))
+            if item.source_type is None:
+                item.error = "Unsupported file type"
+            else:
+                item.path, item.content_hash = upload.upload.path, upload.upload.sha256
+            index += 1
+            yield item
+            continue
+        try:
+            archive = await run_in_threadpool(zipfile.ZipFile, upload.upload.path)
+        except (zipfile.BadZipFile, OSError) as e:
+            await remove_upload(upload.upload.path)
+            index += 1
+            yield BatchItem(index - 1, upload.file_name, error=f"Invalid ZIP archive: {e}")
+            continue
+        try:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                item = BatchItem(index, info.filename, source_type_of(info.filename))
+                index += 1
+                if item.source_type is None:
+                    item.error = "Unsupported file type"
+                elif MAX_UPLOAD_BYTES and info.file_size > MAX_UPLOAD_BYTES:
+                    item.error = f"Entry exceeds the limit of {MAX_UPLOAD_BYTES} bytes"
+                else:
+                    path = upload_path(directory, info.filename)
+                    try:
+                        item.content_hash = await run_in_threadpool(
+                            _extract_entry, archive, info, path, MAX_UPLOAD_BYTES
+                        )
+                        item.path = path
+                    except Exception as e:
+                        item.error = f"Could not extract the entry: {e}"
+                yield item
+        finally:
+            archive.close()
+            await remove_upload(upload.upload.path)
+
+
+async def _ocr_stage(items: AsyncIterator[BatchItem], language: str, queue: asyncio.Queue):
+    """Extract the text of each document and hand it on to synthesis, in order."""
+    try:
+        async for item in items:
+            if item.error is None:
+                try:
+                    if item.source_type == "pdf":
+                        text, lang = await pdf_to_text(item.path, language, item.content_hash)
+                    else:
+                        text, lang = await image_to_text(item.path, language, item.content_hash)
+                    if text and text.strip():
+                        item.text, item.language = text, lang
+                    else:
+                        item.error = f"Could not extract text from the {item.source_type}"
+                except Exception as e:
+                    logger.warning(f"Batch OCR of {item.file_name} failed: {e}")
+                    item.error = f"Error extracting text: {e}"
+                finally:
+                    await remove_upload(item.path)
+            # Blocks while synthesis is BATCH_PIPELINE_DEPTH documents behind
+            await queue.put(item)
+    except Exception as e:
+        logger.error(f"Batch stopped reading documents: {e}")
+    await queue.put(None)
+
+
+async def _record(items: List[BatchItem], user_id: int) -> List[Dict]:
+    """Record the conversions of synthesized documents in one transaction.
+
+    If that fails, the references their audio was returned with are handed back.
+    """
+    if not items:
+        return []
+    try:
+        async with AsyncSessionLocal() as db:
+            ids = await conversion.acreate_many_with_owner(
+                db,
+                objs_in=[
+                    {
+                        "file_name": item.file_name,
+                        "language": item.language,
+                        "source_type": item.source_type,
+                        "text_content": item.text,
+                        "audio_file_path": str(item.audio_file_path),
+                    }
+                    for item in items
+                ],
+                user_id=user_id
+            )
+        for item, conversion_id in zip(items, ids):
+            item.conversion_id = conversion_id
+    except Exception as e:
+        logger.error(f"Could not record {len(items)} batch conversions: {e}")
+        for item in items:
+            item.error = f"Could not record the conversion: {e}"
+            await release_audio(item.audio_file_path)
+    return [item.result() for item in items]
+
+
+async def run_batch(
+    uploads: List[BatchUpload],
+    *,
+    language: str,
+    options: AudioOptions,
+    user_id: int,
+    directory: Path
+) -> AsyncIterator[Dict]:
+    """Convert the documents of a batch, yielding the status of each one once it is settled.
+
+    OCR runs in its own task ahead of synthesis, so the next document's text
+    is being extracted while the current one is synthesized. A failed
+    document is reported and skipped; the others carry on. Successful ones
+    are recorded BATCH_INSERT_SIZE at a time, so statuses arrive in batches
+    and not strictly in upload order. Every upload is deleted when the batch
+    ends, including when the client goes away.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=BATCH_PIPELINE_DEPTH)
+    ocr = asyncio.create_task(_ocr_stage(iter_batch_items(uploads, directory), language, queue))
+    synthesized: List[BatchItem] = []
+    try:
+        while (item := await queue.get()) is not None:
+            if item.error is None:
+                try:
+                    # Sessions are only open around queries, not while audio is synthesized
+                    async with AsyncSessionLocal() as db:
+                        item.audio_file_path, _ = await get_or_synthesize(db, item.text, item.language, options=options)
+                    synthesized.append(item)
+                except Exception as e:
+                    logger.warning(f"Batch synthesis of {item.file_name} failed: {e}")
+                    item.error = f"Error synthesizing audio: {e}"
+            if item.error is not None:
+                yield item.result()
+            if len(synthesized) >= BATCH_INSERT_SIZE:
+                recording, synthesized = synthesized, []
+                for result in await _record(recording, user_id):
+                    yield result
+        recording, synthesized = synthesized, []
+        for result in await _record(recording, user_id):
+            yield result
+    finally:
+        # Audio of documents left unrecorded when the client went away
+        for item in synthesized:
+            await release_audio(item.audio_file_path)
+        ocr.cancel()
+        try:
+            await ocr
+        except asyncio.CancelledError:
+            pass
+        for upload in uploads:
+            if upload.upload is not None:
+                await remove_upload(upload.upload.path)
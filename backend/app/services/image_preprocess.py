@@ -0,0 +1,225 @@
+import io
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import numpy as np
+from PIL import Image
+from app.core.metrics import observe_stage
+from app.config import (
+    OCR_PREPROCESS, OCR_MAX_IMAGE_PIXELS, OCR_TARGET_TEXT_HEIGHT,
+    OCR_TILE_SIZE, OCR_TILE_OVERLAP
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """Accumulates time spent per preprocessing stage across images."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals: Dict[str, float] = {}
+        self.images = 0
+
+    def add(self, timings: Dict[str, float]):
+        """Record the stage timings of one image."""
+        with self._lock:
+            self.images += 1
+            for stage, seconds in timings.items():
+                self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """Images processed and mean milliseconds per stage."""
+        with self._lock:
+            return {
+                "images": self.images,
+                "mean_ms": {
+                    stage: round(1000 * total / self.images, 3)
+                    for stage, total in self.totals.items()
+                } if self.images else {},
+            }
+
+# Timings of every image preprocessed in this process
+preprocess_timer = StageTimer()
+
+
+@dataclass
+class PreprocessedImage:
+    """An image prepared for OCR, split into tiles if it is very large."""
+    tiles: List[Tuple[np.ndarray, int, int]]  # (pixels, x offset, y offset)
+    width: int
+    height: int
+    scale: float  # Prepared size relative to the original
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def _open(source: Union[bytes, str, Path, Image.Image]) -> Image.Image:
+    """Open an image without decoding its pixels yet."""
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, bytes):
+        return Image.open(io.BytesIO(source))
+    return Image.open(source)
+
+
+def decode_reduced(source, max_pixels: int = OCR_MAX_IMAGE_PIXELS) -> Image.Image:
+    """Decode an image, letting JPEG decode straight to grayscale at a reduced scale.
+
+    JPEG draft mode scales by 1/2, 1/4 or 1/8 inside the decoder, so the
+    full-resolution pixels are never materialized for huge photos.
+    """
+    img = _open(source)
+    width, height = img.size
+    if img.format == "JPEG":
+        scale = min(1.0, (max_pixels / float(width * height)) ** 0.5) if max_pixels else 1.0
+        img.draft("L", (max(1, int(width * scale)), max(1, int(height * scale))))
+    img.load()
+    return img
+
+
+def to_grayscale(img: Image.Image) -> np.ndarray:
+    """Convert to an 8-bit grayscale array, flattening transparency onto white."""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        background = Image.new("RGBA", img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img.convert("RGBA"))
+    return np.asarray(img.convert("L"))
+
+
+def estimate_text_height(gray: np.ndarray) -> Optional[float]:
+    """Estimate the typical text line height from the row ink profile.
+
+    Pixels darker than the midpoint between the dark and light percentiles
+    are treated as ink; consecutive rows containing ink form a line, and the
+    median line height is returned. None when no plausible lines are found,
+    e.g. for photos or light text on a dark background.
+    """
+    if gray.size == 0:
+        return None
+    low, high = np.percentile(gray[::4, ::4], (2, 98))
+    if high - low < 32:
+        return None
+    ink = gray < (low + high) / 2.0
+    if ink.mean() > 0.5:
+        return None
+    ink_rows = ink.mean(axis=1) > 0.002
+    # Lengths of the runs of consecutive ink rows
+    edges = np.diff(np.concatenate(([0], ink_rows.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    heights = ends - starts
+    heights = heights[heights >= 4]
+    if heights.size == 0:
+        return None
+    line_height = float(np.median(heights))
+    return line_height if line_height < gray.shape[0] / 4 else None
+
+
+def downscale(gray: np.ndarray, text_height: Optional[float]) -> Tuple[np.ndarray, float]:
+    """Shrink the image so text is about OCR_TARGET_TEXT_HEIGHT pixels tall.
+
+    Never upscales, and always keeps the image within OCR_MAX_IMAGE_PIXELS.
+    """
+    height, width = gray.shape
+    scale = 1.0
+    if text_height and OCR_TARGET_TEXT_HEIGHT and text_height > 1.5 * OCR_TARGET_TEXT_HEIGHT:
+        scale = OCR_TARGET_TEXT_HEIGHT / text_height
+    if OCR_MAX_IMAGE_PIXELS and width * height * scale * scale > OCR_MAX_IMAGE_PIXELS:
+        scale = (OCR_MAX_IMAGE_PIXELS / float(width * height)) ** 0.5
+    if scale >= 0.95:
+        return gray, 1.0
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    resized = Image.fromarray(gray).resize(size, Image.BILINEAR, reducing_gap=2.0)
+    return np.asarray(resized), scale
+
+
+def normalize_contrast(gray: np.ndarray) -> np.ndarray:
+    """Stretch the 2nd-98th intensity percentiles to the full range."""
+    low, high = np.percentile(gray[::4, ::4], (2, 98))
+    if high - low < 1:
+        return gray
+    # Apply the stretch through a 256-entry lookup table instead of per-pixel float math
+    levels = np.arange(256, dtype=np.float32)
+    table = np.clip((levels - low) * (255.0 / (high - low)), 0, 255).astype(np.uint8)
+    return table[gray]
+
+
+def make_tiles(gray: np.ndarray, tile_size: int, overlap: int) -> List[Tuple[np.ndarray, int, int]]:
+    """Split an image into overlapping tiles no larger than tile_size."""
+    height, width = gray.shape
+    if not tile_size or (height <= tile_size and width <= tile_size):
+        return [(gray, 0, 0)]
+    stride = max(1, tile_size - overlap)
+    tiles = []
+    for y in range(0, max(1, height - overlap), stride):
+        for x in range(0, max(1, width - overlap), stride):
+            tiles.append((gray[y:y + tile_size, x:x + tile_size], x, y))
+    return tiles
+
+
+def preprocess_image(source) -> PreprocessedImage:
+    """Decode and prepare an image for OCR, recording the time spent per stage."""
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+
+    def mark(stage: str):
+        nonlocal started
+        now = time.perf_counter()
+        timings[stage] = now - started
+        started = now
+
+    img = _open(source)
+    original_width = img.size[0]
+    img = decode_reduced(img)
+    mark("decode")
+    gray = to_grayscale(img)
+    del img
+    mark("grayscale")
+    if OCR_PREPROCESS:
+        gray, _ = downscale(gray, estimate_text_height(gray))
+        mark("downscale")
+        gray = normalize_contrast(gray)
+        mark("contrast")
+    tiles = make_tiles(gray, OCR_TILE_SIZE, OCR_TILE_OVERLAP)
+    mark("tiling")
+    preprocess_timer.add(timings)
+    observe_stage("preprocess", sum(timings.values()))
+    height, width = gray.shape
+    return PreprocessedImage(tiles, width, height, width / float(original_width), timings)
+
+
+def stitch_detections(
+    prepared: PreprocessedImage, tile_results: List[list]
+) -> List[Tuple[list, str, float]]:
+    """Merge per-tile detections into one list in reading order.
+
+    Boxes are shifted back into image coordinates. In overlapping regions a
+    detection is kept only by the tile whose core (its area minus half the
+    overlap on inner edges) contains the box centre, so text near a seam is
+    reported once.
+    """
+    half = OCR_TILE_OVERLAP / 2.0
+    merged = []
+    for (pixels, x0, y0), detections in zip(prepared.tiles, tile_results):
+        tile_height, tile_width = pixels.shape[:2]
+        left = x0 + (half if x0 > 0 else 0)
+        top = y0 + (half if y0 > 0 else 0)
+        right = x0 + tile_width - (half if x0 + tile_width < prepared.width else 0)
+        bottom = y0 + tile_height - (half if y0 + tile_height < prepared.height else 0)
+        for box, text, *rest in detections:
+            points = [(float(px) + x0, float(py) + y0) for px, py in box]
+            cx = sum(p[0] for p in points) / len(points)
+            cy = sum(p[1] for p in points) / len(points)
+            if len(prepared.tiles) > 1 and not (left <= cx < right and top <= cy < bottom):
+                continue
+            merged.append((points, text, rest[0] if rest else 1.0))
+
+    if len(prepared.tiles) > 1 and merged:
+        # Reading order: group boxes into lines by their vertical centre
+        line_height = np.median([max(p[1] for p in d[0]) - min(p[1] for p in d[0]) for d in merged]) or 1
+        merged.sort(key=lambda d: (
+            int(min(p[1] for p in d[0]) // line_height), min(p[0] for p in d[0])
+        ))
+    return merged
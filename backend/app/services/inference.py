@@ -0,0 +1,261 @@
+import asyncio
+import json
+import logging
+import struct
+import threading
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app.core.metrics import Family, note_language
+from app.config import (
+    INFERENCE_BACKEND, INFERENCE_SOCKET, OCR_PRELOAD_LANGUAGES, TTS_PRELOAD_LANGUAGES
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Frames are a 4-byte big-endian length followed by the payload
+_frame_header = struct.Struct(">I")
+
+
+async def write_frame(writer: asyncio.StreamWriter, payload: bytes):
+    """Send one length-prefixed frame."""
+    writer.write(_frame_header.pack(len(payload)) + payload)
+    await writer.drain()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    """Receive one length-prefixed frame."""
+    (size,) = _frame_header.unpack(await reader.readexactly(_frame_header.size))
+    return await reader.readexactly(size)
+
+
+async def write_message(writer: asyncio.StreamWriter, message: Dict[str, Any]):
+    """Send a JSON control frame."""
+    await write_frame(writer, json.dumps(message).encode("utf-8"))
+
+
+async def read_message(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    """Receive a JSON control frame."""
+    return json.loads(await read_frame(reader))
+
+
+class InferenceError(Exception):
+    """Raised when the inference sidecar reports a failure."""
+
+
+class LocalBackend:
+    """Runs OCR and TTS in this process; models load on first use."""
+    def __init__(self):
+        # Set once the OCR and TTS services, and torch with them, are imported
+        self.services_loaded = threading.Event()
+
+    def load_services(self):
+        """Import the OCR and TTS services and the libraries they need, and configure torch."""
+        from app.services import ocr_service, tts_service
+        from app.services.model_registry import configure_torch
+        configure_torch()
+        self.services_loaded.set()
+
+    async def _services(self):
+        """Import the services in a thread unless that is done, as the import would stall the event loop.
+
+        A request arriving while the delayed preload imports them waits in
+        that thread on the import lock, leaving the loop free.
+        """
+        if not self.services_loaded.is_set():
+            await asyncio.get_running_loop().run_in_executor(None, self.load_services)
+
+    async def pdf_to_text(
+        self, pdf_path: Path, lang: str, content_hash: Optional[str] = None
+    ) -> Tuple[str, str]:
+        await self._services()
+        from app.services.ocr_service import pdf_to_text
+        return await pdf_to_text(Path(pdf_path), lang, content_hash)
+
+    async def image_to_text(
+        self, image_path: Path, lang: str, content_hash: Optional[str] = None
+    ) -> Tuple[str, str]:
+        await self._services()
+        from app.services.ocr_service import image_to_text
+        return await image_to_text(Path(image_path), lang, content_hash)
+
+    async def text_to_audio(self, text: str, lang: str, speaker: Optional[str] = None, **kwargs) -> Path:
+        await self._services()
+        from app.services.tts_service import text_to_audio
+        return await text_to_audio(text, lang, speaker, **kwargs)
+
+    async def stream_text_to_audio(
+        self, text: str, lang: str, output_file: Path, speaker: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        await self._services()
+        from app.services.tts_service import stream_text_to_audio
+        async for chunk in stream_text_to_audio(text, lang, Path(output_file), speaker):
+            yield chunk
+
+    async def status(self) -> Dict[str, Any]:
+        """Warm models, cache counters and whether the configured models are loaded."""
+        if not self.services_loaded.is_set():
+            # Importing the services here would stall the event loop for seconds
+            return {"backend": "local", "ready": False, "inference": "importing"}
+        from app.services.ocr_service import reader_registry, reader_languages, page_cache
+        from app.services.tts_service import tts_registry, get_model_name
+        from app.services.image_preprocess import preprocess_timer
+        warm_tts = set(tts_registry.loaded_keys())
+        warm_ocr = set(reader_registry.loaded_keys())
+        ready = (
+            all(get_model_name(lang) in warm_tts for lang in TTS_PRELOAD_LANGUAGES)
+            and all(reader_languages(lang) in warm_ocr for lang in OCR_PRELOAD_LANGUAGES)
+        )
+        return {
+            "backend": "local",
+            "ready": ready,
+            "inference": "loaded" if ready else "loading models",
+            "tts": tts_registry.stats(),
+            "ocr": reader_registry.stats(),
+            "ocr_page_cache": page_cache.stats(),
+            "ocr_preprocess": preprocess_timer.stats(),
+        }
+
+    async def metrics(self) -> List[Family]:
+        """Metrics of this process are collected by /metrics directly."""
+        return []
+
+    def preload(self):
+        """Import the inference stack, then load the configured OCR readers and TTS models.
+
+        It runs in the background without being awaited, so a failure is
+        logged here; /health/ready stays unavailable until it is fixed.
+        """
+        try:
+            self.load_services()
+            from app.services.ocr_service import preload_ocr_readers
+            from app.services.tts_service import preload_tts_models
+            preload_ocr_readers()
+            preload_tts_models()
+        except Exception as e:
+            logger.error(f"Preloading the inference stack failed: {e}")
+
+    def shutdown(self):
+        """Stop worker pools owned by the services."""
+        import sys
+        ocr_service = sys.modules.get("app.services.ocr_service")
+        if ocr_service is not None:
+            ocr_service.page_engine.shutdown()
+
+
+class SidecarBackend:
+    """Forwards OCR and TTS to the inference server over a Unix socket.
+
+    Paths are exchanged instead of file contents, so the sidecar must share
+    the upload and audio directories with the API workers.
+    """
+    def __init__(self, socket_path: Path):
+        self.socket_path = str(socket_path)
+
+    async def _exchange(self, op: str, **args) -> AsyncIterator[Dict[str, Any]]:
+        """Send a request and yield response frames until the final one."""
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        try:
+            await write_message(writer, {"op": op, "args": args})
+            while True:
+                message = await read_message(reader)
+                if message["type"] == "error":
+                    raise InferenceError(message["detail"])
+                if message["type"] == "chunk":
+                    message["data"] = await read_frame(reader)
+                yield message
+                if message["type"] == "result":
+                    return
+        finally:
+            writer.close()
+
+    async def _call(self, op: str, **args) -> Any:
+        """Send a request and return its result."""
+        async for message in self._exchange(op, **args):
+            if message["type"] == "result":
+                return message["value"]
+
+    async def pdf_to_text(
+        self, pdf_path: Path, lang: str, content_hash: Optional[str] = None
+    ) -> Tuple[str, str]:
+        text, lang = await self._call(
+            "pdf_to_text", pdf_path=str(pdf_path), lang=lang, content_hash=content_hash
+        )
+        return text, lang
+
+    async def image_to_text(
+        self, image_path: Path, lang: str, content_hash: Optional[str] = None
+    ) -> Tuple[str, str]:
+        text, lang = await self._call(
+            "image_to_text", image_path=str(image_path), lang=lang, content_hash=content_hash
+        )
+        return text, lang
+
+    async def text_to_audio(self, text: str, lang: str, speaker: Optional[str] = None, **kwargs) -> Path:
+        return Path(await self._call("text_to_audio", text=text, lang=lang, speaker=speaker, **kwargs))
+
+    async def stream_text_to_audio(
+        self, text: str, lang: str, output_file: Path, speaker: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        async for message in self._exchange(
+            "stream_text_to_audio", text=text, lang=lang, output_file=str(output_file), speaker=speaker
+        ):
+            if message["type"] == "chunk":
+                yield message["data"]
+
+    async def status(self) -> Dict[str, Any]:
+        try:
+            return {**await self._call("status"), "backend": "sidecar"}
+        except (OSError, asyncio.IncompleteReadError, InferenceError) as e:
+            return {"backend": "sidecar", "ready": False, "inference": "unreachable", "error": str(e)}
+
+    async def metrics(self) -> List[Family]:
+        """Metric families of the sidecar process, where OCR and TTS run."""
+        try:
+            return [
+                (name, kind, documentation, [(suffix, labels, value) for suffix, labels, value in samples])
+                for name, kind, documentation, samples in await self._call("metrics")
+            ]
+        except (OSError, asyncio.IncompleteReadError, InferenceError) as e:
+            logger.warning(f"Could not read sidecar metrics: {e}")
+            return []
+
+    def preload(self):
+        """The sidecar preloads its own models."""
+
+    def shutdown(self):
+        """The sidecar owns its worker pools."""
+
+
+def _create_backend():
+    """Pick the backend configured by INFERENCE_BACKEND."""
+    if INFERENCE_BACKEND == "sidecar":
+        logger.info(f"Using inference sidecar at {INFERENCE_SOCKET}")
+        return SidecarBackend(INFERENCE_SOCKET)
+    return LocalBackend()
+
+backend = _create_backend()
+
+async def pdf_to_text(pdf_path: Path, lang: str, content_hash: Optional[str] = None) -> Tuple[str, str]:
+    """Convert a PDF file to text."""
+    text, lang = await backend.pdf_to_text(pdf_path, lang, content_hash)
+    note_language(lang)
+    return text, lang
+
+async def image_to_text(image_path: Path, lang: str, content_hash: Optional[str] = None) -> Tuple[str, str]:
+    """Convert an image file to text."""
+    text, lang = await backend.image_to_text(image_path, lang, content_hash)
+    note_language(lang)
+    return text, lang
+
+async def text_to_audio(text: str, lang: str, speaker: Optional[str] = None, **kwargs) -> Path:
+    """Convert text to audio."""
+    note_language(lang)
+    return await backend.text_to_audio(text, lang, speaker, **kwargs)
+
+def stream_text_to_audio(
+    text: str, lang: str, output_file: Path, speaker: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    """Stream text as progressive WAV while persisting it to output_file."""
+    note_language(lang)
+    return backend.stream_text_to_audio(text, lang, output_file, speaker)
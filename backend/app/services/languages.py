@@ -0,0 +1,223 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from app.config import LANGUAGE_DETECT_CHARS, LANGUAGE_MIN_PASSAGE_CHARS
+
+# Languages OCR accepts, by the codes used in requests
+supported_languages = [
+    'bn', 'ja', 'zh-cn', 'zh-tw', 'ko', 'ru', 'bg', 'be', 'uk',
+    'cs', 'pl', 'sk', 'da', 'no', 'sv', 'nl', 'de', 'fr', 'it',
+    'es', 'pt', 'en'
+]
+
+# Language of requests that leave it to be detected per page and passage
+AUTO_LANGUAGE = "auto"
+
+# Languages written in each script, the most likely first
+script_languages = {
+    'Latin': (
+        'en', 'de', 'fr', 'es', 'it', 'nl', 'pt', 'pl', 'cs', 'sk', 'da', 'no', 'sv', 'tr',
+        'et', 'ga', 'fi', 'hr', 'hu', 'lt', 'lv', 'mt', 'ro', 'sl', 'ca'
+    ),
+    'Cyrillic': ('ru', 'uk', 'bg', 'be'),
+    'Greek': ('el',),
+    'Bengali': ('bn',),
+    'Japanese': ('ja',),
+    'Han': ('zh-cn', 'zh-tw'),
+    'Hangul': ('ko',),
+    'Arabic': ('fa',),
+}
+
+# Unicode character name prefixes of each script
+_script_prefixes = {
+    'LATIN': 'Latin', 'CYRILLIC': 'Cyrillic', 'GREEK': 'Greek', 'BENGALI': 'Bengali',
+    'HIRAGANA': 'Japanese', 'KATAKANA': 'Japanese', 'CJK': 'Han', 'HANGUL': 'Hangul', 'ARABIC': 'Arabic',
+}
+
+# Pieces of text end after sentence terminators and line breaks
+_piece_end = re.compile(r'(?<=[.!?;。！？；।॥\n])')
+
+# Probability assumed for a language langdetect does not list, which also prices a change of language
+_unlisted_probability = 0.01
+
+# Scripts whose languages one reader cannot combine; their pages are read as the first language
+_single_reader_scripts = {'Han'}
+
+
+def script_reader_languages(script: str) -> Tuple[str, ...]:
+    """Language set of the OCR reader for a script: its languages OCR supports, and English."""
+    languages = [lang for lang in script_languages.get(script, ()) if lang in supported_languages]
+    if script in _single_reader_scripts:
+        languages = languages[:1]
+    return tuple(sorted({'en', *languages}))
+
+
+@lru_cache(maxsize=8192)
+def _char_script(char: str) -> Optional[str]:
+    if not char.isalpha():
+        return None
+    return _script_prefixes.get(unicodedata.name(char, '').split(' ', 1)[0])
+
+
+def detect_script(text: str) -> Optional[str]:
+    """The script most letters of a text are written in, None if it has no letters."""
+    counts = Counter(script for script in map(_char_script, text) if script is not None)
+    if not counts:
+        return None
+    # Japanese mixes kanji with kana; a share of kana is enough to tell it from Chinese
+    if counts['Japanese'] and counts['Japanese'] >= 0.1 * (counts['Japanese'] + counts['Han']):
+        counts['Japanese'] += counts.pop('Han', 0)
+    return counts.most_common(1)[0][0]
+
+
+@lru_cache(maxsize=None)
+def _detector_factory():
+    """langdetect's profiles, loaded on first use and seeded so guesses are repeatable."""
+    from langdetect import DetectorFactory, detector_factory
+    detector_factory.init_factory()
+    DetectorFactory.seed = 0
+    return detector_factory._factory
+
+
+def _language_scores(text: str, candidates: Sequence[str]) -> Dict[str, float]:
+    """langdetect's probability of each candidate language for a text, empty if it cannot tell."""
+    from langdetect.lang_detect_exception import LangDetectException
+    try:
+        detector = _detector_factory().create()
+        detector.append(text)
+        return {guess.lang: guess.prob for guess in detector.get_probabilities() if guess.lang in candidates}
+    except LangDetectException:
+        return {}
+
+
+def detect_language(text: str, script: Optional[str] = None) -> Optional[str]:
+    """Language of a passage: its script, narrowed down by langdetect when the script has several."""
+    script = script or detect_script(text)
+    if script is None:
+        return None
+    candidates = script_languages.get(script, ('en',))
+    if len(candidates) == 1:
+        return candidates[0]
+    scores = _language_scores(text, candidates)
+    return max(scores, key=scores.get) if scores else candidates[0]
+
+
+def _cut(piece: str, max_chars: int) -> Iterator[str]:
+    """Cut a piece longer than max_chars at spaces, or anywhere if it has none."""
+    while len(piece) > max_chars:
+        cut = piece.rfind(' ', 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        yield piece[:cut]
+        piece = piece[cut:]
+    yield piece
+
+
+def _label_pieces(pieces: List[str], candidates: Sequence[str], window: int, min_chars: int) -> List[str]:
+    """Language of each consecutive piece of text in one script.
+
+    Pieces are first scored together, ``window`` characters at a time.
+    Windows that border a window of another language, or that langdetect
+    finds mixed, have their pieces scored one by one. The labelling with
+    the best total score is then found by dynamic programming, each change of language
+    costing as much as min_chars characters of clear evidence, as does
+    starting in another language than the script's first. A boundary
+    between passages thus falls on the sentence where the language changes,
+    while a single ambiguous or foreign-looking sentence does not switch it.
+    """
+    windows: List[List[int]] = []
+    size = window
+    for index, piece in enumerate(pieces):
+        if size >= window:
+            windows.append([])
+            size = 0
+        windows[-1].append(index)
+        size += len(piece)
+    window_scores = [_language_scores(''.join(pieces[i] for i in indices), candidates) for indices in windows]
+    window_labels = [max(score, key=score.get) if score else None for score in window_scores]
+    scores: List[Dict[str, float]] = []
+    for number, (indices, score) in enumerate(zip(windows, window_scores)):
+        if len(score) > 1 or len(set(window_labels[max(0, number - 1):number + 2])) > 1:
+            scores.extend(_language_scores(pieces[i], candidates) for i in indices)
+        else:
+            scores.extend(score for _ in indices)
+    labels = sorted({candidates[0], *(lang for score in scores for lang in score)}, key=candidates.index)
+    switch = -math.log(_unlisted_probability)
+    costs = {lang: 0.0 if lang == candidates[0] else switch for lang in labels}
+    back: List[Dict[str, str]] = []
+    for piece, score in zip(pieces, scores):
+        weight = len(piece.strip()) / min_chars
+        step, pointers = {}, {}
+        for lang in labels:
+            previous = min(labels, key=lambda prev: costs[prev] + (0.0 if prev == lang else switch))
+            evidence = -weight * math.log(max(score.get(lang, 0.0), _unlisted_probability))
+            step[lang] = costs[previous] + (0.0 if previous == lang else switch) + evidence
+            pointers[lang] = previous
+        costs = step
+        back.append(pointers)
+    lang = min(labels, key=costs.get)
+    result = []
+    for pointers in reversed(back):
+        result.append(lang)
+        lang = pointers[lang]
+    return result[::-1]
+
+
+def split_by_language(
+    text: str, window: int = LANGUAGE_DETECT_CHARS, min_chars: int = LANGUAGE_MIN_PASSAGE_CHARS
+) -> List[Tuple[str, str]]:
+    """Contiguous passages of one language, in order, as (language, text).
+
+    Text is cut into runs of one script at sentence and line ends, which is
+    exact and cheap. In scripts shared by several languages, each sentence
+    of a run is then labelled with a language, sentences longer than
+    ``window`` characters being cut first; see _label_pieces. Passages shorter than
+    ``min_chars``, such as a heading or a quoted name, join the passage
+    before them so that a voice is not switched for a few words.
+    """
+    runs: List[List] = []  # [script, pieces]
+    for piece in _piece_end.split(text):
+        script = detect_script(piece)
+        if runs and (script is None or script == runs[-1][0]):
+            runs[-1][1].append(piece)
+        elif runs and runs[-1][0] is None:
+            runs[-1][0] = script
+            runs[-1][1].append(piece)
+        else:
+            runs.append([script, [piece]])
+
+    passages: List[List] = []  # [language, text]
+    for script, pieces in runs:
+        candidates = script_languages.get(script, ('en',)) if script else (None,)
+        if len(candidates) == 1:
+            labelled = [(candidates[0], ''.join(pieces))]
+        else:
+            pieces = [chunk for piece in pieces for chunk in _cut(piece, window)]
+            labelled = zip(_label_pieces(pieces, candidates, window, min_chars), pieces)
+        for lang, piece in labelled:
+            if passages and passages[-1][0] == lang:
+                passages[-1][1] += piece
+            else:
+                passages.append([lang, piece])
+
+    groups: List[List] = []
+    for lang, passage in passages:
+        short = len(passage.strip()) < min_chars
+        if groups and (lang == groups[-1][0] or short or groups[-1][0] is None):
+            groups[-1][0] = groups[-1][0] or lang
+            groups[-1][1] += passage
+        elif groups and len(groups[-1][1].strip()) < min_chars and len(groups) == 1:
+            # A short opening passage takes the language of what follows it
+            groups[-1] = [lang, groups[-1][1] + passage]
+        else:
+            groups.append([lang, passage])
+    return [(lang or 'en', passage) for lang, passage in groups if passage.strip()]
+
+
+def document_language(text: str) -> str:
+    """Language of a whole text, AUTO_LANGUAGE when its passages are in several."""
+    languages = {lang for lang, _ in split_by_language(text)}
+    return languages.pop() if len(languages) == 1 else AUTO_LANGUAGE
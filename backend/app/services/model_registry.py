@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+from app.config import DEVICE, TORCH_NUM_THREADS
+from app.core.metrics import timed_stage, watch_model_registry
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def torch_device() -> str:
+    """Device models run on: DEVICE if set, else CUDA when available. Imports torch on first call."""
+    if DEVICE:
+        return DEVICE
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+@lru_cache(maxsize=None)
+def configure_torch():
+    """Apply TORCH_NUM_THREADS to this process, once; every model loaded afterwards shares it."""
+    if TORCH_NUM_THREADS <= 0:
+        return
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(TORCH_NUM_THREADS)
+
+
+def torch_module_bytes(*modules) -> int:
+    """Estimate the memory held by the parameters and buffers of torch modules."""
+    total = 0
+    for module in modules:
+        if module is None:
+            continue
+        for attr in ("parameters", "buffers"):
+            tensors = getattr(module, attr, None)
+            if tensors is None:
+                continue
+            try:
+                total += sum(t.numel() * t.element_size() for t in tensors())
+            except Exception:
+                continue
+    return total
+
+
+class ModelRegistry:
+    """Process-wide LRU cache of loaded models with a memory budget.
+
+    Models are built at most once per key: concurrent callers asking for a key
+    that is still loading wait on the same in-flight load instead of starting
+    their own (single-flight). When the summed size of the cached models goes
+    over ``max_bytes`` the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[Hashable], Any],
+        max_bytes: int = 0,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        default_size: int = 0,
+    ):
+        """Initialize the registry.
+        Args:
+            name: Name used in logs and stats
+            loader: Callable building the model for a key
+            max_bytes: Memory budget for cached models, 0 for unlimited
+            sizeof: Callable estimating the memory held by a model
+            default_size: Size assumed when ``sizeof`` cannot tell
+        """
+        self.name = name
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.default_size = default_size
+        self._lock = threading.Lock()
+        self._models: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        watch_model_registry(self)
+
+    def _claim(self, key: Hashable):
+        """Return (model, future, owner) for a key under the registry lock."""
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key], None, False
+            future = self._inflight.get(key)
+            if future is not None:
+                self.hits += 1
+                return None, future, False
+            self.misses += 1
+            future = Future()
+            self._inflight[key] = future
+            return None, future, True
+
+    def _load(self, key: Hashable, future: Future) -> Any:
+        """Build the model for a key and publish it to waiting callers."""
+        try:
+            logger.info(f"Loading {self.name} model for {key}")
+            with timed_stage(f"{self.name}_model_load"):
+                model = self.loader(key)
+            size = self._measure(model)
+            with self._lock:
+                self._models[key] = model
+                self._sizes[key] = size
+                self._evict()
+            future.set_result(model)
+            return model
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _measure(self, model: Any) -> int:
+        """Estimate the memory held by a model."""
+        size = 0
+        if self.sizeof is not None:
+            try:
+                size = int(self.sizeof(model))
+            except Exception as e:
+                logger.warning(f"Could not size {self.name} model: {e}")
+        return size or self.default_size
+
+    def _evict(self):
+        """Drop least recently used models until the budget is met. Lock must be held."""
+        if not self.max_bytes:
+            return
+        while len(self._models) > 1 and sum(self._sizes.values()) > self.max_bytes:
+            key, _ = self._models.popitem(last=False)
+            freed = self._sizes.pop(key, 0)
+            self.evictions += 1
+            logger.info(f"Evicted {self.name} model for {key} ({freed} bytes)")
+
+    def get(self, key: Hashable) -> Any:
+        """Get the model for a key, loading it in the calling thread if needed."""
+        model, future, owner = self._claim(key)
+        if future is None:
+            return model
+        if owner:
+            return self._load(key, future)
+        return future.result()
+
+    async def aget(self, key: Hashable, executor=None) -> Any:
+        """Get the model for a key without blocking the event loop."""
+        model, future, owner = self._claim(key)
+        if future is None:
+            return model
+        if owner:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, self._load, key, future)
+        return await asyncio.wrap_future(future)
+
+    def preload(self, keys: Iterable[Hashable]):
+        """Load models for the given keys, logging instead of raising on failure."""
+        for key in keys:
+            try:
+                self.get(key)
+            except Exception as e:
+                logger.error(f"Failed to preload {self.name} model for {key}: {e}")
+
+    def loaded_keys(self) -> List[Hashable]:
+        """Keys of the models currently resident, least recently used first."""
+        with self._lock:
+            return list(self._models)
+
+    def clear(self):
+        """Drop all cached models."""
+        with self._lock:
+            self._models.clear()
+            self._sizes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters and current memory use."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "loaded": [list(k) if isinstance(k, tuple) else k for k in self._models],
+                "loading": [list(k) if isinstance(k, tuple) else k for k in self._inflight],
+                "bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class OCRPageCache:
+    """On-disk store of OCR text per (content hash, page, language, engine version).
+
+    Entries are plain text files; their modification time doubles as the
+    last-use time, and the least recently used files are removed once the
+    store grows past ``max_bytes``.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        """Initialize the store.
+        Args:
+            root: Directory holding the cached pages
+            max_bytes: Size budget of the store, 0 for unlimited
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def _path(self, content_hash: str, page: int, lang: str, engine: str) -> Path:
+        """Location of a cache entry."""
+        return self.root / content_hash[:2] / f"{content_hash}_{page}_{lang}_{engine}.txt"
+
+    def _current_size(self) -> int:
+        """Total size of the store, scanned once and then tracked. Lock must be held."""
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self.root.glob("*/*.txt"))
+        return self._size
+
+    def get(self, content_hash: str, page: int, lang: str, engine: str) -> Optional[str]:
+        """Return cached OCR text for a page, or None."""
+        path = self._path(content_hash, page, lang, engine)
+        try:
+            text = path.read_text(encoding="utf-8")
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(text.encode("utf-8"))
+        return text
+
+    def put(self, content_hash: str, page: int, lang: str, engine: str, text: str):
+        """Store OCR text for a page."""
+        path = self._path(content_hash, page, lang, engine)
+        data = text.encode("utf-8")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write OCR cache entry {path}: {e}")
+            return
+        with self._lock:
+            self._size = self._current_size() + len(data)
+            if self.max_bytes and self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries down to 90% of the budget. Lock must be held."""
+        entries = []
+        for path in self.root.glob("*/*.txt"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        size = sum(entry[1] for entry in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+            self.evictions += 1
+        self._size = size
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters and current store size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "evictions": self.evictions,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,319 @@
+import io
+import logging
+import os
+import shutil
+import subprocess
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from PIL import Image
+from app.config import (
+    OCR_BATCH_SIZE, OCR_BATCH_MAX_PIXELS, OCR_BATCH_SIZE_STEP,
+    TESSERACT_BINARY, TESSERACT_TIMEOUT_SECONDS
+)
+from app.core.metrics import timed_stage
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# easyocr-style detections: (box as four [x, y] points, text, confidence from 0 to 1)
+Detection = Tuple[list, str, float]
+
+# Tesseract traineddata name of each language code used in requests
+TESSERACT_LANGUAGES = {
+    'bn': 'ben', 'ja': 'jpn', 'zh-cn': 'chi_sim', 'zh-tw': 'chi_tra', 'ko': 'kor', 'ru': 'rus',
+    'bg': 'bul', 'be': 'bel', 'uk': 'ukr', 'cs': 'ces', 'pl': 'pol', 'sk': 'slk', 'da': 'dan',
+    'no': 'nor', 'sv': 'swe', 'nl': 'nld', 'de': 'deu', 'fr': 'fra', 'it': 'ita', 'es': 'spa',
+    'pt': 'por', 'en': 'eng',
+}
+
+
+def mean_confidence(detections: Sequence[Detection]) -> float:
+    """Confidence of a set of detections, weighted by their length; 0 when there are none."""
+    weights = [max(1, len(text.strip())) for _, text, *_ in detections]
+    if not weights:
+        return 0.0
+    return sum(w * float(rest[0] if rest else 1.0) for w, (_, _, *rest) in zip(weights, detections)) / sum(weights)
+
+
+class OCREngine(ABC):
+    """Reads text off prepared images (grayscale or RGB arrays)."""
+    name = ""
+
+    @abstractmethod
+    def read(self, images: List[np.ndarray]) -> List[Tuple[List[Detection], str]]:
+        """Detections of each image and the name of the engine that produced them."""
+
+
+def _pad_image(img: np.ndarray, height: int, width: int) -> np.ndarray:
+    """Pad an image with white up to the given size."""
+    padded = np.full((height, width) + img.shape[2:], 255, dtype=np.uint8)
+    padded[:img.shape[0], :img.shape[1]] = img
+    return padded
+
+
+def readtext_batched(images: List[np.ndarray], reader) -> List[list]:
+    """OCR many images, batching those of similar size through the networks.
+
+    Images are grouped into buckets by size rounded up to OCR_BATCH_SIZE_STEP
+    pixels and padded to their bucket's size, so each bucket can be run through
+    detection and recognition together. Batches are capped at OCR_BATCH_SIZE
+    images and OCR_BATCH_MAX_PIXELS padded pixels. Returns the detections of
+    every image, empty for images that failed.
+    """
+    results = [[] for _ in images]
+    buckets = defaultdict(list)
+    for index, img in enumerate(images):
+        height, width = img.shape[:2]
+        step = OCR_BATCH_SIZE_STEP
+        buckets[(-(-height // step) * step, -(-width // step) * step, img.ndim)].append(index)
+
+    for (height, width, _), indices in buckets.items():
+        per_batch = max(1, min(OCR_BATCH_SIZE, OCR_BATCH_MAX_PIXELS // (height * width)))
+        for start in range(0, len(indices), per_batch):
+            batch = indices[start:start + per_batch]
+            try:
+                with timed_stage("ocr"):
+                    if len(batch) == 1:
+                        outputs = [reader.readtext(images[batch[0]])]
+                    else:
+                        padded = [_pad_image(images[index], height, width) for index in batch]
+                        outputs = reader.readtext_batched(padded, batch_size=len(batch))
+            except Exception as e:
+                logger.error(f"Error processing image batch: {e}")
+                continue
+            for index, output in zip(batch, outputs):
+                results[index] = output
+    return results
+
+
+class EasyOCREngine(OCREngine):
+    """easyocr, with images of similar size batched through its networks."""
+    name = "easyocr"
+
+    def __init__(self, get_reader: Callable[[], Any]):
+        """Initialize the engine.
+        Args:
+            get_reader: Callable returning the easyocr reader, called when there is something to read
+        """
+        self.get_reader = get_reader
+
+    def read(self, images: List[np.ndarray]) -> List[Tuple[List[Detection], str]]:
+        if not images:
+            return []
+        return [(detections, self.name) for detections in readtext_batched(images, self.get_reader())]
+
+
+@lru_cache(maxsize=None)
+def tesseract_languages() -> frozenset:
+    """Traineddata installed for Tesseract, empty when it is not installed."""
+    if shutil.which(TESSERACT_BINARY) is None:
+        return frozenset()
+    try:
+        result = subprocess.run(
+            [TESSERACT_BINARY, "--list-langs"], capture_output=True, text=True, timeout=TESSERACT_TIMEOUT_SECONDS
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Could not list Tesseract languages: {e}")
+        return frozenset()
+    # The first line is a header naming the tessdata directory
+    return frozenset(line.strip() for line in result.stdout.splitlines()[1:] if line.strip())
+
+
+@lru_cache(maxsize=None)
+def tesseract_version() -> str:
+    """Version reported by the Tesseract executable."""
+    result = subprocess.run(
+        [TESSERACT_BINARY, "--version"], capture_output=True, text=True, timeout=TESSERACT_TIMEOUT_SECONDS
+    )
+    # Older releases print the version on stderr
+    first_line = (result.stdout or result.stderr).splitlines()[0]
+    return first_line.split()[-1]
+
+
+def _lines_from_tsv(tsv: str) -> List[Detection]:
+    """Group the words of Tesseract's TSV output into line detections."""
+    lines: Dict[Tuple[str, str, str], List[Tuple[int, int, int, int, float, str]]] = {}
+    rows = tsv.splitlines()
+    for row in rows[1:]:
+        fields = row.split("\t")
+        # Words are level 5; other levels are layout boxes without text
+        if len(fields) < 12 or fields[0] != "5" or not fields[11].strip():
+            continue
+        confidence = float(fields[10])
+        if confidence < 0:
+            continue
+        left, top, width, height = (int(v) for v in fields[6:10])
+        lines.setdefault((fields[2], fields[3], fields[4]), []).append(
+            (left, top, left + width, top + height, confidence / 100, fields[11].strip())
+        )
+    detections = []
+    for words in lines.values():
+        x0, y0 = min(w[0] for w in words), min(w[1] for w in words)
+        x1, y1 = max(w[2] for w in words), max(w[3] for w in words)
+        text = " ".join(w[5] for w in words)
+        confidence = sum(w[4] * len(w[5]) for w in words) / sum(len(w[5]) for w in words)
+        detections.append(([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, confidence))
+    return detections
+
+
+class TesseractEngine(OCREngine):
+    """The Tesseract executable, run once per image.
+
+    Images are piped in as PNM, which needs no compression, and each run is
+    limited to one OpenMP thread since the callers already run images in
+    parallel.
+    """
+    name = "tesseract"
+
+    def __init__(self, languages: Sequence[str]):
+        """Initialize the engine.
+        Args:
+            languages: Tesseract traineddata names, e.g. ["eng", "deu"]
+        """
+        self.languages = list(languages)
+        self._env = {**os.environ, "OMP_THREAD_LIMIT": "1"}
+
+    @classmethod
+    def for_languages(cls, languages: Sequence[str]) -> Optional["TesseractEngine"]:
+        """An engine for request language codes, None unless Tesseract has all of them installed."""
+        names = [TESSERACT_LANGUAGES.get(lang) for lang in languages]
+        if not all(names) or not set(names) <= tesseract_languages():
+            return None
+        return cls(names)
+
+    def read_one(self, pixels: np.ndarray) -> List[Detection]:
+        """Detections of one image."""
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, "PPM")
+        result = subprocess.run(
+            [TESSERACT_BINARY, "stdin", "stdout", "-l", "+".join(self.languages), "--dpi", "300", "tsv"],
+            input=buffer.getvalue(), capture_output=True, timeout=TESSERACT_TIMEOUT_SECONDS, env=self._env,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode("utf-8", "replace").strip()[-500:])
+        return _lines_from_tsv(result.stdout.decode("utf-8", "replace"))
+
+    def read(self, images: List[np.ndarray]) -> List[Tuple[List[Detection], str]]:
+        results = []
+        for pixels in images:
+            try:
+                with timed_stage("ocr"):
+                    results.append((self.read_one(pixels), self.name))
+            except Exception as e:
+                logger.error(f"Tesseract failed on an image: {e}")
+                results.append(([], self.name))
+        return results
+
+
+class TieredEngine(OCREngine):
+    """A cheap engine first; images it reads with low confidence are read again by an accurate one.
+
+    Images are the regions OCR works on, the embedded images or tiles of a
+    page, so only the doubtful parts of a page pay for the second engine.
+    An image the cheap engine finds no text in is escalated as well. The
+    second reading replaces the first only if it found text, with at least
+    the same confidence, so a failed batch does not erase the first reading.
+    """
+    name = "tiered"
+
+    def __init__(self, fast: OCREngine, accurate: OCREngine, min_confidence: float):
+        """Initialize the engine.
+        Args:
+            fast: Engine run on every image
+            accurate: Engine run on the images the fast one is unsure of
+            min_confidence: Mean confidence, 0 to 1, below which an image is escalated
+        """
+        self.fast = fast
+        self.accurate = accurate
+        self.min_confidence = min_confidence
+
+    def read(self, images: List[np.ndarray]) -> List[Tuple[List[Detection], str]]:
+        results = self.fast.read(images)
+        doubtful = [
+            index for index, (detections, _) in enumerate(results)
+            if mean_confidence(detections) < self.min_confidence
+        ]
+        if doubtful:
+            for index, result in zip(doubtful, self.accurate.read([images[index] for index in doubtful])):
+                detections = result[0]
+                if detections and mean_confidence(detections) >= mean_confidence(results[index][0]):
+                    results[index] = result
+        return results
+
+
+# Scripts named by Tesseract's orientation and script detection that languages.script_languages calls otherwise
+_OSD_SCRIPTS = {"Korean": "Hangul", "Hiragana": "Japanese", "Katakana": "Japanese"}
+
+
+def tesseract_script(pixels: np.ndarray) -> Optional[str]:
+    """Script of the text in an image by Tesseract's orientation and script detection.
+
+    None when the image could not be classified, e.g. when it holds too
+    little text or the osd traineddata is not installed.
+    """
+    if "osd" not in tesseract_languages():
+        return None
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "PPM")
+    try:
+        result = subprocess.run(
+            [TESSERACT_BINARY, "stdin", "stdout", "--psm", "0", "--dpi", "300"],
+            input=buffer.getvalue(), capture_output=True, timeout=TESSERACT_TIMEOUT_SECONDS,
+            env={**os.environ, "OMP_THREAD_LIMIT": "1"},
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Tesseract script detection failed: {e}")
+        return None
+    for line in result.stdout.decode("utf-8", "replace").splitlines():
+        if line.startswith("Script:"):
+            script = line.split(":", 1)[1].strip()
+            return _OSD_SCRIPTS.get(script, script)
+    return None
+
+
+class ScriptRoutingEngine(OCREngine):
+    """Reads each image with an engine for the script its text is written in.
+
+    Scripts are told apart cheaply before any recognition, so a page only
+    loads the reader of its own script rather than one for every language.
+    Images whose script cannot be told are read as the default script.
+    """
+    name = "auto"
+
+    def __init__(
+        self,
+        engine_for_script: Callable[[str], OCREngine],
+        default_script: str = "Latin",
+        classify: Callable[[np.ndarray], Optional[str]] = tesseract_script,
+    ):
+        """Initialize the engine.
+        Args:
+            engine_for_script: Callable returning the engine for a script, called once per script met
+            default_script: Script of images that could not be classified
+            classify: Callable returning the script of an image, or None
+        """
+        self.engine_for_script = engine_for_script
+        self.default_script = default_script
+        self.classify = classify
+        self._engines: Dict[str, OCREngine] = {}
+
+    def _engine(self, script: str) -> OCREngine:
+        if script not in self._engines:
+            self._engines[script] = self.engine_for_script(script)
+        return self._engines[script]
+
+    def read(self, images: List[np.ndarray]) -> List[Tuple[List[Detection], str]]:
+        results: List[Tuple[List[Detection], str]] = [([], self.name)] * len(images)
+        groups: Dict[str, List[int]] = defaultdict(list)
+        for index, pixels in enumerate(images):
+            with timed_stage("script_detection"):
+                script = self.classify(pixels)
+            groups[script or self.default_script].append(index)
+        for script, indices in groups.items():
+            outputs = self._engine(script).read([images[index] for index in indices])
+            for index, (detections, engine_name) in zip(indices, outputs):
+                results[index] = (detections, f"{engine_name}:{script}")
+        return results
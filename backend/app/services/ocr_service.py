@@ -1,121 +1,340 @@
 import asyncio
+import hashlib
 import logging
+from functools import lru_cache, partial
+from importlib import metadata
 from pathlib import Path
-from functools import partial
-from concurrent.futures import ThreadPoolExecutor
-from typing import Tuple
-import easyocr
+from typing import List, Optional, Tuple
 import fitz 
-import numpy as np
-from PIL import Image
-import io
+from app.config import (
+    OCR_READER_CACHE_BYTES, OCR_READER_DEFAULT_BYTES, OCR_PRELOAD_LANGUAGES,
+    OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES, OCR_PAGE_WORKERS, OCR_PAGE_CONCURRENCY,
+    OCR_PAGE_BATCH_SIZE, OCR_ENGINE, OCR_TIER_MIN_CONFIDENCE
+)
+from app.core.metrics import (
+    InstrumentedThreadPoolExecutor, captured_stages, observe_page_ocr, replay_stages, timed_stage
+)
+from app.core.uploads import UPLOAD_CHUNK_SIZE
+from app.services.languages import (
+    AUTO_LANGUAGE, document_language, script_reader_languages, supported_languages
+)
+from app.services.model_registry import ModelRegistry, torch_module_bytes
+from app.services.image_preprocess import preprocess_image, stitch_detections
+from app.services.ocr_cache import OCRPageCache
+from app.services.ocr_engines import (
+    EasyOCREngine, OCREngine, ScriptRoutingEngine, TesseractEngine, TieredEngine, mean_confidence, tesseract_version
+)
+from app.services.page_engine import PageEngine
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Thread pool for CPU-bound tasks
-thread_pool = ThreadPoolExecutor()
+thread_pool = InstrumentedThreadPoolExecutor("ocr")
 
-# List of supported languages
-supported_languages = [
-    'bn', 'ja', 'zh-cn', 'zh-tw', 'ko', 'ru', 'bg', 'be', 'uk',
-    'cs', 'pl', 'sk', 'da', 'no', 'sv', 'nl', 'de', 'fr', 'it',
-    'es', 'pt', 'en'
-]
+# OCR results per page of a document, keyed by the SHA-256 of the whole file; only identical
+# documents share them, pages in common between different documents are OCRed again
+page_cache = OCRPageCache(OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES)
+
+# Bounded pool that OCRs PDF pages in batches
+page_engine = PageEngine(OCR_PAGE_WORKERS, OCR_PAGE_CONCURRENCY)
 
 def run_in_thread_pool(fn, *args, **kwargs):
     """Run a function in the thread pool."""
     return asyncio.get_running_loop().run_in_executor(thread_pool, partial(fn, *args, **kwargs))
 
-async def get_ocr_reader(lang: str):
-    """Get an OCR reader for a specific language."""
+def reader_languages(lang: str) -> Tuple[str, ...]:
+    """Normalize a language into the language set of its OCR reader."""
     if lang not in supported_languages:
         logger.warning(f"Language '{lang}' not supported. Defaulting to English.")
         lang = 'en'
-    return await run_in_thread_pool(easyocr.Reader, [lang, 'en'] if lang != 'en' else ['en'])
+    return tuple(sorted({lang, 'en'}))
 
-async def process_image(img_data, reader) -> str:
-    """Process an image with OCR."""
+def _load_reader(languages: Tuple[str, ...]):
+    """Build an easyocr reader for a language set."""
+    import easyocr
+    return easyocr.Reader(list(languages))
+
+# Readers are expensive to build, so keep them resident across requests
+reader_registry = ModelRegistry(
+    "ocr",
+    _load_reader,
+    max_bytes=OCR_READER_CACHE_BYTES,
+    sizeof=lambda reader: torch_module_bytes(
+        getattr(reader, "detector", None), getattr(reader, "recognizer", None)
+    ),
+    default_size=OCR_READER_DEFAULT_BYTES,
+)
+
+def preload_ocr_readers(languages=OCR_PRELOAD_LANGUAGES):
+    """Load readers for the configured languages ahead of the first request."""
+    reader_registry.preload(reader_languages(lang) for lang in languages)
+
+def _easyocr_version() -> str:
+    """Installed easyocr version from package metadata, without importing it."""
+    try:
+        return metadata.version("easyocr")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+@lru_cache(maxsize=None)
+def _tesseract_engine(languages: Tuple[str, ...]) -> Optional[TesseractEngine]:
+    """Tesseract for a language set, None when it is not installed for all of them."""
+    engine = TesseractEngine.for_languages(languages)
+    if engine is None:
+        logger.warning(f"Tesseract is not available for {', '.join(languages)}; using easyocr")
+    return engine
+
+def _engine_for(languages: Tuple[str, ...], mode: str) -> OCREngine:
+    """The OCR engine of a reader language set in an engine mode."""
+    easy = EasyOCREngine(lambda: reader_registry.get(languages))
+    tesseract = _tesseract_engine(languages) if mode in ("tesseract", "tiered") else None
+    if tesseract is None:
+        return easy
+    if mode == "tesseract":
+        return tesseract
+    return TieredEngine(tesseract, easy, OCR_TIER_MIN_CONFIDENCE)
+
+def ocr_engine(lang: str, mode: str = OCR_ENGINE) -> OCREngine:
+    """The OCR engine of a language in the configured mode; models load on first read.
+
+    For AUTO_LANGUAGE each image is read by the engine of its own script,
+    whose reader holds only that script's languages.
+    """
+    if lang == AUTO_LANGUAGE:
+        return ScriptRoutingEngine(lambda script: _engine_for(script_reader_languages(script), mode))
+    return _engine_for(reader_languages(lang), mode)
+
+@lru_cache(maxsize=None)
+def ocr_engine_version(lang: str, mode: str = OCR_ENGINE) -> str:
+    """Part of the OCR cache key, so changing or upgrading the engine invalidates old results."""
+    if lang == AUTO_LANGUAGE:
+        return f"auto-{ocr_engine_version('en', mode)}"
+    engine = ocr_engine(lang, mode)
+    if isinstance(engine, EasyOCREngine):
+        return f"easyocr-{_easyocr_version()}"
+    if isinstance(engine, TesseractEngine):
+        return f"tesseract-{tesseract_version()}"
+    return f"tiered-{tesseract_version()}-easyocr-{_easyocr_version()}-{OCR_TIER_MIN_CONFIDENCE}"
+
+def _page_report(reads: List[Tuple[list, str]], detections: list) -> Tuple[str, Optional[float]]:
+    """Engine and mean confidence of a page, from the reads of its regions and their stitched detections."""
+    if not reads:
+        return "text_layer", None
+    engine = "+".join(sorted({name for _, name in reads}))
+    return engine, (round(mean_confidence(detections), 4) if detections else None)
+
+def _join_ocr_result(ocr_result) -> str:
+    """Join the text of easyocr detections."""
+    # Check if ocr_result is a list of lists (expected format)
+    if isinstance(ocr_result, list) and all(len(item) >= 2 for item in ocr_result):
+        return ' '.join([text for _, text, *_ in ocr_result])
+    else:
+        logger.error(f"Unexpected OCR result format: {ocr_result}")
+        return ""
+
+def ocr_image(img_data, engine: OCREngine) -> Tuple[str, Tuple[str, Optional[float]]]:
+    """Run OCR on encoded image bytes, a path or a PIL image; returns the text and its page report."""
     try:
-        if isinstance(img_data, bytes):
-            img = await run_in_thread_pool(Image.open, io.BytesIO(img_data))
-        else:
-            img = img_data
-
-        img_np = np.array(img)
-        ocr_result = await run_in_thread_pool(reader.readtext, img_np)
-
-        # Check if ocr_result is a list of lists (expected format)
-        if isinstance(ocr_result, list) and all(len(item) >= 2 for item in ocr_result):
-            return ' '.join([text for _, text, *_ in ocr_result])
-        else:
-            logger.error(f"Unexpected OCR result format: {ocr_result}")
-            return ""
+        prepared = preprocess_image(img_data)
+        reads = engine.read([pixels for pixels, _, _ in prepared.tiles])
+        detections = stitch_detections(prepared, [detections for detections, _ in reads])
+        return _join_ocr_result(detections), _page_report(reads, detections)
     except Exception as e:
         logger.error(f"Error processing image: {e}")
-        return ""
+        return "", ("failed", None)
 
-async def process_page(page, reader) -> str:
-    """Process a PDF page with OCR."""
+async def process_image(img_data, engine: OCREngine) -> str:
+    """Process an image with OCR."""
+    text, (engine_name, confidence) = await run_in_thread_pool(ocr_image, img_data, engine)
+    observe_page_ocr(engine_name, confidence)
+    return text
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_each(prepared_images: list, engine: OCREngine) -> List[Tuple[list, str]]:
+    """Read the tiles of each image separately; an image that fails reads as nothing."""
+    reads = []
+    for prepared in prepared_images:
+        tiles = [pixels for pixels, _, _ in prepared.tiles]
+        try:
+            reads.extend(engine.read(tiles))
+        except Exception as e:
+            logger.error(f"Error processing image: {e}")
+            reads.extend(([], "failed") for _ in tiles)
+    return reads
+
+def process_pages(
+    doc, page_numbers: List[int], engine: OCREngine
+) -> Tuple[List[str], List[Tuple[str, Optional[float]]]]:
+    """Extract the text layer of PDF pages and OCR their embedded images in batches.
+
+    Returns the text of each page and which engine read it with what mean
+    confidence, "text_layer" for pages without images. A page or image that
+    fails loses only its own text, and such pages are reported as "failed".
+    """
+    texts = []
+    prepared_images = []
+    owners = []
+    failed = set()
+    for position, number in enumerate(page_numbers):
+        try:
+            page = doc[number]
+            # Extract text from the page
+            with timed_stage("page_text"):
+                text = page.get_text()
+            images = page.get_images()
+        except Exception as e:
+            logger.error(f"Error processing page: {e}")
+            texts.append("")
+            failed.add(position)
+            continue
+        texts.append(text)
+        # Extract and prepare images from the page; a bad image loses only its own text
+        for img in images:
+            try:
+                with timed_stage("image_extract"):
+                    base_image = doc.extract_image(img[0])
+                prepared = preprocess_image(base_image["image"])
+            except Exception as e:
+                logger.error(f"Error processing image: {e}")
+                failed.add(position)
+                continue
+            prepared_images.append(prepared)
+            owners.append(position)
+
+    # Run OCR over every tile of the window at once
+    tiles = [pixels for prepared in prepared_images for pixels, _, _ in prepared.tiles]
     try:
-        # Extract text from the page
-        text = await run_in_thread_pool(page.get_text)
-
-        # Extract images from the page
-        image_texts = []
-        for img in page.get_images():
-            xref = img[0]
-            base_image = await run_in_thread_pool(page.parent.extract_image, xref)
-            image_text = await process_image(base_image["image"], reader)
-            image_texts.append(image_text)
-
-        return text + ' ' + ' '.join(image_texts)
+        tile_reads = iter(engine.read(tiles))
     except Exception as e:
-        logger.error(f"Error processing page: {e}")
-        return ""
+        # Retry image by image so that only the image that fails loses its text
+        logger.error(f"Error processing image batch: {e}")
+        tile_reads = iter(_read_each(prepared_images, engine))
+
+    # Stitch tiles back into images and scatter the text back to the pages
+    image_texts = [[] for _ in page_numbers]
+    page_reads = [[([], "failed")] if position in failed else [] for position in range(len(page_numbers))]
+    page_detections = [[] for _ in page_numbers]
+    for position, prepared in zip(owners, prepared_images):
+        reads = [next(tile_reads) for _ in prepared.tiles]
+        detections = stitch_detections(prepared, [detections for detections, _ in reads])
+        image_texts[position].append(_join_ocr_result(detections))
+        page_reads[position].extend(reads)
+        page_detections[position].extend(detections)
+    reports = [_page_report(reads, detections) for reads, detections in zip(page_reads, page_detections)]
+    return [text + ' ' + ' '.join(page_texts) for text, page_texts in zip(texts, image_texts)], reports
 
-async def pdf_to_text(pdf_path: Path, lang: str) -> Tuple[str, str]:
-    """Convert a PDF file to text."""
+def process_page(page, engine: OCREngine) -> str:
+    """Extract the text layer of a PDF page and OCR its embedded images."""
+    return process_pages(page.parent, [page.number], engine)[0][0]
+
+def process_page_range(
+    pdf_path: str, page_numbers: List[int], lang: str
+) -> Tuple[List[str], List[Tuple[str, float]], List[Tuple[str, Optional[float]]]]:
+    """Process a batch of pages in a page worker; returns the texts, stage timings and page reports.
+
+    The worker opens its own handle on the document, since fitz documents
+    must not be shared between threads, and uses its own process's engines.
+    Timings and reports travel back with the texts, as a worker process has
+    no /metrics.
+    """
+    with captured_stages() as stages:
+        engine = ocr_engine(lang)
+        with timed_stage("pdf_open"):
+            doc = fitz.open(pdf_path)
+        try:
+            texts, reports = process_pages(doc, page_numbers, engine)
+            return texts, stages, reports
+        finally:
+            doc.close()
+
+def _cached_pages(pdf_path: Path, content_hash: str, lang: str) -> List[Optional[str]]:
+    """Cached OCR text of every page of a PDF, None for pages not cached.
+
+    Entries are keyed by the hash of the whole document, not of each page:
+    a page's content stream alone does not determine what it shows, as it
+    draws fonts and forms defined elsewhere in the file.
+    """
+    with timed_stage("pdf_open"):
+        doc = fitz.open(pdf_path)
+    try:
+        page_count = doc.page_count
+    finally:
+        doc.close()
+    return [page_cache.get(content_hash, number, lang, ocr_engine_version(lang)) for number in range(page_count)]
+
+async def pdf_to_text(pdf_path: Path, lang: str, content_hash: Optional[str] = None) -> Tuple[str, str]:
+    """Convert a PDF file to text, reusing the cached pages of a document with the same content hash."""
     try:
         # Validate language
-        if lang not in supported_languages:
+        if lang not in supported_languages and lang != AUTO_LANGUAGE:
             logger.warning(f"Language '{lang}' not supported. Defaulting to English.")
             lang = 'en'
 
-        # Open the PDF document
-        doc = await run_in_thread_pool(fitz.open, pdf_path)
+        # Reuse cached OCR for pages of this document seen before
+        if not content_hash:
+            content_hash = await run_in_thread_pool(file_sha256, pdf_path)
+        results = await run_in_thread_pool(_cached_pages, pdf_path, content_hash, lang)
+        missing = [number for number, text in enumerate(results) if text is None]
 
-        # Get OCR reader for provided language
-        reader = await get_ocr_reader(lang)
+        # Process the remaining pages in bounded batches on the page engine
+        batches = [missing[i:i + OCR_PAGE_BATCH_SIZE] for i in range(0, len(missing), OCR_PAGE_BATCH_SIZE)]
+        outputs = await page_engine.map(
+            process_page_range, [(str(pdf_path), batch, lang) for batch in batches]
+        )
 
-        # Process all pages
-        tasks = [process_page(page, reader) for page in doc]
-        results = await asyncio.gather(*tasks)
+        # Reassemble in page order; pages that lost text to a failure are not cached
+        failed = set()
+        for batch, (texts, stages, reports) in zip(batches, outputs):
+            replay_stages(stages)
+            for number, text, (engine, confidence) in zip(batch, texts, reports):
+                results[number] = text
+                if "failed" in engine:
+                    failed.add(number)
+                observe_page_ocr(engine, confidence)
+                logger.debug(f"Page {number + 1} of {pdf_path.name}: {engine}, confidence {confidence}")
+        await run_in_thread_pool(lambda: [
+            page_cache.put(content_hash, n, lang, ocr_engine_version(lang), results[n])
+            for n in missing if n not in failed
+        ])
 
-        # Close the document
-        await run_in_thread_pool(doc.close)
-
-        return ' '.join(results), lang
+        text = ' '.join(results)
+        if lang == AUTO_LANGUAGE:
+            lang = await run_in_thread_pool(document_language, text)
+        return text, lang
     except Exception as e:
         logger.error(f"Error processing PDF: {e}")
         return "", "en"
 
-async def image_to_text(image_path: Path, lang: str) -> Tuple[str, str]:
-    """Convert an image file to text."""
+async def image_to_text(image_path: Path, lang: str, content_hash: Optional[str] = None) -> Tuple[str, str]:
+    """Convert an image file to text, reusing the cached result for a known content hash."""
     try:
         # Validate language
-        if lang not in supported_languages:
+        if lang not in supported_languages and lang != AUTO_LANGUAGE:
             logger.warning(f"Language '{lang}' not supported. Defaulting to English.")
             lang = 'en'
 
-        # Open the image
-        img = await run_in_thread_pool(Image.open, image_path)
+        if content_hash:
+            cached = await run_in_thread_pool(lambda: page_cache.get(content_hash, 0, lang, ocr_engine_version(lang)))
+            if cached is not None:
+                return cached, (await run_in_thread_pool(document_language, cached) if lang == AUTO_LANGUAGE else lang)
 
-        # Use the provided language
-        reader = await get_ocr_reader(lang)
-        text = await process_image(img, reader)
+        # Use the provided language; the image is decoded at reduced scale during preprocessing
+        # Finding the engine may ask the Tesseract executable what it supports
+        text = await process_image(image_path, await run_in_thread_pool(ocr_engine, lang))
 
+        if content_hash and text:
+            await run_in_thread_pool(lambda: page_cache.put(content_hash, 0, lang, ocr_engine_version(lang), text))
+        if lang == AUTO_LANGUAGE:
+            lang = await run_in_thread_pool(document_language, text)
         return text, lang
     except Exception as e:
         logger.error(f"Error processing image: {e}")
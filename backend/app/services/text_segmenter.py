@@ -0,0 +1,54 @@
+import re
+from typing import List
+
+# Sentence terminators, including CJK full stops and the Bengali/Devanagari danda
+_sentence_end = re.compile(r'(?<=[.!?;。！？；।॥])\s+|(?<=[。！？；।॥])|\n\s*\n')
+# Places inside a long sentence where a pause sounds natural
+_clause_break = re.compile(r'(?<=[,:，、：—–])\s*')
+# Languages written without spaces between words
+_unspaced_languages = {'ja', 'zh-cn', 'zh-tw'}
+
+
+def _split_long(sentence: str, max_chars: int, lang: str) -> List[str]:
+    """Split a sentence longer than max_chars at clause, word or character boundaries."""
+    parts: List[str] = []
+    for clause in _clause_break.split(sentence):
+        clause = clause.strip()
+        while len(clause) > max_chars:
+            cut = -1 if lang in _unspaced_languages else clause.rfind(' ', 0, max_chars + 1)
+            if cut <= 0:
+                cut = max_chars
+            parts.append(clause[:cut].strip())
+            clause = clause[cut:].strip()
+        if clause:
+            parts.append(clause)
+    return parts
+
+
+def segment_text(text: str, lang: str = 'en', max_chars: int = 250) -> List[str]:
+    """Split text into sentence-aligned segments of at most max_chars characters.
+
+    Consecutive short sentences are packed into one segment so the synthesizer
+    is not called for every fragment.
+    """
+    pieces: List[str] = []
+    for sentence in _sentence_end.split(text):
+        sentence = ' '.join(sentence.split())
+        if not sentence:
+            continue
+        if len(sentence) > max_chars:
+            pieces.extend(_split_long(sentence, max_chars, lang))
+        else:
+            pieces.append(sentence)
+
+    segments: List[str] = []
+    current = ''
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            segments.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        segments.append(current)
+    return segments
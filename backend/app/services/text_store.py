@@ -0,0 +1,66 @@
+import hashlib
+import io
+import zlib
+from typing import Iterator, Tuple
+from app.config import TEXT_COMPRESSION, TEXT_COMPRESSION_LEVEL
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Uncompressed bytes handed out per chunk when streaming a text
+TEXT_CHUNK_SIZE = 64 * 1024
+
+CODECS = ("zstd", "zlib")
+
+
+class TextCodecUnavailable(Exception):
+    """Raised when a stored text uses a codec this process cannot decode."""
+
+
+def text_hash(text: str) -> str:
+    """Deduplication key of a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def default_codec() -> str:
+    """Codec used for new texts, given the installed libraries."""
+    if TEXT_COMPRESSION == "zstd" and zstandard is None:
+        return "zlib"
+    return TEXT_COMPRESSION if TEXT_COMPRESSION in CODECS else "zlib"
+
+
+def compress_text(text: str) -> Tuple[str, bytes]:
+    """Compress a text with the default codec; returns (codec, data)."""
+    codec = default_codec()
+    raw = text.encode("utf-8")
+    if codec == "zstd":
+        return codec, zstandard.ZstdCompressor(level=TEXT_COMPRESSION_LEVEL).compress(raw)
+    return codec, zlib.compress(raw, TEXT_COMPRESSION_LEVEL)
+
+
+def iter_text_chunks(codec: str, data: bytes, chunk_size: int = TEXT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Decompress a stored text incrementally, yielding UTF-8 chunks of at most ``chunk_size``."""
+    if codec == "zstd":
+        if zstandard is None:
+            raise TextCodecUnavailable("zstandard is required to read this text")
+        yield from zstandard.ZstdDecompressor().read_to_iter(io.BytesIO(data), write_size=chunk_size)
+        return
+    if codec != "zlib":
+        raise TextCodecUnavailable(f"Unknown text codec: {codec}")
+    decompressor = zlib.decompressobj()
+    pending = data
+    while pending:
+        chunk = decompressor.decompress(pending, chunk_size)
+        if chunk:
+            yield chunk
+        pending = decompressor.unconsumed_tail
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def decompress_text(codec: str, data: bytes) -> str:
+    """Decompress a whole stored text."""
+    return b"".join(iter_text_chunks(codec, data)).decode("utf-8")
@@ -0,0 +1,42 @@
+# Mapping of languages to TTS models
+lang_to_model = {       
+    'en': 'tts_models/en/ljspeech/fast_pitch',
+    'fr': 'tts_models/fr/mai/tacotron2-DDC',
+    'de': 'tts_models/de/thorsten/tacotron2-DDC',
+    'es': 'tts_models/es/mai/tacotron2-DDC',
+    'it': 'tts_models/it/mai_female/glow-tts',
+    'nl': 'tts_models/nl/mai/tacotron2-DDC',
+    'pt': 'tts_models/pt/cv/vits',
+    'pl': 'tts_models/pl/mai_female/vits',
+    'tr': 'tts_models/tr/common-voice/glow-tts',
+    'ja': 'tts_models/ja/kokoro/tacotron2-DDC',
+    'zh-cn': 'tts_models/zh-CN/baker/tacotron2-DDC-GST',
+    'bn': 'tts_models/bn/custom/vits-male',  
+    'bg': 'tts_models/bg/cv/vits',
+    'cs': 'tts_models/cs/cv/vits',
+    'da': 'tts_models/da/cv/vits',
+    'et': 'tts_models/et/cv/vits',
+    'ga': 'tts_models/ga/cv/vits',
+    'el': 'tts_models/el/cv/vits',
+    'fi': 'tts_models/fi/css10/vits',
+    'hr': 'tts_models/hr/cv/vits',
+    'hu': 'tts_models/hu/css10/vits',
+    'lt': 'tts_models/lt/cv/vits',
+    'lv': 'tts_models/lv/cv/vits',
+    'mt': 'tts_models/mt/cv/vits',
+    'ro': 'tts_models/ro/cv/vits',
+    'sk': 'tts_models/sk/cv/vits',
+    'sl': 'tts_models/sl/cv/vits',
+    'sv': 'tts_models/sv/cv/vits',
+    'uk': 'tts_models/uk/mai/vits',
+    'ca': 'tts_models/ca/custom/vits',
+    'fa': 'tts_models/fa/custom/glow-tts',
+    'be': 'tts_models/be/common-voice/glow-tts'
+}
+
+# Fallback model for languages without a dedicated voice
+default_model = 'tts_models/multilingual/multi-dataset/your_tts'
+
+def get_model_name(lang: str) -> str:
+    """Get the TTS model used for a language."""
+    return lang_to_model.get(lang, default_model)
@@ -1,59 +1,185 @@
 import asyncio
 import logging
-import uuid
+import queue
+from contextlib import contextmanager
 from functools import partial
-from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
-from TTS.api import TTS
-from app.config import DEVICE, AUDIO_DIR
+from collections import deque
+from typing import AsyncIterator, Optional, Tuple
+from app.config import (
+    TTS_MODEL_CACHE_BYTES, TTS_MODEL_DEFAULT_BYTES,
+    TTS_MODEL_REPLICAS, TTS_PRELOAD_LANGUAGES, TTS_MAX_SEGMENT_CHARS,
+    TTS_SEGMENT_WINDOW, TTS_SEGMENT_SILENCE_MS
+)
+from app.core.metrics import InstrumentedThreadPoolExecutor, timed_stage
+from app.services.audio_writer import WavWriter, float_to_pcm16, resample, streaming_wav_header, new_audio_path
+from app.services.languages import AUTO_LANGUAGE, split_by_language
+from app.services.model_registry import ModelRegistry, torch_device, torch_module_bytes
+from app.services.text_segmenter import segment_text
+from app.services.tts_models import get_model_name
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # Thread pool for CPU-bound tasks
-thread_pool = ThreadPoolExecutor()
-
-# Mapping of languages to TTS models
-lang_to_model = {       
-    'en': 'tts_models/en/ljspeech/fast_pitch',
-    'fr': 'tts_models/fr/mai/tacotron2-DDC',
-    'de': 'tts_models/de/thorsten/tacotron2-DDC',
-    'es': 'tts_models/es/mai/tacotron2-DDC',
-    'it': 'tts_models/it/mai_female/glow-tts',
-    'nl': 'tts_models/nl/mai/tacotron2-DDC',
-    'pt': 'tts_models/pt/cv/vits',
-    'pl': 'tts_models/pl/mai_female/vits',
-    'tr': 'tts_models/tr/common-voice/glow-tts',
-    'ja': 'tts_models/ja/kokoro/tacotron2-DDC',
-    'zh-cn': 'tts_models/zh-CN/baker/tacotron2-DDC-GST',
-    'bn': 'tts_models/bn/custom/vits-male',  
-    'bg': 'tts_models/bg/cv/vits',
-    'cs': 'tts_models/cs/cv/vits',
-    'da': 'tts_models/da/cv/vits',
-    'et': 'tts_models/et/cv/vits',
-    'ga': 'tts_models/ga/cv/vits',
-    'el': 'tts_models/el/cv/vits',
-    'fi': 'tts_models/fi/css10/vits',
-    'hr': 'tts_models/hr/cv/vits',
-    'hu': 'tts_models/hu/css10/vits',
-    'lt': 'tts_models/lt/cv/vits',
-    'lv': 'tts_models/lv/cv/vits',
-    'mt': 'tts_models/mt/cv/vits',
-    'ro': 'tts_models/ro/cv/vits',
-    'sk': 'tts_models/sk/cv/vits',
-    'sl': 'tts_models/sl/cv/vits',
-    'sv': 'tts_models/sv/cv/vits',
-    'uk': 'tts_models/uk/mai/vits',
-    'ca': 'tts_models/ca/custom/vits',
-    'fa': 'tts_models/fa/custom/glow-tts',
-    'be': 'tts_models/be/common-voice/glow-tts'
-}
+thread_pool = InstrumentedThreadPoolExecutor("tts")
 
 def run_in_thread_pool(fn, *args, **kwargs):
     """Run a function in the thread pool."""
     return asyncio.get_event_loop().run_in_executor(thread_pool, partial(fn, *args, **kwargs))
 
+class SynthesizerPool:
+    """Loaded replicas of one TTS model, lent to one caller at a time."""
+    def __init__(self, model_name: str, replicas: int = 1):
+        """Load the replicas.
+        Args:
+            model_name: Coqui model name
+            replicas: Number of model copies that can synthesize concurrently
+        """
+        from TTS.api import TTS
+        self.model_name = model_name
+        self.replicas = [TTS(model_name=model_name).to(torch_device()) for _ in range(max(1, replicas))]
+        self._idle = queue.Queue()
+        for tts in self.replicas:
+            self._idle.put(tts)
+
+    @contextmanager
+    def acquire(self):
+        """Borrow an idle replica, waiting for one if all are busy."""
+        tts = self._idle.get()
+        try:
+            yield tts
+        finally:
+            self._idle.put(tts)
+
+    @property
+    def sample_rate(self) -> int:
+        """Sample rate of the audio produced by this model."""
+        return self.replicas[0].synthesizer.output_sample_rate
+
+    def nbytes(self) -> int:
+        """Estimate the memory held by all replicas."""
+        return sum(
+            torch_module_bytes(
+                getattr(tts.synthesizer, "tts_model", None),
+                getattr(tts.synthesizer, "vocoder_model", None),
+            )
+            for tts in self.replicas
+        )
+
+# Loaded synthesizers stay resident across requests and retries
+tts_registry = ModelRegistry(
+    "tts",
+    lambda model_name: SynthesizerPool(model_name, TTS_MODEL_REPLICAS),
+    max_bytes=TTS_MODEL_CACHE_BYTES,
+    sizeof=SynthesizerPool.nbytes,
+    default_size=TTS_MODEL_DEFAULT_BYTES * TTS_MODEL_REPLICAS,
+)
+
+async def get_synthesizer(lang: str) -> SynthesizerPool:
+    """Get the loaded synthesizer pool for a language."""
+    return await tts_registry.aget(get_model_name(lang), thread_pool)
+
+def preload_tts_models(languages=TTS_PRELOAD_LANGUAGES):
+    """Load models for the configured languages ahead of the first request."""
+    tts_registry.preload(get_model_name(lang) for lang in languages)
+
+def _synthesize_segment(
+    pool: SynthesizerPool, text: str, speaker: Optional[str], sample_rate: Optional[int] = None
+) -> bytes:
+    """Synthesize one segment with a borrowed replica and return 16-bit PCM, at sample_rate if given."""
+    with pool.acquire() as tts, timed_stage("synthesis"):
+        samples = tts.tts(text=text, speaker=speaker)
+    if sample_rate and sample_rate != pool.sample_rate:
+        samples = resample(samples, pool.sample_rate, sample_rate)
+    return float_to_pcm16(samples)
+
+async def synthesize_segments(
+    pool: SynthesizerPool,
+    text: str,
+    lang: str,
+    speaker: Optional[str] = None,
+    sample_rate: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """Synthesize text segment by segment, yielding PCM in document order.
+
+    Up to TTS_SEGMENT_WINDOW segments are synthesized in parallel across the
+    pool's replicas, so memory stays flat regardless of document length.
+    PCM is resampled to sample_rate when it differs from the pool's.
+    """
+    segments = iter(segment_text(text, lang, TTS_MAX_SEGMENT_CHARS))
+    pending = deque()
+    try:
+        while True:
+            while len(pending) < max(1, TTS_SEGMENT_WINDOW):
+                segment = next(segments, None)
+                if segment is None:
+                    break
+                pending.append(run_in_thread_pool(_synthesize_segment, pool, segment, speaker, sample_rate))
+            if not pending:
+                return
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+
+async def synthesize_document(
+    text: str,
+    lang: str,
+    speaker: Optional[str] = None
+) -> Tuple[int, AsyncIterator[bytes]]:
+    """Sample rate and PCM segments of a document, each passage in the voice of its language.
+
+    For AUTO_LANGUAGE the text is split into passages of one language and
+    each is read by that language's model, loaded when its passage is
+    reached; audio is resampled to the rate of the first passage's model.
+    Other languages are read whole by their own model.
+    """
+    groups = split_by_language(text) if lang == AUTO_LANGUAGE else [(lang, text)]
+    if not groups:
+        groups = [('en' if lang == AUTO_LANGUAGE else lang, text)]
+    first_pool = await get_synthesizer(groups[0][0])
+
+    async def segments() -> AsyncIterator[bytes]:
+        for index, (group_lang, group_text) in enumerate(groups):
+            pool = first_pool if index == 0 else await get_synthesizer(group_lang)
+            # Multi-speaker models need a speaker; one chosen for another voice may not exist in this one
+            group_speaker = speaker if index == 0 or get_model_name(group_lang) == first_pool.model_name else None
+            async for pcm in synthesize_segments(pool, group_text, group_lang, group_speaker, first_pool.sample_rate):
+                yield pcm
+
+    return first_pool.sample_rate, segments()
+
+async def stream_text_to_audio(
+    text: str,
+    lang: str,
+    output_file: Path,
+    speaker: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    """Yield a progressive WAV stream while persisting the same audio to output_file.
+
+    The header is sent first, then each segment as soon as it is synthesized.
+    The persisted file gets a finalized header once the stream completes and
+    is removed if synthesis fails or the consumer stops early.
+    """
+    sample_rate, segments = await synthesize_document(text, lang, speaker)
+    silence = b"\x00\x00" * int(sample_rate * TTS_SEGMENT_SILENCE_MS / 1000)
+    completed = False
+    try:
+        with WavWriter(output_file, sample_rate) as writer:
+            yield streaming_wav_header(sample_rate)
+            first = True
+            async for pcm in segments:
+                if not first:
+                    pcm = silence + pcm
+                await run_in_thread_pool(writer.write, pcm)
+                yield pcm
+                first = False
+        completed = True
+    finally:
+        if not completed:
+            output_file.unlink(missing_ok=True)
+
 async def text_to_audio(
     text: str, 
     lang: str, 
@@ -62,28 +188,28 @@ async def text_to_audio(
     retry_delay: int = 5
 ) -> Path:
     """Convert text to audio using TTS."""
-    model_name = lang_to_model.get(lang, 'tts_models/multilingual/multi-dataset/your_tts')
-    
-    # Check if AUDIO_DIR exists, create if not
-    AUDIO_DIR.mkdir(parents=True, exist_ok=True)
-    
     # Retry loop
     for attempt in range(max_retries):
         try:
-            # Initialize TTS model
-            tts = await run_in_thread_pool(lambda: TTS(model_name=model_name).to(DEVICE))
+            # Get the resident TTS models, loading each only on first use
+            sample_rate, segments = await synthesize_document(text, lang, speaker)
             
             # Generate unique filename
-            output_file = AUDIO_DIR / f"Audio_{lang}_{uuid.uuid4()}.wav"
-            
-            # Generate audio
-            await run_in_thread_pool(
-                tts.tts_to_file, 
-                text=text, 
-                file_path=str(output_file), 
-                speaker=speaker
-            )
-            
+            output_file = new_audio_path(lang)
+
+            # Generate audio segment by segment, appending each in order
+            try:
+                with WavWriter(output_file, sample_rate) as writer:
+                    first = True
+                    async for pcm in segments:
+                        if not first:
+                            writer.write_silence(TTS_SEGMENT_SILENCE_MS)
+                        await run_in_thread_pool(writer.write, pcm)
+                        first = False
+            except BaseException:
+                output_file.unlink(missing_ok=True)
+                raise
+
             return output_file
         except Exception as e:
             logger.warning(f"TTS attempt {attempt + 1} failed: {e}")
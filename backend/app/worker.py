@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+from pathlib import Path
+from sqlalchemy.orm import Session
+from app.config import JOB_HEARTBEAT_SECONDS, JOB_LEASE_SECONDS, JOB_POLL_INTERVAL_SECONDS, JOB_WORKER_PROCESSES
+from app.crud.conversion import conversion
+from app.crud.conversion_search import conversion_search
+from app.crud.job import job as job_crud
+from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.models import Job
+from app.models.job import JOB_FAILED
+from app.services.inference import pdf_to_text, image_to_text
+from app.services.audio_cache import get_or_synthesize, release_audio
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class JobCancelled(Exception):
+    """Raised when the owner cancelled a job while it was running."""
+
+class NoTextExtracted(Exception):
+    """Raised when OCR finds no text; retrying would not help."""
+
+class LeaseLost(Exception):
+    """Raised when a job's lease expired and it was requeued while this worker ran it."""
+
+def _check_cancelled(db: Session, job: Job):
+    """Stop the job if its owner asked to cancel it."""
+    if job_crud.cancel_requested(db, job=job):
+        raise JobCancelled()
+
+def _set_stage(db: Session, job: Job, worker_id: str, stage: str, progress: float):
+    """Record the stage of the job, stopping it if this worker no longer holds it."""
+    if not job_crud.set_stage(db, job=job, worker_id=worker_id, stage=stage, progress=progress):
+        raise LeaseLost()
+
+def _renew_lease(job_id: int, worker_id: str) -> bool:
+    """Renew a job's lease in a session of its own, as the job's session is busy."""
+    db = SessionLocal()
+    try:
+        return job_crud.renew_lease(db, job_id=job_id, worker_id=worker_id)
+    finally:
+        db.close()
+
+async def _heartbeat(job_id: int, worker_id: str):
+    """Renew the lease of a running job, so long OCR and TTS stages are not taken for orphaned."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            if not await loop.run_in_executor(None, _renew_lease, job_id, worker_id):
+                logger.warning(f"Worker {worker_id} lost the lease of job {job_id}")
+                return
+        except Exception as e:
+            logger.error(f"Could not renew the lease of job {job_id}: {e}")
+
+def _remove_input(job: Job):
+    """Delete the uploaded file of a job that will not run again."""
+    if job.input_path and os.path.exists(job.input_path):
+        os.unlink(job.input_path)
+
+async def process_job(db: Session, job: Job, worker_id: str):
+    """Run OCR and TTS for a claimed job and record the resulting conversion.
+
+    A heartbeat renews the lease while the job runs. If the job is requeued
+    anyway, every stage change and the final result check that worker_id
+    still holds it, and this attempt's result is dropped once it does not.
+    """
+    job_id = job.id
+    heartbeat = asyncio.create_task(_heartbeat(job_id, worker_id))
+    # Audio whose reference no conversion has taken over yet
+    audio_file_path = None
+    try:
+        text, lang = job.text_content, job.language
+        if job.source_type in ("pdf", "image"):
+            _set_stage(db, job, worker_id, "ocr", 0.1)
+            if job.source_type == "pdf":
+                text, lang = await pdf_to_text(Path(job.input_path), job.language, job.content_hash)
+            else:
+                text, lang = await image_to_text(Path(job.input_path), job.language, job.content_hash)
+            if not text or not text.strip():
+                raise NoTextExtracted(f"Could not extract text from the {job.source_type}")
+        _check_cancelled(db, job)
+
+        _set_stage(db, job, worker_id, "tts", 0.5)
+        # Retries are handled by requeueing the job, not inside the TTS call
+        async with AsyncSessionLocal() as adb:
+            audio_file_path, _ = await get_or_synthesize(adb, text, lang, job.speaker, max_retries=1)
+        _check_cancelled(db, job)
+
+        _set_stage(db, job, worker_id, "saving", 0.9)
+        conv = conversion.create_with_owner(
+            db=db,
+            obj_in={
+                "file_name": job.file_name or f"text_input_{audio_file_path.stem}",
+                "language": lang,
+                "source_type": job.source_type,
+                "text_content": text
+            },
+            user_id=job.user_id,
+            audio_file_path=str(audio_file_path),
+            commit=False
+        )
+        # The conversion is committed only together with the job's success
+        if not job_crud.succeed(db, job=job, worker_id=worker_id, conversion_id=conv.id):
+            raise LeaseLost()
+        # The conversion now holds the audio's reference
+        audio_file_path = None
+        _remove_input(job)
+        logger.info(f"Job {job_id} succeeded with conversion {job.conversion_id}")
+    except LeaseLost:
+        # The input stays for the worker that now runs the job
+        db.rollback()
+        logger.warning(f"Job {job_id} was requeued while worker {worker_id} ran it; dropping its result")
+    except JobCancelled:
+        # Synthesized audio stays in the shared cache for identical requests
+        if job_crud.mark_cancelled(db, job=job, worker_id=worker_id):
+            _remove_input(job)
+            logger.info(f"Job {job_id} cancelled")
+    except Exception as e:
+        db.rollback()
+        retry = not isinstance(e, NoTextExtracted)
+        if not job_crud.fail(db, job=job, worker_id=worker_id, error=str(e), retry=retry):
+            logger.warning(f"Job {job_id} failed after it was requeued: {e}")
+            return
+        logger.warning(f"Job {job_id} attempt {job.attempts} failed: {e}")
+        if job.status == JOB_FAILED:
+            _remove_input(job)
+    finally:
+        heartbeat.cancel()
+        if audio_file_path is not None:
+            await release_audio(audio_file_path)
+
+async def worker_loop(worker_id: str):
+    """Claim and run jobs until the process is stopped."""
+    logger.info(f"Worker {worker_id} started")
+    try:
+        while True:
+            db = SessionLocal()
+            try:
+                job_crud.requeue_stale(db, lease_seconds=JOB_LEASE_SECONDS)
+                job = job_crud.claim(db, worker_id=worker_id)
+                if job is None:
+                    await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
+                    continue
+                logger.info(f"Worker {worker_id} running job {job.id} (attempt {job.attempts})")
+                await process_job(db, job, worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} error: {e}")
+                await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
+            finally:
+                db.close()
+    finally:
+        # Pooled async connections run driver threads that would keep the process alive
+        await async_engine.dispose()
+
+def run_worker(index: int):
+    """Entry point of one worker process."""
+    logging.basicConfig(level=logging.INFO)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    try:
+        asyncio.run(worker_loop(worker_id))
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    """Start the worker pool. Scale out by running this on more hosts."""
+    parser = argparse.ArgumentParser(description="Run background conversion workers")
+    parser.add_argument("--processes", type=int, default=JOB_WORKER_PROCESSES)
+    args = parser.parse_args()
+    # Create database tables
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        conversion_search.create_index(connection)
+    if args.processes <= 1:
+        run_worker(0)
+        return
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=run_worker, args=(i,)) for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+if __name__ == "__main__":
+    main()
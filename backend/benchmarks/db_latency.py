@@ -0,0 +1,166 @@
+"""Request latency under concurrent writes: sync session vs. async pooled engine with SQLite pragmas.
+
+Requests arrive at a fixed rate, like traffic to the convert routes: most
+create a conversion, the rest list the owner's conversions. Latency is taken
+from each request's scheduled arrival, so time spent waiting behind a
+blocked event loop counts. "sync" is the previous setup (blocking Session,
+default journal mode), "async" uses the aiosqlite engine with WAL and the
+other connect pragmas.
+
+Usage, from the backend directory:
+    python -m benchmarks.db_latency [--rate 300] [--seconds 5] [--read-share 0.5]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.config import DB_POOL_SIZE, DB_MAX_OVERFLOW
+from app.crud.conversion import conversion
+from app.database import Base, _apply_sqlite_pragmas
+from app.models import User
+
+
+def conversion_fields(n: int) -> dict:
+    """Fields of one benchmark conversion."""
+    return {
+        "file_name": f"bench_{n}",
+        "language": "en",
+        "source_type": "text",
+        "text_content": "A short sentence to convert. " * 20,
+    }
+
+
+def percentiles(samples):
+    """p50, p95 and p99 of a list of seconds, in milliseconds."""
+    if len(samples) < 2:
+        return (samples[0] * 1000,) * 3 if samples else (0.0, 0.0, 0.0)
+    cuts = statistics.quantiles(samples, n=100)
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+
+def setup(path: Path) -> int:
+    """Create the schema and the owning user; return the user id."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        owner = User(email="bench@example.com", username="bench", hashed_password="x")
+        db.add(owner)
+        db.commit()
+        user_id = owner.id
+    engine.dispose()
+    return user_id
+
+
+class SyncSetup:
+    """Previous setup: blocking sessions called from coroutines."""
+
+    def __init__(self, path: Path, user_id: int):
+        self.engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.user_id = user_id
+
+    async def write(self, n: int):
+        db = self.SessionLocal()
+        try:
+            conversion.create_with_owner(
+                db, obj_in=conversion_fields(n), user_id=self.user_id, audio_file_path=f"{n}.wav"
+            )
+        finally:
+            db.close()
+
+    async def read(self):
+        db = self.SessionLocal()
+        try:
+            conversion.get_multi_by_owner(db, user_id=self.user_id, limit=20)
+        finally:
+            db.close()
+
+    async def close(self):
+        self.engine.dispose()
+
+
+class AsyncSetup:
+    """New setup: pooled aiosqlite engine with the connect pragmas."""
+
+    def __init__(self, path: Path, user_id: int):
+        self.engine = create_async_engine(
+            f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool,
+            pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW
+        )
+        event.listen(self.engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        self.SessionLocal = async_sessionmaker(
+            self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+        self.user_id = user_id
+
+    async def write(self, n: int):
+        async with self.SessionLocal() as db:
+            await conversion.acreate_with_owner(
+                db, obj_in=conversion_fields(n), user_id=self.user_id, audio_file_path=f"{n}.wav"
+            )
+
+    async def read(self):
+        async with self.SessionLocal() as db:
+            await conversion.aget_multi_by_owner(db, user_id=self.user_id, limit=20)
+
+    async def close(self):
+        await self.engine.dispose()
+
+
+async def run(setup_cls, path: Path, user_id: int, rate: float, seconds: float, read_share: float):
+    """Fire requests at a fixed rate; return (write latencies, read latencies)."""
+    target = setup_cls(path, user_id)
+    # Open the first connection alone, so the per-database pragmas are set once
+    await target.read()
+    chooser = random.Random(0)
+    writes, reads, tasks = [], [], []
+
+    async def request(n: int, scheduled: float, is_read: bool):
+        if is_read:
+            await target.read()
+        else:
+            await target.write(n)
+        (reads if is_read else writes).append(time.perf_counter() - scheduled)
+
+    started = time.perf_counter()
+    for n in range(int(rate * seconds)):
+        scheduled = started + n / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(request(n, scheduled, chooser.random() < read_share)))
+    await asyncio.gather(*tasks)
+    await target.close()
+    return writes, reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=300, help="Requests per second")
+    parser.add_argument("--seconds", type=float, default=5, help="Length of the run")
+    parser.add_argument("--read-share", type=float, default=0.5, help="Fraction of requests that only read")
+    args = parser.parse_args()
+
+    print(f"{args.rate:.0f} requests/s for {args.seconds:.0f}s, {args.read_share:.0%} reads")
+    print(f"{'mode':<6} {'op':<6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for mode, setup_cls in (("sync", SyncSetup), ("async", AsyncSetup)):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bench.db"
+            user_id = setup(path)
+            writes, reads = asyncio.run(
+                run(setup_cls, path, user_id, args.rate, args.seconds, args.read_share)
+            )
+        for op, samples in (("write", writes), ("read", reads)):
+            p50, p95, p99 = percentiles(samples)
+            print(f"{mode:<6} {op:<6} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
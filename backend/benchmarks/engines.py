@@ -0,0 +1,165 @@
+"""OCR and TTS engines for the pipeline benchmarks.
+
+"fake" engines stand in for easyocr readers and Coqui TTS models: they cost
+time in proportion to their input (pixels for OCR, characters for TTS) and
+return deterministic output of a realistic size, so the code around the
+models is measured without downloading any weights. "real" engines use the
+configured models, but only when their weights are already cached locally.
+
+Engines are swapped in through the model registries' loaders, the same
+path the services use, so nothing else in the pipeline changes.
+"""
+import os
+import queue
+import time
+import zlib
+from pathlib import Path
+from typing import List, Optional, Sequence, Set
+import numpy as np
+from app.config import OCR_PAGE_CONCURRENCY, TTS_MODEL_REPLICAS, TTS_PRELOAD_LANGUAGES
+from app.services import ocr_service, tts_service
+from app.services.page_engine import PageEngine
+from app.services.tts_models import get_model_name
+
+ENGINES = ("fake", "real")
+
+# Default cost model, roughly CPU inference of the configured models
+OCR_MS_PER_MEGAPIXEL = 400.0
+TTS_MS_PER_CHAR = 4.0
+
+# Output of the fake synthesizer
+FAKE_SAMPLE_RATE = 22050
+SAMPLES_PER_CHAR = 1300  # About 0.06 s of speech per character
+
+# Pixels per word the fake reader "recognizes"
+PIXELS_PER_WORD = 6000
+
+
+class FakeReader:
+    """Stands in for an easyocr Reader."""
+    def __init__(self, languages: Sequence[str], ms_per_megapixel: float, load_seconds: float = 0.0):
+        """Initialize the reader.
+        Args:
+            languages: Languages the reader was asked for
+            ms_per_megapixel: Simulated recognition cost
+            load_seconds: Simulated model load time
+        """
+        self.languages = list(languages)
+        self.ms_per_megapixel = ms_per_megapixel
+        time.sleep(load_seconds)
+
+    def readtext(self, img, **kwargs) -> list:
+        """Detections for an image; text derived from its pixels so equal images read the same."""
+        pixels = np.asarray(img)
+        time.sleep(pixels.size / 1e6 * self.ms_per_megapixel / 1000)
+        digest = zlib.crc32(np.ascontiguousarray(pixels[::16, ::16]).tobytes())
+        words = max(1, pixels.size // PIXELS_PER_WORD)
+        height, width = pixels.shape[:2]
+        line_height = max(1, height // max(1, words // 8 + 1))
+        return [
+            (
+                [[0, i // 8 * line_height], [width, i // 8 * line_height],
+                 [width, (i // 8 + 1) * line_height], [0, (i // 8 + 1) * line_height]],
+                f"w{(digest + i) % 9973}",
+                0.9,
+            )
+            for i in range(words)
+        ]
+
+    def readtext_batched(self, images: List[np.ndarray], batch_size: int = 1, **kwargs) -> List[list]:
+        """Detections for several images of the same size."""
+        return [self.readtext(img) for img in images]
+
+
+class _FakeSynthesizer:
+    output_sample_rate = FAKE_SAMPLE_RATE
+
+
+class FakeTTS:
+    """Stands in for a Coqui TTS model."""
+    def __init__(self, ms_per_char: float):
+        self.ms_per_char = ms_per_char
+        self.synthesizer = _FakeSynthesizer()
+
+    def tts(self, text: str, speaker: Optional[str] = None, **kwargs) -> np.ndarray:
+        """A deterministic waveform as long as the text would be spoken."""
+        time.sleep(len(text) * self.ms_per_char / 1000)
+        samples = len(text) * SAMPLES_PER_CHAR
+        return (0.3 * np.sin(np.arange(samples, dtype=np.float32) * 0.05)).astype(np.float32)
+
+
+class FakeSynthesizerPool(tts_service.SynthesizerPool):
+    """A synthesizer pool of fake models."""
+    def __init__(self, model_name: str, ms_per_char: float, replicas: int = 1, load_seconds: float = 0.0):
+        self.model_name = model_name
+        time.sleep(load_seconds)
+        self.replicas = [FakeTTS(ms_per_char) for _ in range(max(1, replicas))]
+        self._idle = queue.Queue()
+        for tts in self.replicas:
+            self._idle.put(tts)
+
+
+def _use_page_threads():
+    """Run PDF pages on threads: worker processes would load their own, real, engines."""
+    if ocr_service.page_engine.workers > 0:
+        ocr_service.page_engine.shutdown()
+        ocr_service.page_engine = PageEngine(0, OCR_PAGE_CONCURRENCY)
+
+
+def install_fake(
+    ocr_ms_per_megapixel: float = OCR_MS_PER_MEGAPIXEL,
+    tts_ms_per_char: float = TTS_MS_PER_CHAR,
+    load_seconds: float = 0.0
+) -> Set[str]:
+    """Use fake engines for every language; returns the stages that cannot run (none)."""
+    ocr_service.reader_registry.clear()
+    tts_service.tts_registry.clear()
+    ocr_service.reader_registry.loader = lambda languages: FakeReader(languages, ocr_ms_per_megapixel, load_seconds)
+    tts_service.tts_registry.loader = lambda model_name: FakeSynthesizerPool(
+        model_name, tts_ms_per_char, TTS_MODEL_REPLICAS, load_seconds
+    )
+    _use_page_threads()
+    return set()
+
+
+def _easyocr_weights_cached() -> bool:
+    """Whether easyocr's detector and a recognizer are in its model directory."""
+    model_dir = Path(os.getenv("EASYOCR_MODULE_PATH", Path.home() / ".EasyOCR")) / "model"
+    return (model_dir / "craft_mlt_25k.pth").exists() and any(model_dir.glob("*_g2.pth"))
+
+
+def _tts_weights_cached(model_name: str) -> bool:
+    """Whether Coqui has downloaded a model already."""
+    try:
+        from TTS.utils.generic_utils import get_user_data_dir
+    except ImportError:
+        return False
+    return (Path(get_user_data_dir("tts")) / model_name.replace("/", "--")).exists()
+
+
+def install_real() -> Set[str]:
+    """Use the configured models where their weights are cached; returns the stages that cannot run.
+
+    Readers are built with downloads disabled, so a missing language fails
+    instead of fetching weights in the middle of a measurement.
+    """
+    import easyocr
+    skipped = set()
+    if not _easyocr_weights_cached():
+        skipped |= {"process_page", "pdf_to_text", "image_to_text"}
+    else:
+        ocr_service.reader_registry.loader = lambda languages: easyocr.Reader(
+            list(languages), download_enabled=False
+        )
+    if not all(_tts_weights_cached(get_model_name(lang)) for lang in TTS_PRELOAD_LANGUAGES or ["en"]):
+        skipped.add("text_to_audio")
+    return skipped
+
+
+def install(engine: str, **options) -> Set[str]:
+    """Install the named engines; returns the stages that cannot run with them."""
+    if engine == "fake":
+        return install_fake(**options)
+    if engine == "real":
+        return install_real()
+    raise ValueError(f"Unknown engine: {engine}")
@@ -0,0 +1,125 @@
+"""Synthetic documents for the pipeline benchmarks, generated with PyMuPDF and PIL.
+
+Every fixture is deterministic for a given seed, so runs compare like with
+like. Page kinds:
+    text     pages with a text layer only
+    scanned  pages that are one embedded image of rendered text, no text layer
+    mixed    a text layer on the top half and a scanned block below it
+
+Scans can be degraded the way real ones are, to exercise OCR accuracy:
+    clean    as rendered
+    blur     out of focus
+    noise    grainy
+    low_res  captured at 72 dpi
+"""
+import io
+import random
+from pathlib import Path
+from typing import List, Tuple
+import fitz
+from PIL import Image, ImageDraw, ImageFilter
+
+PAGE_KINDS = ("text", "scanned", "mixed")
+DEGRADATIONS = ("clean", "blur", "noise", "low_res")
+
+# Resolution pages are rasterized at to make scanned pages
+SCAN_DPI = 100
+
+WORDS = (
+    "the of and to in is was that for on with as by at from his her it an were which this be "
+    "are not had have one all their there been has when who will more no if out so said what up "
+    "its about into than them can only other new some could time these two may then do first any "
+    "my now such like our over man me even most made after also did many before must through back"
+).split()
+
+
+def make_paragraphs(rng: random.Random, words: int) -> str:
+    """Prose-like text of about ``words`` words in sentences and paragraphs."""
+    sentences, count = [], 0
+    while count < words:
+        length = rng.randint(6, 18)
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + ".")
+        count += length
+        if rng.random() < 0.15:
+            sentences.append("\n\n")
+    return " ".join(sentences)
+
+
+def _render_scan(text: str, rect: fitz.Rect, dpi: int = SCAN_DPI) -> bytes:
+    """PNG of text laid out in a rect, as a scanner would capture it."""
+    scratch = fitz.open()
+    try:
+        page = scratch.new_page(width=rect.width, height=rect.height)
+        page.insert_textbox(fitz.Rect(36, 36, rect.width - 36, rect.height - 36), text, fontsize=11)
+        return page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes("png")
+    finally:
+        scratch.close()
+
+
+def add_page(doc: fitz.Document, kind: str, rng: random.Random) -> str:
+    """Append one page of the given kind to a document; returns the text placed on it."""
+    page = doc.new_page()  # A4 portrait
+    width, height = page.rect.width, page.rect.height
+    if kind == "text":
+        text = make_paragraphs(rng, 450)
+        page.insert_textbox(fitz.Rect(56, 56, width - 56, height - 56), text, fontsize=11)
+        return text
+    if kind == "scanned":
+        text = make_paragraphs(rng, 450)
+        page.insert_image(page.rect, stream=_render_scan(text, page.rect))
+        return text
+    if kind == "mixed":
+        top, bottom = make_paragraphs(rng, 200), make_paragraphs(rng, 200)
+        page.insert_textbox(fitz.Rect(56, 56, width - 56, height / 2), top, fontsize=11)
+        block = fitz.Rect(0, height / 2, width, height)
+        page.insert_image(block, stream=_render_scan(bottom, block))
+        return top + " " + bottom
+    raise ValueError(f"Unknown page kind: {kind}")
+
+
+def make_pdf(path: Path, kind: str, pages: int, seed: int = 0) -> Path:
+    """Write a PDF of ``pages`` pages of one kind."""
+    rng = random.Random(f"{kind}-{pages}-{seed}")
+    doc = fitz.open()
+    try:
+        for _ in range(pages):
+            add_page(doc, kind, rng)
+        doc.save(str(path), garbage=3, deflate=True)
+    finally:
+        doc.close()
+    return path
+
+
+def make_image(path: Path, width: int, height: int, seed: int = 0) -> Path:
+    """Write a PNG photo of a text page at the given size."""
+    rng = random.Random(f"image-{width}x{height}-{seed}")
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    line_height = max(12, height // 60)
+    lines: List[str] = make_paragraphs(rng, height // line_height * 12).split(". ")
+    for row, line in enumerate(lines[: height // line_height - 2]):
+        draw.text((line_height, line_height * (row + 1)), line[: width // 7], fill=0)
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    path.write_bytes(buffer.getvalue())
+    return path
+
+
+def make_scan(path: Path, degradation: str = "clean", seed: int = 0, words: int = 200) -> Tuple[Path, str]:
+    """Write a PNG scan of a page of prose; returns its path and the text on it."""
+    rng = random.Random(f"scan-{degradation}-{seed}")
+    text = make_paragraphs(rng, words)
+    rect = fitz.Rect(0, 0, 595, 842)  # A4
+    if degradation == "low_res":
+        png = _render_scan(text, rect, dpi=72)
+    elif degradation in ("clean", "blur", "noise"):
+        png = _render_scan(text, rect, dpi=150)
+    else:
+        raise ValueError(f"Unknown degradation: {degradation}")
+    img = Image.open(io.BytesIO(png)).convert("L")
+    if degradation == "blur":
+        img = img.filter(ImageFilter.GaussianBlur(1.5))
+    elif degradation == "noise":
+        img = Image.blend(img, Image.effect_noise(img.size, 64).convert("L"), 0.35)
+    img.save(path, "PNG")
+    return path, text
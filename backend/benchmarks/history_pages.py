@@ -0,0 +1,139 @@
+"""History page latency by depth: offset pagination vs. keyset cursors.
+
+Fills the histories of several users, interleaved as they would be written,
+with conversions carrying long OCR-sized texts. Then times fetching one
+user's page at increasing depths with the previous query (offset, full
+text, before the index exists) and with the cursor query (index seek, text
+preview). Each time is the median of several runs.
+
+Usage, from the backend directory:
+    python -m benchmarks.history_pages [--rows 50000] [--users 10] [--text-kib 8] [--page 50]
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.config import CONVERSION_PREVIEW_CHARS
+from app.crud.conversion import conversion
+from app.database import Base
+from app.models import Conversion, User
+
+INDEX_NAME = "ix_conversions_user_id_created_at_id"
+
+
+def fill(path: Path, rows: int, users: int, text_kib: int) -> int:
+    """Create the schema, without the history index, and the users' histories.
+
+    Returns the id of the first user.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    content = ("Lorem ipsum dolor sit amet. " * (text_kib * 40))[: text_kib * 1024]
+    started = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP INDEX {INDEX_NAME}"))
+        user_ids = [
+            connection.execute(
+                insert(User).values(email=f"bench{n}@example.com", username=f"bench{n}", hashed_password="x")
+            ).inserted_primary_key[0]
+            for n in range(users)
+        ]
+        for first in range(0, rows * users, 1000):
+            connection.execute(insert(Conversion), [
+                {"file_name": f"page_{n}.pdf", "language": "en", "source_type": "pdf",
+                 "text_content": content, "audio_file_path": f"{n}.wav", "user_id": user_ids[n % users],
+                 "created_at": started + timedelta(seconds=n)}
+                for n in range(first, min(first + 1000, rows * users))
+            ])
+    engine.dispose()
+    return user_ids[0]
+
+
+def add_index(path: Path):
+    """Create the history index, as the migration does."""
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE INDEX {INDEX_NAME} ON conversions (user_id, created_at, id)"))
+    engine.dispose()
+
+
+async def timed(make_call, repeats: int = 5) -> float:
+    """Median milliseconds of an awaited call."""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await make_call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def offset_page(db: AsyncSession, user_id: int, depth: int, page: int):
+    """The previous query: offset into an unordered, unindexed scan with full rows."""
+    result = await db.execute(
+        select(Conversion).filter(Conversion.user_id == user_id).offset(depth).limit(page)
+    )
+    return result.scalars().all()
+
+
+async def cursor_page(db: AsyncSession, user_id: int, page: int, after=None):
+    """The cursor query of the history list."""
+    return await conversion.aget_page_by_owner(
+        db, user_id=user_id, limit=page, after=after, preview_chars=CONVERSION_PREVIEW_CHARS
+    )
+
+
+async def cursor_before(db: AsyncSession, user_id: int, depth: int, page: int):
+    """Walk cursors as a client would, returning the cursor of the page at ``depth``."""
+    after = None
+    for _ in range(depth // page):
+        rows = await cursor_page(db, user_id, page, after)
+        after = (rows[-1].created_at, rows[-1].id)
+    return after
+
+
+async def measure(path: Path, user_id: int, page: int, depths, use_cursor: bool):
+    """Median milliseconds of one page at each depth."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    SessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    times = []
+    async with SessionLocal() as db:
+        for depth in depths:
+            if use_cursor:
+                after = await cursor_before(db, user_id, depth, page)
+                times.append(await timed(lambda: cursor_page(db, user_id, page, after)))
+            else:
+                times.append(await timed(lambda: offset_page(db, user_id, depth, page)))
+                db.expunge_all()
+    await engine.dispose()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000, help="Conversions in the measured user's history")
+    parser.add_argument("--users", type=int, default=10, help="Users whose histories are interleaved")
+    parser.add_argument("--text-kib", type=int, default=8, help="Text size of each conversion")
+    parser.add_argument("--page", type=int, default=50, help="Rows per page")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        user_id = fill(path, args.rows, args.users, args.text_kib)
+        depths = [d for d in (0, 1000, 10000, 25000, args.rows - args.page) if d < args.rows]
+        offset_times = asyncio.run(measure(path, user_id, args.page, depths, use_cursor=False))
+        add_index(path)
+        cursor_times = asyncio.run(measure(path, user_id, args.page, depths, use_cursor=True))
+
+    print(f"{args.users} users x {args.rows} conversions of {args.text_kib} KiB, {args.page} per page")
+    print(f"{'depth':>8} {'offset ms':>10} {'cursor ms':>10}")
+    for depth, offset_ms, cursor_ms in zip(depths, offset_times, cursor_times):
+        print(f"{depth:>8} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
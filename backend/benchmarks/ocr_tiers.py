@@ -0,0 +1,112 @@
+"""Throughput and accuracy of the OCR engines: easyocr, Tesseract, and tiered.
+
+Reads a corpus of synthetic scans (see benchmarks.fixtures) with each
+engine mode, one image at a time as image_to_text does, and compares the
+text with what was rendered. Word accuracy is the share of the rendered
+words recovered in order. The tiered mode is measured at each
+--min-confidence, along with the share of images whose easyocr reading
+replaced Tesseract's.
+The corpus cycles through clean, blurred, noisy and low resolution scans.
+
+Modes whose engine is unavailable are skipped: Tesseract must be
+installed with the language's traineddata and, with --engines real,
+easyocr's weights must already be cached. --engines fake replaces easyocr
+with the fake reader of benchmarks.engines, which times the plumbing but
+makes its accuracy meaningless.
+
+Usage, from the backend directory:
+    python -m benchmarks.ocr_tiers [--images 24] [--lang en] [--min-confidence 0.7,0.8,0.9] [--engines real]
+"""
+import argparse
+import difflib
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+from benchmarks import engines
+from benchmarks.fixtures import DEGRADATIONS, make_scan
+from app.services import ocr_service
+from app.services.ocr_engines import EasyOCREngine, OCREngine, TesseractEngine, TieredEngine
+
+
+def word_accuracy(reference: str, text: str) -> float:
+    """Share of the reference words found in the text, in order."""
+    expected = [w.strip(".,").lower() for w in reference.split()]
+    found = [w.strip(".,").lower() for w in text.split()]
+    if not expected:
+        return 1.0
+    matcher = difflib.SequenceMatcher(None, expected, found, autojunk=False)
+    return sum(block.size for block in matcher.get_matching_blocks()) / len(expected)
+
+
+def measure(engine: OCREngine, corpus: List[Tuple[Path, str]]) -> Dict:
+    """Read every image of the corpus after one warm-up read."""
+    ocr_service.ocr_image(corpus[0][0], engine)
+    latencies, accuracies, confidences, escalated = [], [], [], 0
+    for path, reference in corpus:
+        started = time.perf_counter()
+        text, (engine_name, confidence) = ocr_service.ocr_image(path, engine)
+        latencies.append(time.perf_counter() - started)
+        accuracies.append(word_accuracy(reference, text))
+        if confidence is not None:
+            confidences.append(confidence)
+        escalated += isinstance(engine, TieredEngine) and "easyocr" in engine_name
+    latencies.sort()
+    return {
+        "images_per_s": len(corpus) / sum(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, round(0.95 * (len(latencies) - 1)))] * 1000,
+        "accuracy": statistics.mean(accuracies),
+        "confidence": statistics.mean(confidences) if confidences else float("nan"),
+        "escalated": escalated / len(corpus) if isinstance(engine, TieredEngine) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=24, help="Scans in the corpus")
+    parser.add_argument("--lang", default="en", help="Language of the readers")
+    parser.add_argument("--min-confidence", default="0.7,0.8,0.9",
+                        help="Comma-separated escalation thresholds of the tiered mode")
+    parser.add_argument("--engines", choices=engines.ENGINES, default="real", help="easyocr itself or a fake")
+    args = parser.parse_args()
+    thresholds = [float(v) for v in args.min_confidence.split(",") if v]
+
+    skipped = engines.install(args.engines)
+    languages = ocr_service.reader_languages(args.lang)
+    easy = None if "image_to_text" in skipped else EasyOCREngine(lambda: ocr_service.reader_registry.get(languages))
+    tesseract = TesseractEngine.for_languages(languages)
+    if easy is None:
+        print("skipping easyocr and tiered: easyocr weights are not cached locally")
+    if tesseract is None:
+        print(f"skipping tesseract and tiered: Tesseract is not installed for {', '.join(languages)}")
+
+    modes: List[Tuple[str, OCREngine]] = []
+    if easy is not None:
+        modes.append(("easyocr", easy))
+    if tesseract is not None:
+        modes.append(("tesseract", tesseract))
+    if easy is not None and tesseract is not None:
+        modes += [(f"tiered@{t:g}", TieredEngine(tesseract, easy, t)) for t in thresholds]
+    if not modes:
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = [
+            make_scan(Path(tmp) / f"scan-{i}.png", DEGRADATIONS[i % len(DEGRADATIONS)], seed=i)
+            for i in range(args.images)
+        ]
+        print(f"{len(corpus)} scans, {args.engines} engines")
+        print(f"{'mode':<14} {'images/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'accuracy':>9} {'confidence':>11} {'escalated':>10}")
+        for name, engine in modes:
+            result = measure(engine, corpus)
+            escalated = f"{result['escalated']:.0%}" if result["escalated"] is not None else "-"
+            print(
+                f"{name:<14} {result['images_per_s']:>9.2f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+                f"{result['accuracy']:>9.1%} {result['confidence']:>11.3f} {escalated:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
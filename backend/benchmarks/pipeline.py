@@ -0,0 +1,300 @@
+"""Throughput, latency and peak memory of the OCR and TTS pipeline stages.
+
+Runs process_page, pdf_to_text, image_to_text and text_to_audio on
+synthetic documents (see benchmarks.fixtures): one page of each kind,
+PDFs of each kind at the requested page counts, photos at the requested
+sizes and texts at the requested lengths. Each case is run once to load the
+models, then timed --repeats times. By default the models are replaced by
+fake engines with a fixed cost model (see benchmarks.engines), so results
+track the code around the models and are comparable between machines of the
+same kind; --engines real uses locally cached weights instead.
+
+The services log and swallow their errors, so the output of every call is
+checked: OCR must return the requested language and at least a few words
+per page or image, and synthesis a non-empty WAV. A case whose output
+fails the check is reported as FAILED instead of timed.
+
+Results can be saved as a baseline, and a later run compared against it:
+a case regresses when its p50 or p95 grows, or its throughput drops, by
+more than --threshold. The exit status is 1 if any case failed or regressed.
+
+Usage, from the backend directory:
+    python -m benchmarks.pipeline [--engines fake] [--pages 1,10,100] [--repeats 3]
+        [--save-baseline baseline.json] [--baseline baseline.json --threshold 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import fitz
+from benchmarks import engines
+from benchmarks.fixtures import PAGE_KINDS, make_image, make_paragraphs, make_pdf
+from app.services import ocr_service, tts_service
+from app.services.ocr_cache import OCRPageCache
+
+# Language every case runs in
+LANGUAGE = "en"
+
+# Interval of the resident memory sampler
+RSS_SAMPLE_SECONDS = 0.005
+
+# Fewest words OCR output may have; fewer means a stage failed and returned next to nothing
+MIN_WORDS_PER_PAGE = 50
+MIN_WORDS_PER_IMAGE = 10
+
+
+class _NoPageCache(OCRPageCache):
+    """A page cache that never hits, so repeated runs do the same work."""
+    def get(self, content_hash: str, page: int, lang: str, engine: str) -> Optional[str]:
+        return None
+
+    def put(self, content_hash: str, page: int, lang: str, engine: str, text: str):
+        pass
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of the process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Without procfs, the process-wide peak is the best available
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakRSS:
+    """Highest resident set size of the process while a block runs, sampled in a thread."""
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __enter__(self) -> "PeakRSS":
+        self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+@dataclass
+class Case:
+    """One measured call of a pipeline stage."""
+    name: str
+    stage: str
+    unit: str  # What throughput is counted in
+    count: int  # Units processed per call
+    run: Callable[[], object]
+    check: Callable[[object], Optional[str]]  # What is wrong with the output of a call, None if nothing
+
+
+def check_text(min_words: int) -> Callable[[object], Optional[str]]:
+    """Check of OCR output, a text or a (text, language) pair, against a minimum word count."""
+    def check(output) -> Optional[str]:
+        text, lang = output if isinstance(output, tuple) else (output, LANGUAGE)
+        if lang != LANGUAGE:
+            return f"language {lang!r} instead of {LANGUAGE!r}"
+        words = len(text.split())
+        if words < min_words:
+            return f"{words} words, expected at least {min_words}"
+        return None
+    return check
+
+
+def check_audio(frames: int) -> Optional[str]:
+    """Check of synthesized audio, given its length in frames."""
+    return None if frames > 0 else "empty audio"
+
+
+def build_cases(directory: Path, loop: asyncio.AbstractEventLoop, args) -> List[Case]:
+    """Generate the fixtures and the calls measuring them."""
+    cases: List[Case] = []
+
+    def process_one_page(path: Path):
+        engine = ocr_service.ocr_engine(LANGUAGE)
+        doc = fitz.open(path)
+        try:
+            return ocr_service.process_page(doc[0], engine)
+        finally:
+            doc.close()
+
+    def synthesize(text: str) -> int:
+        path = loop.run_until_complete(tts_service.text_to_audio(text, LANGUAGE))
+        try:
+            with wave.open(str(path)) as wav:
+                return wav.getnframes()
+        finally:
+            path.unlink(missing_ok=True)
+
+    for kind in PAGE_KINDS:
+        path = make_pdf(directory / f"page-{kind}.pdf", kind, 1)
+        cases.append(Case(
+            f"process_page[{kind}]", "process_page", "pages", 1, lambda p=path: process_one_page(p),
+            check_text(MIN_WORDS_PER_PAGE)
+        ))
+    for kind in PAGE_KINDS:
+        for pages in args.pages:
+            path = make_pdf(directory / f"{kind}-{pages}.pdf", kind, pages)
+            cases.append(Case(
+                f"pdf_to_text[{kind}-{pages}p]", "pdf_to_text", "pages", pages,
+                lambda p=path: loop.run_until_complete(ocr_service.pdf_to_text(p, LANGUAGE)),
+                check_text(MIN_WORDS_PER_PAGE * pages)
+            ))
+    for width, height in args.image_sizes:
+        path = make_image(directory / f"image-{width}x{height}.png", width, height)
+        cases.append(Case(
+            f"image_to_text[{width}x{height}]", "image_to_text", "images", 1,
+            lambda p=path: loop.run_until_complete(ocr_service.image_to_text(p, LANGUAGE)),
+            check_text(MIN_WORDS_PER_IMAGE)
+        ))
+    rng = random.Random("text_to_audio")
+    for chars in args.text_chars:
+        text = make_paragraphs(rng, chars // 4)[:chars]
+        cases.append(Case(
+            f"text_to_audio[{chars}c]", "text_to_audio", "chars", len(text), lambda t=text: synthesize(t),
+            check_audio
+        ))
+    return cases
+
+
+def measure(case: Case, repeats: int) -> Dict:
+    """Time a case after one warm-up call; the result has an "error" instead if any output is wrong."""
+    error = case.check(case.run())
+    if error:
+        return {"error": error}
+    latencies = []
+    with PeakRSS() as rss:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            output = case.run()
+            latencies.append(time.perf_counter() - started)
+            error = error or case.check(output)
+    if error:
+        return {"error": error}
+    latencies.sort()
+    return {
+        "unit": case.unit,
+        "count": case.count,
+        "throughput": case.count * repeats / sum(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, round(0.95 * (len(latencies) - 1)))] * 1000,
+        "peak_rss_mib": rss.peak / 1024 ** 2,
+    }
+
+
+def compare(result: Dict, base: Dict, threshold: float) -> List[str]:
+    """What regressed in a case against its baseline."""
+    regressions = []
+    for key in ("p50_ms", "p95_ms"):
+        if result[key] > base[key] * (1 + threshold):
+            regressions.append(f"{key} {result[key] / base[key] - 1:+.0%}")
+    if result["throughput"] < base["throughput"] * (1 - threshold):
+        regressions.append(f"throughput {result['throughput'] / base['throughput'] - 1:+.0%}")
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _size_list(value: str) -> List[tuple]:
+    return [tuple(int(n) for n in v.split("x")) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engines", choices=engines.ENGINES, default="fake", help="OCR and TTS engines to run")
+    parser.add_argument("--pages", type=_int_list, default=[1, 10, 100], help="Page counts of the PDFs, 1 to 500")
+    parser.add_argument("--image-sizes", type=_size_list, default=[(1280, 960), (3000, 4000)], help="Photo sizes, WxH")
+    parser.add_argument("--text-chars", type=_int_list, default=[200, 2000], help="Text lengths for synthesis")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed calls per case")
+    parser.add_argument("--ocr-ms-per-megapixel", type=float, default=engines.OCR_MS_PER_MEGAPIXEL,
+                        help="Cost of the fake OCR engine")
+    parser.add_argument("--tts-ms-per-char", type=float, default=engines.TTS_MS_PER_CHAR,
+                        help="Cost of the fake TTS engine")
+    parser.add_argument("--only", help="Run only the cases whose name contains this")
+    parser.add_argument("--save-baseline", type=Path, help="Write the results to this file")
+    parser.add_argument("--baseline", type=Path, help="Compare the results with this file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression, as a fraction")
+    args = parser.parse_args()
+    if any(not 1 <= pages <= 500 for pages in args.pages):
+        parser.error("--pages must be between 1 and 500")
+
+    if args.engines == "fake":
+        skipped = engines.install(
+            "fake", ocr_ms_per_megapixel=args.ocr_ms_per_megapixel, tts_ms_per_char=args.tts_ms_per_char
+        )
+    else:
+        skipped = engines.install("real")
+    for stage in sorted(skipped):
+        print(f"skipping {stage}: model weights are not cached locally")
+    ocr_service.page_cache = _NoPageCache(ocr_service.page_cache.root, 0)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    if baseline and baseline.get("engines") != args.engines:
+        print(f"warning: the baseline was measured with {baseline.get('engines')} engines")
+
+    loop = asyncio.new_event_loop()
+    results: Dict[str, Dict] = {}
+    regressed = failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        cases = [
+            case for case in build_cases(Path(tmp), loop, args)
+            if case.stage not in skipped and (not args.only or args.only in case.name)
+        ]
+        print(f"{len(cases)} cases, {args.engines} engines, fixtures in {time.perf_counter() - started:.1f}s")
+        print(f"{'case':<28} {'throughput':>16} {'p50 ms':>9} {'p95 ms':>9} {'peak MiB':>9}  vs baseline")
+        for case in cases:
+            result = measure(case, args.repeats)
+            if "error" in result:
+                print(f"{case.name:<28} FAILED: {result['error']}")
+                failed = True
+                continue
+            results[case.name] = result
+            status = ""
+            if baseline and case.name in baseline["results"]:
+                regressions = compare(result, baseline["results"][case.name], args.threshold)
+                status = "REGRESSED " + ", ".join(regressions) if regressions else "ok"
+                regressed = regressed or bool(regressions)
+            elif baseline:
+                status = "new"
+            print(
+                f"{case.name:<28} {result['throughput']:>9.1f} {case.unit + '/s':<6} "
+                f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['peak_rss_mib']:>9.1f}  {status}"
+            )
+    loop.close()
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps({"engines": args.engines, "results": results}, indent=2))
+        print(f"baseline written to {args.save_baseline}")
+    if failed:
+        print("cases failed, their output was wrong")
+    if regressed:
+        print(f"regressions over the {args.threshold:.0%} threshold")
+    if failed or regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Bytes served per seek: plain FileResponse vs. range/conditional serving.
+
+Simulates a web player that opens an audio file, seeks around it and then
+replays it, and reports the bytes sent and time taken by each approach.
+
+Usage, from the backend directory:
+    python -m benchmarks.range_serving [--minutes 30] [--seeks 20] [--window 262144]
+"""
+import argparse
+import random
+import tempfile
+import time
+import wave
+from pathlib import Path
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+from fastapi.testclient import TestClient
+from app.core.file_serving import serve_file
+
+
+def make_wav(path: Path, minutes: float, sample_rate: int = 22050):
+    """Write a silent 16-bit mono WAV of the given length."""
+    frames = int(minutes * 60 * sample_rate)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        block = b"\x00\x00" * sample_rate
+        for _ in range(frames // sample_rate):
+            wav.writeframes(block)
+
+
+def make_app(path: Path) -> FastAPI:
+    """An app serving one file both ways."""
+    app = FastAPI()
+
+    @app.get("/plain")
+    def plain():
+        return FileResponse(path, media_type="audio/wav", headers={"Accept-Ranges": "bytes"})
+
+    @app.get("/ranged")
+    async def ranged(request: Request):
+        return await serve_file(request, path, "audio/wav", content_hash="benchmark")
+
+    return app
+
+
+def play(client: TestClient, url: str, size: int, offsets, window: int):
+    """Open, seek to every offset reading one window, then replay; return (bytes, seconds)."""
+    sent = 0
+    started = time.perf_counter()
+    response = client.get(url, headers={"Range": f"bytes=0-{window - 1}"})
+    sent += len(response.content)
+    etag = response.headers.get("etag")
+    for offset in offsets:
+        response = client.get(url, headers={"Range": f"bytes={offset}-{min(size, offset + window) - 1}"})
+        sent += len(response.content)
+    # Replay: revalidate the cached copy
+    headers = {"If-None-Match": etag} if etag else {}
+    response = client.get(url, headers=headers)
+    sent += len(response.content)
+    return sent, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=30, help="Length of the synthetic audio")
+    parser.add_argument("--seeks", type=int, default=20, help="Seeks per playback")
+    parser.add_argument("--window", type=int, default=256 * 1024, help="Bytes a player buffers per seek")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "audio.wav"
+        make_wav(path, args.minutes)
+        size = path.stat().st_size
+        offsets = [random.Random(seed).randrange(0, size) for seed in range(args.seeks)]
+        client = TestClient(make_app(path))
+
+        print(f"file: {size / 1024 ** 2:.1f} MiB, {args.seeks} seeks, {args.window // 1024} KiB window")
+        print(f"{'mode':<8} {'total MiB':>10} {'KiB/seek':>10} {'seconds':>8}")
+        for mode in ("plain", "ranged"):
+            sent, seconds = play(client, f"/{mode}", size, offsets, args.window)
+            per_seek = sent / (args.seeks + 2) / 1024
+            print(f"{mode:<8} {sent / 1024 ** 2:>10.1f} {per_seek:>10.1f} {seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Database size and list-query time: inline conversion text vs. the compressed text table.
+
+Builds a fixture of conversions in the previous layout, with OCR-like text
+stored inline in conversions.text_content and a share of repeated documents.
+It then runs the Alembic migrations on it, the same way a deployment would,
+and measures the file size after VACUUM and the latency of a history page
+and of a scan over all conversions, before and after.
+
+Usage, from the backend directory:
+    python -m benchmarks.text_storage [--rows 100000] [--text-kib 4] [--repeat-share 0.2]
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+import sqlalchemy as sa
+
+# Vocabulary of the synthetic OCR text
+WORDS = (
+    "the of and to in is was that for on with as by at from his her it an were which this be "
+    "are not had have one all their there been has when who will more no if out so said what up "
+    "its about into than them can only other new some could time these two may then do first any "
+    "my now such like our over man me even most made after also did many before must through back "
+    "years where much your way well down should because each just those people how too little state"
+).split()
+
+
+def make_text(rng: random.Random, size: int) -> str:
+    """Text of roughly ``size`` characters in sentences of random words."""
+    parts, length = [], 0
+    while length < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + ". "
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)[:size]
+
+
+def build_fixture(path: Path, rows: int, text_kib: int, repeat_share: float, users: int = 100):
+    """Create the previous schema and fill it with conversions."""
+    engine = sa.create_engine(f"sqlite:///{path}")
+    metadata = sa.MetaData()
+    users_table = sa.Table(
+        "users", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("email", sa.String, unique=True),
+        sa.Column("username", sa.String, unique=True),
+        sa.Column("hashed_password", sa.String),
+        sa.Column("is_active", sa.Boolean, default=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    conversions = sa.Table(
+        "conversions", metadata,
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("file_name", sa.String, index=True),
+        sa.Column("language", sa.String),
+        sa.Column("source_type", sa.String),
+        sa.Column("text_content", sa.Text, nullable=True),
+        sa.Column("audio_file_path", sa.String),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id")),
+        sa.Index("ix_conversions_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+    metadata.create_all(engine)
+    rng = random.Random(0)
+    documents = []
+    started = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(users_table.insert(), [
+            {"email": f"user{n}@example.com", "username": f"user{n}", "hashed_password": "x"}
+            for n in range(users)
+        ])
+        for first in range(0, rows, 1000):
+            batch = []
+            for n in range(first, min(first + 1000, rows)):
+                if documents and rng.random() < repeat_share:
+                    text = rng.choice(documents)
+                else:
+                    text = make_text(rng, text_kib * 1024)
+                    documents.append(text)
+                batch.append({
+                    "file_name": f"scan_{n}.pdf", "language": "en", "source_type": "pdf",
+                    "text_content": text, "audio_file_path": f"{n}.wav",
+                    "user_id": n % users + 1, "created_at": started + timedelta(seconds=n),
+                })
+            connection.execute(conversions.insert(), batch)
+    engine.dispose()
+
+
+def migrate(path: Path):
+    """Run alembic upgrade head against the fixture in a separate process."""
+    backend = Path(__file__).resolve().parent.parent
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"], cwd=backend, env=env, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+
+
+def vacuum(path: Path) -> int:
+    """Compact the database and return its size in bytes."""
+    engine = sa.create_engine(f"sqlite:///{path}")
+    with engine.connect() as connection:
+        connection.exec_driver_sql("VACUUM")
+    engine.dispose()
+    return path.stat().st_size
+
+
+def timed(connection, sql: str, repeats: int = 7) -> float:
+    """Median milliseconds of a query, fetching every row."""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        connection.exec_driver_sql(sql).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def measure(path: Path, page_sql: str, scan_sql: str):
+    """Median times of a history page and of a scan over all conversions."""
+    engine = sa.create_engine(f"sqlite:///{path}")
+    with engine.connect() as connection:
+        result = timed(connection, page_sql), timed(connection, scan_sql)
+    engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Conversions in the fixture")
+    parser.add_argument("--text-kib", type=int, default=4, help="Text size of each conversion")
+    parser.add_argument("--repeat-share", type=float, default=0.2, help="Share of conversions repeating an earlier text")
+    args = parser.parse_args()
+
+    summary = "id, user_id, file_name, language, source_type, audio_file_path, created_at"
+    page = "FROM conversions WHERE user_id = 7 ORDER BY created_at DESC, id DESC LIMIT 100"
+    scan = "SELECT language, count(*) FROM conversions GROUP BY language"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        build_fixture(path, args.rows, args.text_kib, args.repeat_share)
+        before_size = vacuum(path)
+        before_page, before_scan = measure(path, f"SELECT {summary}, substr(text_content, 1, 200) {page}", scan)
+
+        started = time.perf_counter()
+        migrate(path)
+        migrate_seconds = time.perf_counter() - started
+        after_size = vacuum(path)
+        after_page, after_scan = measure(path, f"SELECT {summary}, text_preview {page}", scan)
+
+    print(f"{args.rows} conversions of {args.text_kib} KiB, {args.repeat_share:.0%} repeated texts")
+    print(f"migration: {migrate_seconds:.1f}s")
+    print(f"{'layout':<8} {'size MiB':>9} {'page ms':>8} {'scan ms':>8}")
+    print(f"{'inline':<8} {before_size / 1024 ** 2:>9.1f} {before_page:>8.2f} {before_scan:>8.2f}")
+    print(f"{'table':<8} {after_size / 1024 ** 2:>9.1f} {after_page:>8.2f} {after_scan:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
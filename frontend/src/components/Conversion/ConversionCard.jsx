@@ -12,7 +12,9 @@ const ConversionCard = ({ conversion, onDelete, onError }) => {
   const DOWNLOAD_TIMEOUT = 30000;
 
   const renderTextContent = useCallback(() => {
-    if (!conversion?.text_content?.trim()) {
+    // The history list sends a short preview instead of the full text
+    const text_content = conversion?.text_content ?? conversion?.text_preview;
+    if (!text_content?.trim()) {
       return (
         <p className="text-sm text-gray-500 italic">
           No text content available
@@ -20,7 +22,6 @@ const ConversionCard = ({ conversion, onDelete, onError }) => {
       );
     }
     
-    const { text_content } = conversion;
     const truncatedText = text_content.length > TEXT_PREVIEW_LENGTH 
       ? `${text_content.slice(0, TEXT_PREVIEW_LENGTH)}...`
       : text_content;
@@ -30,7 +31,7 @@ const ConversionCard = ({ conversion, onDelete, onError }) => {
         {truncatedText}
       </p>
     );
-  }, [conversion?.text_content]);
+  }, [conversion?.text_content, conversion?.text_preview]);
 
   /**
    * Handles conversion deletion with confirmation